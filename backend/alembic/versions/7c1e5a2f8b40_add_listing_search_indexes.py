@@ -0,0 +1,39 @@
+"""add listing search indexes
+
+Revision ID: 7c1e5a2f8b40
+Revises: 4d9f3b3d9b3e
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c1e5a2f8b40'
+down_revision = '4d9f3b3d9b3e'
+branch_labels = None
+depends_on = None
+
+INDEXES = {
+    'ix_listings_status_created_at': 'listings (status, created_at, id)',
+    'ix_listings_status_type_created_at': 'listings (status, listing_type, created_at, id)',
+    'ix_listings_status_price_min': 'listings (status, price_min, id)',
+    'ix_listings_status_type_price_min': 'listings (status, listing_type, price_min, id)',
+    # Normally created with the table by geoalchemy2; databases created otherwise may lack it
+    'idx_listings_location': 'listings USING gist (location)',
+}
+
+
+def upgrade():
+    # CONCURRENTLY avoids locking listings against writes, but cannot run in a transaction
+    with op.get_context().autocommit_block():
+        for name, definition in INDEXES.items():
+            op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {definition}")
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name in INDEXES:
+            if name != 'idx_listings_location':
+                op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
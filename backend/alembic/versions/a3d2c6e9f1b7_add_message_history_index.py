@@ -0,0 +1,29 @@
+"""add message history index
+
+Revision ID: a3d2c6e9f1b7
+Revises: 7c1e5a2f8b40
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3d2c6e9f1b7'
+down_revision = '7c1e5a2f8b40'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_messages_conversation_created_at "
+            "ON messages (conversation_id, created_at, id)"
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_messages_conversation_created_at")
@@ -0,0 +1,77 @@
+"""add conversation inbox
+
+Revision ID: b5e8f2a4c6d1
+Revises: a3d2c6e9f1b7
+Create Date: 2026-10-17 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'b5e8f2a4c6d1'
+down_revision = 'a3d2c6e9f1b7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'conversation_inbox',
+        sa.Column('user_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('users.id'), primary_key=True),
+        sa.Column('conversation_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('conversations.id'), primary_key=True),
+        sa.Column('last_message_id', postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column('last_message_preview', sa.String(length=200), nullable=True),
+        sa.Column('last_message_sender_id', postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column('last_message_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('unread_count', sa.Integer(), server_default='0', nullable=False),
+    )
+    op.create_index(
+        'ix_conversation_inbox_user_last_message', 'conversation_inbox', ['user_id', 'last_message_at']
+    )
+
+    # One row per participant, with the latest message and the messages from
+    # others still flagged unread
+    op.execute(
+        """
+        INSERT INTO conversation_inbox (
+            user_id, conversation_id, last_message_id, last_message_preview,
+            last_message_sender_id, last_message_at, unread_count
+        )
+        SELECT
+            p.user_id,
+            c.id,
+            m.id,
+            CASE WHEN length(m.content) > 140 THEN left(m.content, 139) || '…' ELSE m.content END,
+            m.sender_id,
+            COALESCE(m.created_at, c.last_message_at, c.created_at, now()),
+            (
+                SELECT count(*) FROM messages u
+                WHERE u.conversation_id = c.id AND u.sender_id <> p.user_id AND NOT u.is_read
+            )
+        FROM conversations c
+        CROSS JOIN LATERAL unnest(c.participants) AS p(user_id)
+        LEFT JOIN LATERAL (
+            SELECT id, content, sender_id, created_at FROM messages
+            WHERE conversation_id = c.id
+            ORDER BY created_at DESC, id DESC
+            LIMIT 1
+        ) m ON true
+        ON CONFLICT DO NOTHING
+        """
+    )
+
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_conversations_participants "
+            "ON conversations USING gin (participants)"
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_conversations_participants")
+    op.drop_index('ix_conversation_inbox_user_last_message', table_name='conversation_inbox')
+    op.drop_table('conversation_inbox')
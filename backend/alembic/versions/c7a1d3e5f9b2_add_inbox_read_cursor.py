@@ -0,0 +1,52 @@
+"""add inbox read cursor
+
+Revision ID: c7a1d3e5f9b2
+Revises: b5e8f2a4c6d1
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7a1d3e5f9b2'
+down_revision = 'b5e8f2a4c6d1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('conversation_inbox', sa.Column('last_read_message_id', postgresql.UUID(as_uuid=True), nullable=True))
+    op.add_column('conversation_inbox', sa.Column('last_read_at', sa.DateTime(timezone=True), nullable=True))
+
+    # Start each cursor at the newest message the user sent or that is flagged
+    # read, then recount unread messages from it
+    op.execute(
+        """
+        UPDATE conversation_inbox i
+        SET (last_read_message_id, last_read_at) = (
+            SELECT id, created_at FROM messages
+            WHERE conversation_id = i.conversation_id AND (sender_id = i.user_id OR is_read)
+            ORDER BY created_at DESC, id DESC
+            LIMIT 1
+        )
+        """
+    )
+    op.execute(
+        """
+        UPDATE conversation_inbox i
+        SET unread_count = (
+            SELECT count(*) FROM messages m
+            WHERE m.conversation_id = i.conversation_id
+              AND m.sender_id <> i.user_id
+              AND (i.last_read_at IS NULL OR (m.created_at, m.id) > (i.last_read_at, i.last_read_message_id))
+        )
+        """
+    )
+
+
+def downgrade():
+    op.drop_column('conversation_inbox', 'last_read_at')
+    op.drop_column('conversation_inbox', 'last_read_message_id')
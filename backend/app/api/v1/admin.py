@@ -2,7 +2,10 @@ from fastapi import APIRouter, Depends, HTTPException
 from typing import List
 from sqlalchemy.future import select
 from app.core.deps import get_current_admin_user, get_db_session
+from app.core.user_cache import user_cache
+from app.services.realtime import manager as realtime_manager
 from app.models.user import User
+from app.models.database import get_pool_status
 from app.schemas.user import User as UserSchema
 from pydantic import BaseModel
 
@@ -21,6 +24,33 @@ async def test_admin_route(
     """
     return {"message": f"Welcome, admin {current_admin.email}!"}
 
+@router.get("/metrics/db-pool", response_model=dict)
+async def get_db_pool_metrics(
+    current_admin: User = Depends(get_current_admin_user)
+):
+    """
+    Connection pool occupancy and checkout wait times for this worker.
+    """
+    return get_pool_status()
+
+@router.get("/metrics/user-cache", response_model=dict)
+async def get_user_cache_metrics(
+    current_admin: User = Depends(get_current_admin_user)
+):
+    """
+    Hit/miss counters of the authenticated-user cache for this worker.
+    """
+    return user_cache.get_stats()
+
+@router.get("/metrics/realtime", response_model=dict)
+async def get_realtime_metrics(
+    current_admin: User = Depends(get_current_admin_user)
+):
+    """
+    WebSocket connections, outbound queue depths and delivery latency for this worker.
+    """
+    return realtime_manager.get_stats()
+
 @router.get("/users", response_model=List[UserSchema])
 async def get_all_users(
     db: get_db_session = Depends(),
@@ -52,4 +82,5 @@ async def verify_user(
 
     user.is_verified_identity = is_verified
     await db.commit()
+    await user_cache.invalidate(user.id)
     return {"message": f"User {user.email} verification status updated to {is_verified}."} 
\ No newline at end of file
@@ -1,14 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
+from sqlalchemy.orm import undefer
 from datetime import timedelta
 
 from app.models.database import get_db_session
 from app.models.user import User
 from app.schemas.auth import UserRegister, UserLogin, Token, RefreshToken
 from app.core.security import (
-    get_password_hash, 
-    verify_password, 
+    get_password_hash_async,
+    verify_password_async,
     create_access_token, 
     create_refresh_token,
     verify_token
@@ -35,7 +36,7 @@ async def register(
         )
     
     # Create new user
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await get_password_hash_async(user_data.password)
     new_user = User(
         email=user_data.email,
         password_hash=hashed_password,
@@ -75,11 +76,13 @@ async def login(
     db: AsyncSession = Depends(get_db_session)
 ):
     """Login user and return JWT tokens"""
-    # Get user by email
-    result = await db.execute(select(User).where(User.email == user_credentials.email))
+    # Get user by email, with the otherwise deferred password hash
+    result = await db.execute(
+        select(User).options(undefer(User.password_hash)).where(User.email == user_credentials.email)
+    )
     user = result.scalar_one_or_none()
     
-    if not user or not verify_password(user_credentials.password, user.password_hash):
+    if not user or not await verify_password_async(user_credentials.password, user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
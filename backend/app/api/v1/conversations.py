@@ -1,8 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException, status, WebSocket, WebSocketDisconnect
+from fastapi import APIRouter, Depends, HTTPException, status, Query, WebSocket, WebSocketDisconnect
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from sqlalchemy.orm import selectinload
-from typing import List
+from sqlalchemy import select, func, insert
+from typing import Any, Dict, List, Optional
+from datetime import timedelta
 from uuid import UUID, uuid4
 import json
 
@@ -13,31 +13,23 @@ from app.schemas.conversation import (
     ConversationCreate, 
     Conversation as ConversationSchema,
     ConversationWithMessages,
+    ConversationInboxEntry,
+    MessagePage,
+    ReadReceiptCreate,
+    ReadCursor,
     MessageCreate,
+    MessageBatchCreate,
     Message as MessageSchema
 )
 from app.core.deps import get_current_user
+from app.core.pagination import encode_cursor, decode_cursor, keyset_after
+from app.services.inbox import inbox_service
+from app.services.realtime import manager
 
 router = APIRouter()
 
-# WebSocket connection manager
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: dict = {}
-
-    async def connect(self, websocket: WebSocket, user_id: str):
-        await websocket.accept()
-        self.active_connections[user_id] = websocket
-
-    def disconnect(self, user_id: str):
-        if user_id in self.active_connections:
-            del self.active_connections[user_id]
-
-    async def send_personal_message(self, message: str, user_id: str):
-        if user_id in self.active_connections:
-            await self.active_connections[user_id].send_text(message)
-
-manager = ConnectionManager()
+MESSAGE_PAGE_SIZE = 50
+MAX_MESSAGE_PAGE_SIZE = 200
 
 @router.post("/", response_model=ConversationSchema, status_code=status.HTTP_201_CREATED)
 async def create_conversation(
@@ -59,35 +51,29 @@ async def create_conversation(
     )
     
     db.add(new_conversation)
+    await db.flush()
+    await inbox_service.add_conversation(db, new_conversation)
     await db.commit()
     await db.refresh(new_conversation)
     return new_conversation
 
-@router.get("/", response_model=List[ConversationSchema])
+@router.get("/", response_model=List[ConversationInboxEntry])
 async def get_user_conversations(
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db_session)
 ):
-    """Get all conversations for the current user"""
-    result = await db.execute(
-        select(Conversation)
-        .where(Conversation.participants.contains([current_user.id]))
-        .where(Conversation.is_active == True)
-    )
-    conversations = result.scalars().all()
-    return conversations
+    """Get the current user's inbox: conversations with last message preview and unread count, most recent first"""
+    return await inbox_service.get_inbox(db, current_user.id)
 
-@router.get("/{conversation_id}", response_model=ConversationWithMessages)
-async def get_conversation_with_messages(
+async def get_participant_conversation(
+    db: AsyncSession,
     conversation_id: UUID,
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db_session)
-):
-    """Get a conversation with its messages"""
+    user: User,
+    action: str = "access"
+) -> Conversation:
+    """Load a conversation, raising 404 if missing and 403 if the user is not a participant"""
     result = await db.execute(
-        select(Conversation)
-        .where(Conversation.id == conversation_id)
-        .options(selectinload(Conversation.messages))
+        select(Conversation).where(Conversation.id == conversation_id)
     )
     conversation = result.scalar_one_or_none()
     
@@ -97,14 +83,106 @@ async def get_conversation_with_messages(
             detail="Conversation not found"
         )
     
-    if current_user.id not in conversation.participants:
+    if user.id not in conversation.participants:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not authorized to access this conversation"
+            detail=f"Not authorized to {action} this conversation"
         )
     
     return conversation
 
+def message_page_query(
+    conversation_id: UUID,
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+    limit: int = MESSAGE_PAGE_SIZE
+):
+    """
+    Query for one page of a conversation's messages, plus one extra row.
+    
+    Without ``after`` the page holds the newest messages older than
+    ``before`` (or the newest overall), read newest first; with ``after``
+    it holds the oldest messages newer than it. Both walk the
+    (conversation_id, created_at, id) index.
+    """
+    key = [Message.created_at, Message.id]
+    query = select(Message).where(Message.conversation_id == conversation_id)
+    
+    if after:
+        query = query.where(keyset_after(key, decode_cursor(after, 2)))
+        query = query.order_by(Message.created_at, Message.id)
+    else:
+        if before:
+            query = query.where(keyset_after(key, decode_cursor(before, 2), descending=True))
+        query = query.order_by(Message.created_at.desc(), Message.id.desc())
+    
+    return query.limit(limit + 1)
+
+async def load_message_page(
+    db: AsyncSession,
+    conversation_id: UUID,
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+    limit: int = MESSAGE_PAGE_SIZE
+) -> Dict[str, Any]:
+    """One page of messages, oldest first, with cursors for the adjacent pages"""
+    result = await db.execute(message_page_query(conversation_id, before, after, limit))
+    messages = list(result.scalars().all())
+    
+    has_more = len(messages) > limit
+    messages = messages[:limit]
+    if not after:
+        messages.reverse()
+    
+    if not messages:
+        # Nothing newer yet: keep the caller's position for polling
+        return {"messages": [], "before_cursor": None, "after_cursor": after, "has_more": False}
+    
+    older_exist = has_more if not after else True
+    return {
+        "messages": messages,
+        "before_cursor": encode_cursor([messages[0].created_at, messages[0].id]) if older_exist else None,
+        "after_cursor": encode_cursor([messages[-1].created_at, messages[-1].id]),
+        "has_more": has_more
+    }
+
+@router.get("/{conversation_id}", response_model=ConversationWithMessages)
+async def get_conversation_with_messages(
+    conversation_id: UUID,
+    limit: int = Query(MESSAGE_PAGE_SIZE, ge=1, le=MAX_MESSAGE_PAGE_SIZE),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db_session)
+):
+    """Get a conversation with its latest page of messages"""
+    conversation = await get_participant_conversation(db, conversation_id, current_user)
+    page = await load_message_page(db, conversation_id, limit=limit)
+    
+    return {
+        **ConversationSchema.model_validate(conversation).model_dump(),
+        "messages": page["messages"],
+        "before_cursor": page["before_cursor"],
+        "after_cursor": page["after_cursor"]
+    }
+
+@router.get("/{conversation_id}/messages", response_model=MessagePage)
+async def get_conversation_messages(
+    conversation_id: UUID,
+    before: Optional[str] = Query(None, description="before_cursor of a page, for older messages"),
+    after: Optional[str] = Query(None, description="after_cursor of a page, for newer messages"),
+    limit: int = Query(MESSAGE_PAGE_SIZE, ge=1, le=MAX_MESSAGE_PAGE_SIZE),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db_session)
+):
+    """Get a page of a conversation's message history"""
+    if before and after:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Pass either before or after, not both"
+        )
+    
+    await get_participant_conversation(db, conversation_id, current_user)
+    return await load_message_page(db, conversation_id, before, after, limit)
+
 @router.post("/{conversation_id}/messages", response_model=MessageSchema)
 async def send_message(
     conversation_id: UUID,
@@ -114,25 +192,11 @@ async def send_message(
 ):
     """Send a message in a conversation"""
     # Verify conversation exists and user has access
-    result = await db.execute(
-        select(Conversation).where(Conversation.id == conversation_id)
-    )
-    conversation = result.scalar_one_or_none()
-    
-    if not conversation:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Conversation not found"
-        )
-    
-    if current_user.id not in conversation.participants:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not authorized to send messages in this conversation"
-        )
+    conversation = await get_participant_conversation(db, conversation_id, current_user, "send messages in")
     
     # Create message
     new_message = Message(
+        id=uuid4(),
         conversation_id=conversation_id,
         sender_id=current_user.id,
         content=message_data.content,
@@ -141,39 +205,175 @@ async def send_message(
     
     db.add(new_message)
     
-    # Update conversation
+    # Update conversation and every participant's inbox
     conversation.message_count += 1
-    conversation.last_message_at = new_message.created_at
+    conversation.last_message_at = func.now()
+    await inbox_service.record_messages(db, conversation, current_user.id, new_message.id, new_message.content)
     
     await db.commit()
     await db.refresh(new_message)
     
-    # Send real-time notification to other participants
-    for participant_id in conversation.participants:
-        if participant_id != current_user.id:
-            await manager.send_personal_message(
-                json.dumps({
-                    "type": "new_message",
-                    "message": {
-                        "id": str(new_message.id),
-                        "content": new_message.content,
-                        "sender_id": str(current_user.id),
-                        "conversation_id": str(conversation_id)
-                    }
-                }),
-                str(participant_id)
-            )
+    # Send real-time notification to other participants, without waiting for delivery
+    manager.publish_nowait(
+        json.dumps({
+            "type": "new_message",
+            "message": {
+                "id": str(new_message.id),
+                "content": new_message.content,
+                "sender_id": str(current_user.id),
+                "conversation_id": str(conversation_id)
+            }
+        }),
+        [participant_id for participant_id in conversation.participants if participant_id != current_user.id]
+    )
     
     return new_message
 
+def message_batch_insert(
+    conversation_id: UUID,
+    sender_id: UUID,
+    messages: List[MessageCreate],
+    message_ids: List[UUID]
+):
+    """
+    One multi-row INSERT for a batch of messages.
+    
+    Messages get the transaction time plus one microsecond per position,
+    so the batch keeps its send order in the (created_at, id) history
+    and never ties on created_at.
+    """
+    return (
+        insert(Message)
+        .values([
+            {
+                "id": message_id,
+                "conversation_id": conversation_id,
+                "sender_id": sender_id,
+                "content": message.content,
+                "message_type": message.message_type,
+                "created_at": func.now() + timedelta(microseconds=position)
+            }
+            for position, (message_id, message) in enumerate(zip(message_ids, messages))
+        ])
+        .returning(Message.id, Message.created_at)
+    )
+
+@router.post("/{conversation_id}/messages/batch", response_model=List[MessageSchema], status_code=status.HTTP_201_CREATED)
+async def send_message_batch(
+    conversation_id: UUID,
+    batch: MessageBatchCreate,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db_session)
+):
+    """Send several messages at once, e.g. ones queued while offline"""
+    conversation = await get_participant_conversation(db, conversation_id, current_user, "send messages in")
+    
+    message_ids = [uuid4() for _ in batch.messages]
+    result = await db.execute(message_batch_insert(conversation_id, current_user.id, batch.messages, message_ids))
+    created_at = dict(result.all())
+    
+    # Update conversation and every participant's inbox once for the batch
+    conversation.message_count += len(message_ids)
+    conversation.last_message_at = created_at[message_ids[-1]]
+    await inbox_service.record_messages(
+        db, conversation, current_user.id, message_ids[-1], batch.messages[-1].content,
+        count=len(message_ids), last_message_at=conversation.last_message_at
+    )
+    
+    await db.commit()
+    
+    messages = [
+        {
+            "id": message_id,
+            "conversation_id": conversation_id,
+            "sender_id": current_user.id,
+            "content": message.content,
+            "message_type": message.message_type,
+            "is_read": False,
+            "created_at": created_at[message_id]
+        }
+        for message_id, message in zip(message_ids, batch.messages)
+    ]
+    
+    # One frame for the whole batch
+    manager.publish_nowait(
+        json.dumps({
+            "type": "new_messages",
+            "conversation_id": str(conversation_id),
+            "messages": [
+                {
+                    "id": str(message["id"]),
+                    "content": message["content"],
+                    "sender_id": str(current_user.id),
+                    "created_at": message["created_at"].isoformat()
+                }
+                for message in messages
+            ]
+        }),
+        [participant_id for participant_id in conversation.participants if participant_id != current_user.id]
+    )
+    
+    return messages
+
+@router.post("/{conversation_id}/read", response_model=ReadCursor)
+async def mark_conversation_read(
+    conversation_id: UUID,
+    receipt: Optional[ReadReceiptCreate] = None,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db_session)
+):
+    """Advance the current user's read cursor, to a given message or the latest one"""
+    conversation = await get_participant_conversation(db, conversation_id, current_user)
+    
+    query = select(Message.id, Message.created_at).where(Message.conversation_id == conversation_id)
+    if receipt and receipt.message_id:
+        query = query.where(Message.id == receipt.message_id)
+    else:
+        query = query.order_by(Message.created_at.desc(), Message.id.desc()).limit(1)
+    message = (await db.execute(query)).first()
+    
+    if message is None:
+        if receipt and receipt.message_id:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Message not found"
+            )
+        # Nothing to read yet
+        cursor = await inbox_service.get_read_cursor(db, conversation_id, current_user.id)
+        return {"conversation_id": conversation_id, **cursor}
+    
+    cursor = await inbox_service.advance_read_cursor(db, conversation_id, current_user.id, message.id, message.created_at)
+    await db.commit()
+    
+    if cursor is None:
+        # Already read up to there
+        cursor = await inbox_service.get_read_cursor(db, conversation_id, current_user.id)
+        return {"conversation_id": conversation_id, **cursor}
+    
+    # Let the other participants show the messages as seen
+    manager.publish_nowait(
+        json.dumps({
+            "type": "read_receipt",
+            "conversation_id": str(conversation_id),
+            "user_id": str(current_user.id),
+            "last_read_message_id": str(cursor["last_read_message_id"]),
+            "last_read_at": cursor["last_read_at"].isoformat()
+        }),
+        [participant_id for participant_id in conversation.participants if participant_id != current_user.id]
+    )
+    
+    return {"conversation_id": conversation_id, **cursor}
+
 @router.websocket("/ws/{user_id}")
 async def websocket_endpoint(websocket: WebSocket, user_id: str):
     """WebSocket endpoint for real-time messaging"""
-    await manager.connect(websocket, user_id)
+    connection = await manager.connect(websocket, user_id)
     try:
         while True:
             data = await websocket.receive_text()
             # Echo back for now - in a real app, this would handle different message types
-            await manager.send_personal_message(f"Echo: {data}", user_id)
+            connection.enqueue(f"Echo: {data}")
     except WebSocketDisconnect:
-        manager.disconnect(user_id) 
\ No newline at end of file
+        pass
+    finally:
+        manager.disconnect(connection)
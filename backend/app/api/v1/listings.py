@@ -1,33 +1,31 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import select, func, Float
 from sqlalchemy.orm import selectinload
-from typing import List, Optional
+from sqlalchemy.orm.attributes import set_committed_value
+from typing import Any, Dict, List, Optional
 from uuid import UUID
 from geoalchemy2.functions import ST_DWithin
 
 from app.models.database import get_db_session
 from app.models.user import User
 from app.models.listing import Listing, ListingType, ListingStatus
-from app.schemas.listing import ListingCreate, ListingUpdate, Listing as ListingSchema, ListingWithUser
+from app.schemas.listing import ListingCreate, ListingUpdate, Listing as ListingSchema, ListingWithUser, ListingSort
 from app.core.deps import get_current_user
+from app.core.pagination import NEXT_CURSOR_HEADER, encode_cursor, decode_cursor, keyset_after, keyset_after_nullable
+from app.services.listing_sampler import listing_sampler
+from app.services.view_counter import view_count_buffer
+from app.services.location_cache import location_cache
 
 router = APIRouter()
 
 @router.get("/random", response_model=List[ListingSchema])
 async def get_random_listings(
-    limit: int = 10,
+    limit: int = Query(10, ge=1, le=100),
     db: AsyncSession = Depends(get_db_session)
 ):
     """Get a list of random listings."""
-    result = await db.execute(
-        select(Listing)
-        .where(Listing.status == ListingStatus.ACTIVE)
-        .order_by(func.random())
-        .limit(limit)
-    )
-    listings = result.scalars().all()
-    return listings
+    return await listing_sampler.sample(db, limit)
 
 @router.post("/", response_model=ListingSchema, status_code=status.HTTP_201_CREATED)
 async def create_listing(
@@ -47,10 +45,12 @@ async def create_listing(
     db.add(new_listing)
     await db.commit()
     await db.refresh(new_listing)
+    location_cache.invalidate()
     return new_listing
 
 @router.get("/search", response_model=List[ListingWithUser])
 async def search_listings(
+    response: Response,
     db: AsyncSession = Depends(get_db_session),
     lat: Optional[float] = Query(None, description="Latitude for location-based search"),
     lon: Optional[float] = Query(None, description="Longitude for location-based search"),
@@ -58,20 +58,65 @@ async def search_listings(
     listing_type: Optional[ListingType] = Query(None),
     min_price: Optional[float] = Query(None),
     max_price: Optional[float] = Query(None),
-    skip: int = 0,
-    limit: int = 20
+    sort: ListingSort = Query(ListingSort.RECENCY, description="Sort order: recency, price or distance"),
+    cursor: Optional[str] = Query(None, description=f"Cursor from the previous page's {NEXT_CURSOR_HEADER} header"),
+    limit: int = Query(20, ge=1, le=100)
 ):
-    """Search for listings with location-based filtering"""
+    """
+    Search for listings with location-based filtering.
+    
+    Results are keyset-paginated: when more results exist, the response
+    carries an X-Next-Cursor header to pass back as ``cursor``.
+    """
+    if sort == ListingSort.DISTANCE and (lat is None or lon is None):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Sorting by distance requires lat and lon"
+        )
+    
+    query = search_listings_query(
+        lat, lon, radius, listing_type, min_price, max_price, sort, cursor, limit + 1
+    )
+    result = await db.execute(query)
+    rows = result.all()
+    
+    # One extra row tells whether there is a next page
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(_sort_key(rows[-1], sort))
+    
+    return [row.Listing for row in rows]
+
+def search_listings_query(
+    lat: Optional[float],
+    lon: Optional[float],
+    radius: Optional[int],
+    listing_type: Optional[ListingType],
+    min_price: Optional[float],
+    max_price: Optional[float],
+    sort: ListingSort,
+    cursor: Optional[str],
+    limit: int
+):
+    """
+    Build the listing search query for one page.
+    
+    Every sort ends with Listing.id so the order is total and a page can
+    resume strictly after the previous page's last row. Recency and price
+    sorts are served by the composite (status, [listing_type,] key, id)
+    indexes; distance uses the GiST index on location through ST_DWithin
+    and the <-> operator.
+    """
     query = (
         select(Listing)
         .where(Listing.status == ListingStatus.ACTIVE)
         .options(selectinload(Listing.user))
-        .offset(skip)
         .limit(limit)
     )
     
+    point = None
     if lat is not None and lon is not None:
-        point = f"POINT({lon} {lat})"
+        point = func.ST_GeogFromText(f"SRID=4326;POINT({lon} {lat})")
         query = query.where(ST_DWithin(Listing.location, point, radius))
         
     if listing_type:
@@ -82,18 +127,77 @@ async def search_listings(
         
     if max_price:
         query = query.where(Listing.price_max <= max_price)
-        
-    result = await db.execute(query)
-    listings = result.scalars().all()
     
-    return listings
+    if sort == ListingSort.DISTANCE:
+        distance = Listing.location.op("<->", return_type=Float)(point)
+        query = query.add_columns(distance.label("distance")).order_by(distance, Listing.id)
+        if cursor:
+            last_distance, last_id = decode_cursor(cursor, 2)
+            query = query.where(keyset_after([distance, Listing.id], [last_distance, last_id]))
+    
+    elif sort == ListingSort.PRICE:
+        query = query.order_by(Listing.price_min.asc().nulls_last(), Listing.id)
+        if cursor:
+            last_price, last_id = decode_cursor(cursor, 2)
+            query = query.where(keyset_after_nullable(Listing.price_min, last_price, Listing.id, last_id))
+    
+    else:
+        query = query.order_by(Listing.created_at.desc(), Listing.id.desc())
+        if cursor:
+            last_created_at, last_id = decode_cursor(cursor, 2)
+            query = query.where(
+                keyset_after([Listing.created_at, Listing.id], [last_created_at, last_id], descending=True)
+            )
+    
+    return query
+
+def _sort_key(row, sort: ListingSort) -> list:
+    """Sort key values of a result row, in the order the cursor stores them."""
+    listing = row.Listing
+    if sort == ListingSort.DISTANCE:
+        return [row.distance, listing.id]
+    if sort == ListingSort.PRICE:
+        return [listing.price_min, listing.id]
+    return [listing.created_at, listing.id]
+
+# Browsers and proxies may reuse the location list this long before revalidating
+LOCATIONS_MAX_AGE = 60
+
+def _location_cache_headers(etag: str) -> Dict[str, str]:
+    return {"ETag": etag, "Cache-Control": f"public, max-age={LOCATIONS_MAX_AGE}"}
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    return if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]
 
 @router.get("/locations", response_model=List[str])
-async def get_listing_locations(db: AsyncSession = Depends(get_db_session)):
-    """Get a list of unique listing locations"""
-    query = select(func.distinct(Listing.city)).where(Listing.city.isnot(None))
-    result = await db.execute(query)
-    locations = result.scalars().all()
+async def get_listing_locations(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db_session)
+):
+    """Get a list of unique cities with active listings"""
+    locations, etag = await location_cache.get(db)
+    if _etag_matches(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=_location_cache_headers(etag))
+    
+    response.headers.update(_location_cache_headers(etag))
+    return [location["city"] for location in locations]
+
+@router.get("/locations/counts", response_model=List[Dict[str, Any]])
+async def get_listing_location_counts(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db_session)
+):
+    """Get cities with active listings and the number of listings in each"""
+    locations, etag = await location_cache.get(db)
+    if _etag_matches(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=_location_cache_headers(etag))
+    
+    response.headers.update(_location_cache_headers(etag))
     return locations
 
 @router.get("/{listing_id}", response_model=ListingWithUser)
@@ -115,9 +219,9 @@ async def get_listing(
             detail="Listing not found"
         )
     
-    # Increment view count
-    listing.view_count += 1
-    await db.commit()
+    # Count the view in memory; it is written to the table by the next flush
+    view_count_buffer.record(listing.id)
+    set_committed_value(listing, "view_count", (listing.view_count or 0) + view_count_buffer.pending(listing.id))
     
     return listing
 
@@ -152,6 +256,7 @@ async def update_listing(
         
     await db.commit()
     await db.refresh(listing)
+    location_cache.invalidate()
     return listing
 
 @router.delete("/{listing_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -180,5 +285,6 @@ async def delete_listing(
     
     listing.status = "expired"  # Soft delete
     await db.commit()
+    location_cache.invalidate()
     
     return None 
\ No newline at end of file
@@ -9,6 +9,8 @@ from app.models.match import Match, MatchStatus
 from app.schemas.match import MatchRecommendation, MatchAction, Match
 from app.schemas.user import UserPublicProfile
 from app.core.deps import get_current_user
+from app.core.config import settings
+from app.ml.models import model_manager
 from app.services import matching_service
 from app.services.behavior_tracking import behavior_tracking_service
 
@@ -49,8 +51,7 @@ async def get_match_recommendations(
             return recommendations
     
     # Fallback to traditional ML/rule-based matching
-    # Get all users for now (in production, this would be optimized)
-    result = await db.execute(select(User).limit(100))
+    result = await db.execute(select(User).limit(settings.match_candidate_limit))
     potential_matches = result.scalars().all()
     
     # Calculate compatibility scores
@@ -81,7 +82,7 @@ async def search_matches(
     # that uses the query and location to filter users from the database.
     # For now, we'll just get all users and filter them.
     
-    result = await db.execute(select(User).limit(100)) # Simplified for now
+    result = await db.execute(select(User).limit(settings.match_candidate_limit))
     potential_matches = result.scalars().all()
     
     # Filter by location if provided
@@ -211,6 +212,6 @@ async def get_model_statistics(
     """Get statistics about the recommendation models."""
     return {
         "collaborative_filtering": behavior_tracking_service.get_model_info(),
-        "ml_models": matching_service.use_ml,
+        "ml_models": model_manager.refresh_active_model(),
         "active_approach": "hybrid" if behavior_tracking_service.get_model_info().get("status") == "fitted" else "ml_rule_based"
     } 
\ No newline at end of file
@@ -1,55 +1,93 @@
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 
-from app.models.database import get_db_session
+from app.models.database import get_db_session, async_session_maker
 from app.models.user import User
 from app.core.deps import get_current_user, require_user_type
 from app.ml.models import model_manager
+from app.ml.content_filtering import content_filter
+from app.ml.training import ChunkSpool, training_executor, train_compatibility_model, fit_content_profiles
 from app.services.ml_data_service import ml_data_service
 from app.services.matching import matching_service
 from app.services.content_recommendation import content_recommendation_service
 
 router = APIRouter()
 
-@router.post("/train")
+@router.post("/train", status_code=status.HTTP_202_ACCEPTED)
 async def train_ml_model(
-    background_tasks: BackgroundTasks,
-    db: AsyncSession = Depends(get_db_session),
     current_user: User = Depends(require_user_type("agent"))  # Only agents can train models
 ):
-    """Train a new ML model for compatibility prediction."""
+    """Start training a new ML model for compatibility prediction in the training pool."""
+    
+    spool = ChunkSpool()
+    
+    async def prepare():
+        # Only stream the raw rows here, spilling each chunk to disk as it arrives;
+        # feature building and training happen in the pool
+        async with async_session_maker() as db:
+            async for chunk in ml_data_service.iter_training_data(db):
+                spool.write(chunk)
+        
+        # If not enough real data, supplement with synthetic data
+        if spool.rows < 100:
+            spool.write(await ml_data_service.generate_synthetic_training_data(500))
+        spool.close()
+        
+        # Training and saving the new registry version happen in the pool
+        return train_compatibility_model, (
+            "main_model", "random_forest", spool.path, model_manager.registry.root
+        )
+    
+    def on_success(result):
+        metrics = result["metrics"]
+        
+        # Set as active model if training successful
+        activated = metrics["val_r2"] > 0.5  # Minimum R² threshold
+        if activated:
+            model_manager.activate_model("main_model", result["version"])
+        
+        print(f"Model training completed. Metrics: {metrics}")
+        return {"version": result["version"], "metrics": metrics, "activated": activated}
     
-    async def train_model_task():
-        try:
-            # Collect training data
-            training_data = await ml_data_service.collect_training_data(db)
-            
-            # If not enough real data, supplement with synthetic data
-            if len(training_data) < 100:
-                synthetic_data = await ml_data_service.generate_synthetic_training_data(500)
-                training_data.extend(synthetic_data)
-            
-            # Create and train model
-            model = model_manager.create_model("main_model", "random_forest")
-            metrics = model.train(training_data)
-            
-            # Set as active model if training successful
-            if metrics["val_r2"] > 0.5:  # Minimum R² threshold
-                model_manager.set_active_model("main_model")
-                matching_service.enable_ml_matching()
-                
-                # Save model
-                model.save_model("models/main_model.joblib")
-            
-            print(f"Model training completed. Metrics: {metrics}")
-            
-        except Exception as e:
-            print(f"Model training failed: {e}")
+    def on_discard(result):
+        # Cancelled after the version was registered
+        model_manager.registry.delete("main_model", result["version"])
     
-    background_tasks.add_task(train_model_task)
+    job = training_executor.submit("compatibility_model", prepare, on_success, on_discard, cleanup=spool.discard)
     
-    return {"message": "Model training started in background"}
+    return {"message": "Model training started in background", "job_id": job.id}
+
+@router.get("/jobs")
+async def list_training_jobs(
+    current_user: User = Depends(require_user_type("agent"))
+):
+    """List recent training jobs."""
+    return training_executor.list_jobs()
+
+@router.get("/jobs/{job_id}")
+async def get_training_job(
+    job_id: str,
+    current_user: User = Depends(require_user_type("agent"))
+):
+    """Get the status of a training job."""
+    job = training_executor.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Training job not found")
+    return job
+
+@router.post("/jobs/{job_id}/cancel")
+async def cancel_training_job(
+    job_id: str,
+    current_user: User = Depends(require_user_type("agent"))
+):
+    """Cancel a training job; a job already running in the pool stops before registering its result."""
+    job = training_executor.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Training job not found")
+    if not training_executor.cancel(job_id):
+        raise HTTPException(status_code=409, detail=f"Training job already {job['status']}")
+    return {"message": "Training job cancelled", "job_id": job_id}
 
 @router.get("/models")
 async def get_model_info(
@@ -61,13 +99,16 @@ async def get_model_info(
 @router.post("/models/{model_name}/activate")
 async def activate_model(
     model_name: str,
+    version: Optional[str] = Query(None, description="Registry version (defaults to the active or latest)"),
     current_user: User = Depends(require_user_type("agent"))
 ):
     """Activate a specific ML model."""
     try:
-        model_manager.set_active_model(model_name)
-        matching_service.enable_ml_matching()
-        return {"message": f"Model '{model_name}' activated successfully"}
+        model_manager.activate_model(model_name, version)
+        return {
+            "message": f"Model '{model_name}' activated successfully",
+            "version": model_manager.active_model.version
+        }
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
 
@@ -75,8 +116,8 @@ async def activate_model(
 async def disable_ml_models(
     current_user: User = Depends(require_user_type("agent"))
 ):
-    """Disable ML models and use rule-based matching."""
-    matching_service.disable_ml_matching()
+    """Disable ML models and use rule-based matching, in every worker."""
+    model_manager.deactivate_model()
     return {"message": "ML models disabled, using rule-based matching"}
 
 @router.get("/feature-importance")
@@ -84,7 +125,7 @@ async def get_feature_importance(
     current_user: User = Depends(require_user_type("agent"))
 ):
     """Get feature importance from the active ML model."""
-    if not model_manager.active_model:
+    if not model_manager.refresh_active_model():
         raise HTTPException(
             status_code=400, 
             detail="No active ML model available"
@@ -107,7 +148,7 @@ async def predict_compatibility(
     current_user: User = Depends(get_current_user)
 ):
     """Predict compatibility between two users using ML model."""
-    if not model_manager.active_model:
+    if not model_manager.refresh_active_model():
         raise HTTPException(
             status_code=400,
             detail="No active ML model available"
@@ -131,7 +172,7 @@ async def predict_compatibility(
             "user1_id": user1_id,
             "user2_id": user2_id,
             "compatibility_score": score,
-            "model_used": "ML" if matching_service.use_ml else "Rule-based"
+            "model_used": "ML" if model_manager.refresh_active_model() else "Rule-based"
         }
     except Exception as e:
         raise HTTPException(
@@ -141,30 +182,27 @@ async def predict_compatibility(
 
 # Content-Based Filtering Endpoints
 
-@router.post("/content/update-profiles")
+@router.post("/content/update-profiles", status_code=status.HTTP_202_ACCEPTED)
 async def update_content_profiles(
-    background_tasks: BackgroundTasks,
-    db: AsyncSession = Depends(get_db_session),
     current_user: User = Depends(require_user_type("agent"))
 ):
-    """Update content-based filtering profiles."""
+    """Update content-based filtering profiles in the training pool."""
+    
+    async def prepare():
+        async with async_session_maker() as db:
+            user_dicts = await content_recommendation_service.collect_user_profiles(db)
+            listing_dicts = await content_recommendation_service.collect_listing_profiles(db)
+        return fit_content_profiles, (user_dicts, listing_dicts)
     
-    async def update_profiles_task():
-        try:
-            # Update user profiles
-            user_success = await content_recommendation_service.update_user_profiles(db)
-            
-            # Update listing profiles
-            listing_success = await content_recommendation_service.update_listing_profiles(db)
-            
-            print(f"Content profiles updated - Users: {user_success}, Listings: {listing_success}")
-            
-        except Exception as e:
-            print(f"Failed to update content profiles: {e}")
+    def on_success(fitted_filter):
+        content_filter.replace_with(fitted_filter)
+        stats = content_filter.get_content_stats()
+        print(f"Content profiles updated - Users: {stats['users_fitted']}, Listings: {stats['listings_fitted']}")
+        return stats
     
-    background_tasks.add_task(update_profiles_task)
+    job = training_executor.submit("content_profiles", prepare, on_success)
     
-    return {"message": "Content profile update started in background"}
+    return {"message": "Content profile update started in background", "job_id": job.id}
 
 @router.get("/content/recommendations/{user_id}")
 async def get_content_recommendations(
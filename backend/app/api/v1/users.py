@@ -14,7 +14,9 @@ from app.schemas.verification import (
     VerificationStatus
 )
 from app.core.deps import get_current_user
+from app.core.user_cache import user_cache
 from app.services import verification_service
+from app.ml.feature_store import user_feature_store
 
 router = APIRouter()
 
@@ -52,6 +54,8 @@ async def update_current_user_profile(
     db.add(current_user)
     await db.commit()
     await db.refresh(current_user)
+    user_feature_store.invalidate(current_user.id)
+    await user_cache.invalidate(current_user.id)
     
     return current_user
 
@@ -86,6 +90,8 @@ async def update_onboarding_data(
     db.add(current_user)
     await db.commit()
     await db.refresh(current_user)
+    user_feature_store.invalidate(current_user.id)
+    await user_cache.invalidate(current_user.id)
     
     return current_user
 
@@ -161,6 +167,7 @@ async def confirm_email_verification(
     
     user.is_verified_email = True
     await db.commit()
+    await user_cache.invalidate(user.id)
     
     return {"message": "Email verified successfully"}
 
@@ -181,5 +188,6 @@ async def upload_identity_document(
         current_user.is_verified_identity = True
         current_user.verification_status = verification_result
         await db.commit()
+        await user_cache.invalidate(current_user.id)
     
     return VerificationResult(**verification_result) 
\ No newline at end of file
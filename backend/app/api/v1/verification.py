@@ -5,6 +5,7 @@ from typing import Dict, Any
 from app.models.database import get_db_session
 from app.models.user import User
 from app.core.deps import get_current_user
+from app.core.user_cache import user_cache
 from app.schemas.verification import (
     EmailVerificationRequest, 
     PhoneVerificationRequest,
@@ -61,6 +62,7 @@ async def verify_email_code(
     current_user.is_verified_email = True
     db.add(current_user)
     await db.commit()
+    await user_cache.invalidate(current_user.id)
     
     return {"message": "Email verified successfully"}
 
@@ -106,6 +108,7 @@ async def verify_phone_code(
     current_user.is_verified_phone = True
     db.add(current_user)
     await db.commit()
+    await user_cache.invalidate(current_user.id)
     
     return {"message": "Phone verified successfully"}
 
@@ -279,6 +282,7 @@ async def get_verification_result(
     
     db.add(current_user)
     await db.commit()
+    await user_cache.invalidate(current_user.id)
     
     return {
         "verification_id": verification_id,
@@ -7,6 +7,7 @@ from sqlalchemy import select
 from app.models.database import get_db_session
 from app.models.user import User, UserType
 from app.core.security import verify_token
+from app.core.user_cache import user_cache
 
 # Security scheme
 security = HTTPBearer()
@@ -27,9 +28,13 @@ async def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    # Get user from database
-    result = await db.execute(select(User).where(User.id == user_id))
-    user = result.scalar_one_or_none()
+    # Get user from the cache, falling back to the database
+    user = await user_cache.get(db, user_id)
+    if user is None:
+        result = await db.execute(select(User).where(User.id == user_id))
+        user = result.scalar_one_or_none()
+        if user is not None:
+            await user_cache.set(user)
     
     if user is None:
         raise HTTPException(
@@ -0,0 +1,89 @@
+import base64
+import json
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, List, Optional
+from uuid import UUID
+
+from fastapi import HTTPException, status
+from sqlalchemy import and_, or_, tuple_
+
+# Response header carrying the cursor of the next page
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def encode_cursor(values: List[Any]) -> str:
+    """
+    Opaque cursor for the sort key of the last row of a page.
+
+    Args:
+        values: Sort key values (datetimes, decimals, UUIDs, numbers or None)
+
+    Returns:
+        URL-safe base64 string
+    """
+    def encode_value(value):
+        if isinstance(value, datetime):
+            return {"dt": value.isoformat()}
+        if isinstance(value, Decimal):
+            return {"dec": str(value)}
+        if isinstance(value, UUID):
+            return {"uuid": str(value)}
+        return value
+
+    payload = json.dumps([encode_value(value) for value in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, n_values: int) -> List[Any]:
+    """
+    Sort key values from a cursor created by encode_cursor.
+
+    Raises:
+        HTTPException: 400 if the cursor is malformed
+    """
+    def decode_value(value):
+        if isinstance(value, dict) and len(value) == 1:
+            kind, raw = next(iter(value.items()))
+            if kind == "dt":
+                return datetime.fromisoformat(raw)
+            if kind == "dec":
+                return Decimal(raw)
+            if kind == "uuid":
+                return UUID(raw)
+        if value is None or isinstance(value, (int, float, str)):
+            return value
+        raise ValueError(f"unsupported cursor value {value!r}")
+
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != n_values:
+            raise ValueError("wrong number of cursor values")
+        return [decode_value(value) for value in values]
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor"
+        )
+
+def keyset_after(columns: List[Any], values: List[Any], descending: bool = False):
+    """
+    Condition selecting rows strictly after a cursor in (columns...) order.
+
+    A row comparison keeps the condition a single range on a matching
+    composite index. All columns must sort the same direction, and values
+    must not be NULL; see keyset_after_nullable for a nullable leading column.
+    """
+    if descending:
+        return tuple_(*columns) < tuple_(*values)
+    return tuple_(*columns) > tuple_(*values)
+
+def keyset_after_nullable(column: Any, value: Optional[Any], tiebreak: Any, tiebreak_value: Any):
+    """
+    Condition selecting rows after a cursor in (column ASC NULLS LAST, tiebreak ASC) order.
+
+    PostgreSQL sorts NULLs last in ascending order, so once the cursor has
+    reached the NULL rows only the tiebreak column advances.
+    """
+    if value is None:
+        return and_(column.is_(None), tiebreak > tiebreak_value)
+    return or_(keyset_after([column, tiebreak], [value, tiebreak_value]), column.is_(None))
@@ -0,0 +1,210 @@
+import enum
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from sqlalchemy import DateTime, Enum, inspect
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.core.config import settings
+from app.models.user import User
+
+REDIS_KEY_PREFIX = "paired:user:"
+
+# Never cached: the hash is only loaded, undeferred, on the login path
+UNCACHED_COLUMNS = {"password_hash"}
+
+class UserCache:
+    """
+    Short-lived cache of authenticated users' column values, keyed by user id.
+
+    get_current_user consults it before querying the users table. Entries
+    hold column values as JSON rather than ORM instances or pickles, so
+    reading one back never executes code, and leave out the password hash;
+    a hit is rebuilt into a User and merged into the request's session
+    without a SELECT, so handlers can still modify and commit it. Entries expire after ``ttl``
+    seconds and are dropped explicitly when a user is modified. With the
+    in-process backend that only reaches the local worker, so the TTL bounds
+    staleness elsewhere; the Redis backend shares entries and invalidations
+    between workers.
+    """
+
+    def __init__(self, ttl: int, max_size: int, backend: str = "memory", redis_url: Optional[str] = None):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.backend = backend
+        self.redis_url = redis_url
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # user id -> (expires at, JSON)
+        self._lock = threading.Lock()
+        self._redis = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.errors = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_size > 0
+
+    def _get_redis(self):
+        if self._redis is None:
+            import redis.asyncio as redis
+            self._redis = redis.from_url(self.redis_url)
+        return self._redis
+
+    async def get(self, db: AsyncSession, user_id: str) -> Optional[User]:
+        """
+        Cached user attached to the given session, or None on a miss.
+
+        Args:
+            db: Session of the current request
+            user_id: User id from the access token
+
+        Returns:
+            Persistent User instance, or None
+        """
+        if not self.enabled:
+            return None
+
+        values = await self._lookup(str(user_id))
+        if values is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return await db.merge(self._build_user(values), load=False)
+
+    async def set(self, user: User):
+        """Cache a user loaded from the database."""
+        if not self.enabled:
+            return
+
+        user_id = str(user.id)
+        payload = self._encode(user)
+
+        if self.backend == "redis":
+            try:
+                await self._get_redis().set(REDIS_KEY_PREFIX + user_id, payload, ex=self.ttl)
+            except Exception as e:
+                self.errors += 1
+                print(f"User cache write failed: {e}")
+            return
+
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + self.ttl, payload)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    async def invalidate(self, user_id: Any):
+        """Drop a user's entry after their row changed."""
+        user_id = str(user_id)
+
+        if self.backend == "redis":
+            try:
+                await self._get_redis().delete(REDIS_KEY_PREFIX + user_id)
+            except Exception as e:
+                self.errors += 1
+                print(f"User cache invalidation failed: {e}")
+            return
+
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    async def _lookup(self, user_id: str) -> Optional[Dict[str, Any]]:
+        if self.backend == "redis":
+            try:
+                payload = await self._get_redis().get(REDIS_KEY_PREFIX + user_id)
+            except Exception as e:
+                self.errors += 1
+                print(f"User cache read failed: {e}")
+                return None
+            return self._decode(payload) if payload is not None else None
+
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            expires_at, payload = entry
+            if expires_at <= time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+
+        # Decoding yields fresh objects, so in-place edits of JSON columns never reach the cache
+        return self._decode(payload)
+
+    def _encode(self, user: User) -> str:
+        """JSON of a user's cacheable columns: UUIDs as str, datetimes as ISO 8601, enums by value."""
+        values = {}
+        for attr in inspect(User).column_attrs:
+            if attr.key in UNCACHED_COLUMNS:
+                continue
+            value = getattr(user, attr.key)
+            if isinstance(value, uuid.UUID):
+                value = str(value)
+            elif isinstance(value, datetime):
+                value = value.isoformat()
+            elif isinstance(value, enum.Enum):
+                value = value.value
+            values[attr.key] = value
+        return json.dumps(values)
+
+    def _decode(self, payload: Any) -> Dict[str, Any]:
+        """Column values from _encode's JSON, converted back by column type."""
+        values = json.loads(payload)
+        for attr in inspect(User).column_attrs:
+            value = values.get(attr.key)
+            if value is None:
+                continue
+            column_type = attr.columns[0].type
+            if isinstance(column_type, UUID):
+                values[attr.key] = uuid.UUID(value)
+            elif isinstance(column_type, DateTime):
+                values[attr.key] = datetime.fromisoformat(value)
+            elif isinstance(column_type, Enum) and column_type.enum_class is not None:
+                values[attr.key] = column_type.enum_class(value)
+        return values
+
+    def _build_user(self, values: Dict[str, Any]) -> User:
+        """Detached User whose loaded state is the cached values."""
+        user = inspect(User).class_manager.new_instance()
+        for key, value in values.items():
+            set_committed_value(user, key, value)
+        make_transient_to_detached(user)
+        return user
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and size of the cache."""
+        lookups = self.hits + self.misses
+        return {
+            "backend": self.backend,
+            "ttl_seconds": self.ttl,
+            "max_size": self.max_size,
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "errors": self.errors
+        }
+
+# Global user cache instance
+user_cache = UserCache(
+    ttl=settings.user_cache_ttl,
+    max_size=settings.user_cache_max_size,
+    backend=settings.user_cache_backend,
+    redis_url=settings.redis_url
+)
@@ -11,9 +11,13 @@ from app.models import init_db
 from app.api.v1 import api_router
 from app.middleware.performance import PerformanceMiddleware
 from app.models.user import User, UserType
-from app.core.security import get_password_hash
+from app.core.security import get_password_hash_async
 from app.models.database import get_db_session
 from sqlalchemy.future import select
+from app.ml.models import model_manager
+from app.ml.training import training_executor
+from app.services.view_counter import view_count_buffer
+from app.services.realtime import manager as realtime_manager
 
 
 # Adjust DATABASE_URL for async driver
@@ -39,7 +43,7 @@ async def create_admin_user():
 
         result = await db.execute(select(User).filter(User.email == admin_email))
         if result.scalar_one_or_none() is None:
-            hashed_password = get_password_hash(admin_password)
+            hashed_password = await get_password_hash_async(admin_password)
             admin_user = User(
                 email=admin_email,
                 password_hash=hashed_password,
@@ -53,6 +57,16 @@ async def create_admin_user():
             await db.commit()
             print(f"Admin user {admin_email} created.")
 
+def load_active_model():
+    """Warm-load the registry's active ML model so matching survives restarts."""
+    try:
+        if model_manager.load_active_model():
+            print(f"Loaded ML model {model_manager.active_model_name} ({model_manager.active_model.version})")
+        else:
+            print("No active ML model in registry, using rule-based matching.")
+    except Exception as e:
+        print(f"Failed to load ML model from registry: {e}")
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
@@ -60,9 +74,15 @@ async def lifespan(app: FastAPI):
     await init_db()
     await create_admin_user()
     print("Database initialized successfully")
+    load_active_model()
+    view_count_buffer.start()
+    await realtime_manager.start()
     yield
     # Shutdown
     print("Shutting down Paired Backend API...")
+    await realtime_manager.stop()
+    await view_count_buffer.stop()
+    training_executor.shutdown()
 
 # Create FastAPI app
 app = FastAPI(
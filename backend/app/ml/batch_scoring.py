@@ -0,0 +1,124 @@
+import numpy as np
+from dataclasses import dataclass
+from typing import Any, Optional, Sequence
+
+from app.models.user import User
+
+
+def _as_number(value: Any) -> float:
+    """Return a numeric preference value, or NaN when it is unset/falsy."""
+    if value and isinstance(value, (int, float)):
+        return float(value)
+    return np.nan
+
+
+@dataclass
+class UserBatch:
+    """Column-oriented view of the user fields used by rule-based matching."""
+    budget: np.ndarray  # NaN when not set
+    cleanliness: np.ndarray  # NaN when not set
+    verified_identity: np.ndarray
+    background_checked: np.ndarray
+    completion: np.ndarray
+    is_smoker: np.ndarray
+    allows_smoking: np.ndarray
+    has_pets: np.ndarray
+    allows_pets: np.ndarray
+
+    @classmethod
+    def from_users(cls, users: Sequence[User]) -> "UserBatch":
+        """Pack users into arrays, reading each JSON column exactly once."""
+        preferences = [user.preferences or {} for user in users]
+        lifestyles = [user.lifestyle_data or {} for user in users]
+
+        return cls(
+            budget=np.array([_as_number(p.get("budget")) for p in preferences], dtype=np.float64),
+            cleanliness=np.array([_as_number(l.get("cleanliness")) for l in lifestyles], dtype=np.float64),
+            verified_identity=np.array([bool(u.is_verified_identity) for u in users], dtype=bool),
+            background_checked=np.array([bool(u.is_background_checked) for u in users], dtype=bool),
+            completion=np.array([u.profile_completion_score or 0 for u in users], dtype=np.float64),
+            is_smoker=np.array([bool(l.get("is_smoker", False)) for l in lifestyles], dtype=bool),
+            allows_smoking=np.array([bool(l.get("allows_smoking", True)) for l in lifestyles], dtype=bool),
+            has_pets=np.array([bool(l.get("has_pets", False)) for l in lifestyles], dtype=bool),
+            allows_pets=np.array([bool(l.get("allows_pets", True)) for l in lifestyles], dtype=bool),
+        )
+
+    def __len__(self) -> int:
+        return len(self.budget)
+
+
+class BatchScorer:
+    """
+    Vectorized twin of MatchingService's per-pair rules.
+
+    Every formula below mirrors the scalar implementation operation for
+    operation, so scores and rankings are identical to the Python loop.
+    Keep both in sync when the rules change.
+    """
+
+    def passes_advanced_filters(self, user: UserBatch, candidates: UserBatch) -> np.ndarray:
+        """Boolean mask of candidates that pass the hard budget and deal-breaker filters."""
+        both_budgets = ~np.isnan(user.budget) & ~np.isnan(candidates.budget)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            budget_ratio = np.abs(user.budget - candidates.budget) / np.maximum(user.budget, candidates.budget)
+        budget_ok = ~(both_budgets & (budget_ratio > 0.5))
+
+        smoking_ok = ~(user.is_smoker & ~candidates.allows_smoking)
+        pets_ok = ~(user.has_pets & ~candidates.allows_pets)
+
+        return budget_ok & smoking_ok & pets_ok
+
+    def rule_based_scores(self, user: UserBatch, candidates: UserBatch) -> np.ndarray:
+        """Rule-based compatibility for the user against every candidate."""
+        n = len(candidates)
+        score = np.zeros(n, dtype=np.float64)
+        total_weight = np.zeros(n, dtype=np.float64)
+
+        # Budget alignment (weight: 30)
+        has_budget = ~np.isnan(user.budget) & ~np.isnan(candidates.budget)
+        budget_score = np.maximum(0, 1 - (np.abs(user.budget - candidates.budget) / 1000))
+        score += np.where(has_budget, budget_score * 30, 0.0)
+        total_weight += np.where(has_budget, 30, 0)
+
+        # Lifestyle cleanliness (weight: 20)
+        has_cleanliness = ~np.isnan(user.cleanliness) & ~np.isnan(candidates.cleanliness)
+        cleanliness_score = np.maximum(0, 1 - (np.abs(user.cleanliness - candidates.cleanliness) / 4))
+        score += np.where(has_cleanliness, cleanliness_score * 20, 0.0)
+        total_weight += np.where(has_cleanliness, 20, 0)
+
+        # Verification bonus (weight: 15)
+        verification_score = (
+            np.where(user.verified_identity, 0.5, 0)
+            + np.where(candidates.verified_identity, 0.5, 0)
+            + np.where(user.background_checked, 0.25, 0)
+            + np.where(candidates.background_checked, 0.25, 0)
+        )
+        score += verification_score * 15
+        total_weight += 15
+
+        # Profile completion bonus (weight: 10)
+        profile_score = (user.completion + candidates.completion) / 200.0
+        score += profile_score * 10
+        total_weight += 10
+
+        return score / total_weight
+
+    def dynamic_thresholds(self, user: UserBatch, candidates: UserBatch) -> np.ndarray:
+        """Per-candidate acceptance threshold based on verification and completion."""
+        verification_bonus = (
+            np.where(user.verified_identity & candidates.verified_identity, 0.1, 0)
+            + np.where(user.background_checked & candidates.background_checked, 0.1, 0)
+        )
+
+        avg_completion = (user.completion + candidates.completion) / 2
+        profile_bonus = np.where(avg_completion > 80, 0.1, np.where(avg_completion > 60, 0.05, 0))
+
+        return np.maximum(0.3, 0.5 - verification_bonus - profile_bonus)
+
+    def rank(self, scores: np.ndarray, mask: Optional[np.ndarray] = None) -> np.ndarray:
+        """Indices of masked entries sorted by descending score, ties kept in input order."""
+        indices = np.arange(len(scores)) if mask is None else np.flatnonzero(mask)
+        order = np.argsort(-scores[indices], kind="stable")
+        return indices[order]
+
+batch_scorer = BatchScorer()
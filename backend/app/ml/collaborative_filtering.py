@@ -1,267 +1,328 @@
 import numpy as np
-import pandas as pd
-from sklearn.metrics.pairwise import cosine_similarity
+import time
+from scipy import sparse
 from sklearn.decomposition import NMF
 from typing import Dict, List, Tuple, Any, Optional
 from collections import defaultdict
 import asyncio
 
+from app.ml.neighbors import NeighborIndex
+
+# Buffered online updates, as a fraction of the ratings in the base
+# matrices, before they are merged into them
+COMPACT_FRACTION = 0.05
+
+_EMPTY_INDICES = np.empty(0, dtype=np.int32)
+_EMPTY_DATA = np.empty(0, dtype=np.float32)
+
+def _grow(array: np.ndarray, n_rows: int) -> np.ndarray:
+    """Zero-padded copy with room for n_rows rows, growing capacity geometrically."""
+    if len(array) >= n_rows:
+        return array
+    grown = np.zeros((max(n_rows, 2 * len(array)),) + array.shape[1:], dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
+
 class CollaborativeFiltering:
     """Collaborative filtering for roommate matching recommendations."""
-    
-    def __init__(self):
-        self.user_similarity_matrix = None
-        self.user_item_matrix = None
+
+    def __init__(self, n_neighbors: int = 50):
+        self.user_item_matrix = None  # scipy CSR, users x targets, as of the last fit or compaction
+        self.target_user_matrix = None  # CSC copy of the same ratings: raters per target
+        self.pending_rows = {}  # user index -> {target index: rating} updated since
+        self.pending_columns = {}  # target index -> {user index: rating}, the same updates by target
+        self.pending_ratings = 0
         self.user_index_map = {}
         self.index_user_map = {}
+        self.target_index_map = {}
+        self.index_target_map = {}
+        self.user_neighbors = NeighborIndex(n_neighbors)
+        self.user_norms = None
+        self.item_neighbors = NeighborIndex(n_neighbors)
+        self.item_norms = None
         self.nmf_model = None
+        self.user_factors = None  # NMF W, one row per user
+        self.fit_time = None
+        self.interaction_log = []  # (user_id, target_id, rating) applied since the last fit
+        self.fitted_ratings = 0
         self.is_fitted = False
-    
-    def prepare_interaction_matrix(self, interactions: List[Dict[str, Any]]) -> pd.DataFrame:
+
+    def prepare_interaction_matrix(
+        self,
+        interactions: List[Dict[str, Any]]
+    ) -> Tuple[sparse.csr_matrix, List[str], List[str]]:
         """
-        Prepare user-item interaction matrix from match data.
-        
+        Prepare sparse user-item interaction matrix from match data.
+
         Args:
             interactions: List of user interactions with ratings
                 Format: [{"user_id": str, "target_id": str, "rating": float}, ...]
-        
+
         Returns:
-            User-item interaction matrix
+            Tuple of (CSR matrix with users as rows and targets as columns,
+            user ids by row, target ids by column). Repeated (user, target)
+            pairs are averaged.
         """
-        # Create interaction dataframe
-        df = pd.DataFrame(interactions)
-        
-        if df.empty:
-            return pd.DataFrame()
-        
-        # Create user-item matrix (users as rows, target users as columns)
-        interaction_matrix = df.pivot_table(
-            index='user_id',
-            columns='target_id', 
-            values='rating',
-            fill_value=0
-        )
-        
-        return interaction_matrix
-    
+        user_index: Dict[str, int] = {}
+        target_index: Dict[str, int] = {}
+        rows = np.empty(len(interactions), dtype=np.int32)
+        cols = np.empty(len(interactions), dtype=np.int32)
+        ratings = np.empty(len(interactions), dtype=np.float64)
+
+        for i, interaction in enumerate(interactions):
+            rows[i] = user_index.setdefault(interaction['user_id'], len(user_index))
+            cols[i] = target_index.setdefault(interaction['target_id'], len(target_index))
+            ratings[i] = interaction['rating']
+
+        shape = (len(user_index), len(target_index))
+
+        # Duplicates are summed on conversion, so divide by their counts to average
+        totals = sparse.csr_matrix((ratings, (rows, cols)), shape=shape)
+        counts = sparse.csr_matrix((np.ones_like(ratings), (rows, cols)), shape=shape)
+        totals.data /= counts.data
+
+        interaction_matrix = totals.astype(np.float32)
+        interaction_matrix.eliminate_zeros()
+        interaction_matrix.sort_indices()
+
+        return interaction_matrix, list(user_index), list(target_index)
+
     def fit(self, interactions: List[Dict[str, Any]]):
         """
         Fit the collaborative filtering model.
-        
+
         Args:
             interactions: User interaction data with ratings
         """
-        self.user_item_matrix = self.prepare_interaction_matrix(interactions)
-        
-        if self.user_item_matrix.empty:
+        start = time.perf_counter()
+
+        matrix, user_ids, target_ids = self.prepare_interaction_matrix(interactions)
+
+        if matrix.nnz == 0:
             raise ValueError("No interaction data available for training")
-        
-        # Create user index mapping
-        self.user_index_map = {user: idx for idx, user in enumerate(self.user_item_matrix.index)}
-        self.index_user_map = {idx: user for user, idx in self.user_index_map.items()}
-        
-        # Calculate user similarity matrix
-        self.user_similarity_matrix = cosine_similarity(self.user_item_matrix.values)
-        
+
+        self.user_item_matrix = matrix
+        self.target_user_matrix = matrix.tocsc()
+        self.target_user_matrix.sort_indices()
+        self.pending_rows = {}
+        self.pending_columns = {}
+        self.pending_ratings = 0
+
+        # Create user and target index mappings
+        self.user_index_map = {user: idx for idx, user in enumerate(user_ids)}
+        self.index_user_map = dict(enumerate(user_ids))
+        self.target_index_map = {target: idx for idx, target in enumerate(target_ids)}
+        self.index_target_map = dict(enumerate(target_ids))
+
+        # Keep only the top-k most similar users per user
+        self.user_norms = np.sqrt(matrix.multiply(matrix).sum(axis=1)).A1.astype(np.float32)
+        self.user_neighbors.build(matrix)
+
+        # Same for targets, for item-based scoring
+        self.item_norms = np.sqrt(matrix.multiply(matrix).sum(axis=0)).A1.astype(np.float32)
+        self.item_neighbors.build(matrix.T)
+
         # Fit NMF model for matrix factorization
         self.nmf_model = NMF(n_components=min(10, len(self.user_index_map)), random_state=42)
-        self.nmf_model.fit(self.user_item_matrix.values)
-        
+        self.user_factors = self.nmf_model.fit_transform(matrix)
+
+        self.interaction_log = []
+        self.fitted_ratings = matrix.nnz
+        self.fit_time = time.perf_counter() - start
         self.is_fitted = True
-    
+
     def get_user_based_recommendations(
-        self, 
-        user_id: str, 
+        self,
+        user_id: str,
         n_recommendations: int = 10,
         min_similarity: float = 0.1
     ) -> List[Tuple[str, float]]:
         """
         Get recommendations based on similar users' preferences.
-        
+
         Args:
             user_id: Target user ID
             n_recommendations: Number of recommendations
             min_similarity: Minimum similarity threshold
-            
+
         Returns:
             List of (recommended_user_id, predicted_rating) tuples
         """
         if not self.is_fitted:
             raise ValueError("Model must be fitted before making recommendations")
-        
+
         if user_id not in self.user_index_map:
             return []  # New user, no recommendations yet
-        
+
         user_idx = self.user_index_map[user_id]
-        user_similarities = self.user_similarity_matrix[user_idx]
-        
-        # Get similar users
-        similar_users = []
-        for idx, similarity in enumerate(user_similarities):
-            if idx != user_idx and similarity > min_similarity:
-                similar_users.append((idx, similarity))
-        
-        # Sort by similarity
-        similar_users.sort(key=lambda x: x[1], reverse=True)
-        
-        # Get recommendations based on similar users
-        recommendations = defaultdict(float)
-        total_similarity = defaultdict(float)
-        
-        user_ratings = self.user_item_matrix.iloc[user_idx]
-        
-        for similar_idx, similarity in similar_users[:20]:  # Top 20 similar users
-            similar_user_ratings = self.user_item_matrix.iloc[similar_idx]
-            
-            for target_user, rating in similar_user_ratings.items():
-                if rating > 0 and user_ratings[target_user] == 0:  # Not rated by target user
-                    recommendations[target_user] += similarity * rating
-                    total_similarity[target_user] += similarity
-        
-        # Normalize recommendations
-        final_recommendations = []
-        for target_user, weighted_sum in recommendations.items():
-            if total_similarity[target_user] > 0:
-                predicted_rating = weighted_sum / total_similarity[target_user]
-                final_recommendations.append((target_user, predicted_rating))
-        
-        # Sort and return top N
-        final_recommendations.sort(key=lambda x: x[1], reverse=True)
-        return final_recommendations[:n_recommendations]
-    
+
+        # Neighbors are stored in descending similarity order
+        neighbors, similarities = self.user_neighbors.neighbors(user_idx, min_similarity, inclusive=False)
+        neighbors = neighbors[:20]  # Top 20 similar users
+        similarities = similarities[:20].astype(np.float64)
+
+        if len(neighbors) == 0:
+            return []
+
+        # Similarity-weighted ratings and total similarity per target
+        rows = [self._row(neighbor) for neighbor in neighbors]
+        targets = np.concatenate([indices for indices, _ in rows])
+        ratings = np.concatenate([data for _, data in rows]).astype(np.float64)
+        weights = np.repeat(similarities, [len(indices) for indices, _ in rows])
+        n_targets = len(self.index_target_map)
+        weighted_sums = np.bincount(targets, weights=ratings * weights, minlength=n_targets)
+        total_similarity = np.bincount(targets, weights=(ratings > 0) * weights, minlength=n_targets)
+
+        # Only targets some neighbor rated and the user has not
+        candidates = total_similarity > 0
+        candidates[self._row(user_idx)[0]] = False
+        candidate_idx = np.flatnonzero(candidates)
+
+        predicted = weighted_sums[candidate_idx] / total_similarity[candidate_idx]
+        return self._top_targets(candidate_idx, predicted, n_recommendations)
+
+    def _top_targets(
+        self,
+        target_idx: np.ndarray,
+        scores: np.ndarray,
+        n: int
+    ) -> List[Tuple[str, float]]:
+        """Map the n highest-scoring target columns back to (target_id, score) pairs."""
+        if n < len(scores):
+            top = np.argpartition(-scores, n - 1)[:n]
+        else:
+            top = np.arange(len(scores))
+        order = top[np.argsort(-scores[top], kind='stable')]
+        return [(self.index_target_map[target_idx[i]], float(scores[i])) for i in order]
+
     def get_matrix_factorization_recommendations(
-        self, 
-        user_id: str, 
+        self,
+        user_id: str,
         n_recommendations: int = 10
     ) -> List[Tuple[str, float]]:
         """
         Get recommendations using matrix factorization (NMF).
-        
+
         Args:
             user_id: Target user ID
             n_recommendations: Number of recommendations
-            
+
         Returns:
             List of (recommended_user_id, predicted_rating) tuples
         """
         if not self.is_fitted or self.nmf_model is None:
             raise ValueError("Model must be fitted before making recommendations")
-        
+
         if user_id not in self.user_index_map:
             return []
-        
+
         user_idx = self.user_index_map[user_id]
-        
-        # Get user factors
-        user_factors = self.nmf_model.transform(self.user_item_matrix.values)
-        item_factors = self.nmf_model.components_
-        
-        # Predict ratings for all items
-        predicted_ratings = user_factors[user_idx] @ item_factors
-        
-        # Get unrated items
-        user_ratings = self.user_item_matrix.iloc[user_idx]
-        recommendations = []
-        
-        for idx, predicted_rating in enumerate(predicted_ratings):
-            target_user = self.user_item_matrix.columns[idx]
-            if user_ratings.iloc[idx] == 0:  # Unrated item
-                recommendations.append((target_user, predicted_rating))
-        
-        # Sort and return top N
-        recommendations.sort(key=lambda x: x[1], reverse=True)
-        return recommendations[:n_recommendations]
-    
+
+        # Predict ratings for all items from the cached user factors; targets
+        # first seen after the fit have no factors and predict 0
+        components = self.nmf_model.components_
+        predicted_ratings = np.zeros(len(self.index_target_map))
+        predicted_ratings[:components.shape[1]] = self.user_factors[user_idx] @ components
+
+        # Only unrated items
+        rated, ratings = self._row(user_idx)
+        unrated = np.ones(len(predicted_ratings), dtype=bool)
+        unrated[rated[ratings != 0]] = False
+        candidate_idx = np.flatnonzero(unrated)
+
+        return self._top_targets(candidate_idx, predicted_ratings[candidate_idx], n_recommendations)
+
     def get_hybrid_recommendations(
-        self, 
-        user_id: str, 
+        self,
+        user_id: str,
         n_recommendations: int = 10,
         user_based_weight: float = 0.7
     ) -> List[Tuple[str, float]]:
         """
         Get hybrid recommendations combining user-based and matrix factorization.
-        
+
         Args:
             user_id: Target user ID
             n_recommendations: Number of recommendations
             user_based_weight: Weight for user-based recommendations
-            
+
         Returns:
             List of (recommended_user_id, score) tuples
         """
         if not self.is_fitted:
             return []
-        
+
         # Get recommendations from both methods
         user_based_recs = self.get_user_based_recommendations(user_id, n_recommendations * 2)
         mf_recs = self.get_matrix_factorization_recommendations(user_id, n_recommendations * 2)
-        
+
         # Combine recommendations
         combined_scores = defaultdict(float)
-        
+
         # Add user-based scores
         for target_user, score in user_based_recs:
             combined_scores[target_user] += user_based_weight * score
-        
+
         # Add matrix factorization scores
         mf_weight = 1.0 - user_based_weight
         for target_user, score in mf_recs:
             combined_scores[target_user] += mf_weight * score
-        
+
         # Sort and return top N
         final_recommendations = list(combined_scores.items())
         final_recommendations.sort(key=lambda x: x[1], reverse=True)
-        
+
         return final_recommendations[:n_recommendations]
-    
+
     def get_item_based_recommendations(
-        self, 
-        user_id: str, 
+        self,
+        user_id: str,
         n_recommendations: int = 10
     ) -> List[Tuple[str, float]]:
         """
         Get recommendations based on item (user) similarity.
-        
+
         Args:
             user_id: Target user ID
             n_recommendations: Number of recommendations
-            
+
         Returns:
             List of (recommended_user_id, score) tuples
         """
         if not self.is_fitted:
             return []
-        
+
         if user_id not in self.user_index_map:
             return []
-        
-        # Calculate item similarity matrix (transpose of user-item matrix)
-        item_similarity = cosine_similarity(self.user_item_matrix.T.values)
-        
-        user_ratings = self.user_item_matrix.loc[user_id]
-        recommendations = defaultdict(float)
-        
-        # For each item the user has rated
-        for item_idx, rating in enumerate(user_ratings):
-            if rating > 0:
-                # Find similar items
-                item_similarities = item_similarity[item_idx]
-                
-                for similar_item_idx, similarity in enumerate(item_similarities):
-                    if similar_item_idx != item_idx and user_ratings.iloc[similar_item_idx] == 0:
-                        similar_item = self.user_item_matrix.columns[similar_item_idx]
-                        recommendations[similar_item] += similarity * rating
-        
-        # Sort and return top N
-        final_recommendations = list(recommendations.items())
-        final_recommendations.sort(key=lambda x: x[1], reverse=True)
-        
-        return final_recommendations[:n_recommendations]
-    
+
+        # Sum of similarity * rating over the top-k neighbors of the items the user has rated
+        rated, ratings = self._row(self.user_index_map[user_id])
+        neighbors = self.item_neighbors.indices[rated]
+        weighted = ratings[:, np.newaxis].astype(np.float64) * self.item_neighbors.scores[rated]
+        valid = neighbors >= 0
+        scores = np.bincount(neighbors[valid], weights=weighted[valid], minlength=len(self.index_target_map))
+
+        # Only unrated items
+        unrated = np.ones(len(scores), dtype=bool)
+        unrated[rated[ratings != 0]] = False
+        candidate_idx = np.flatnonzero(unrated)
+
+        return self._top_targets(candidate_idx, scores[candidate_idx], n_recommendations)
+
     def update_user_interaction(self, user_id: str, target_id: str, rating: float):
         """
-        Update the interaction matrix with new user feedback.
-        
+        Update the model with new user feedback.
+
+        Unknown users and targets are added to the model. The rating is
+        buffered per row and per column next to the base matrices rather
+        than written into them, since inserting into CSR/CSC arrays
+        reallocates them; reads merge the buffer into the row or column
+        they touch, and the buffer is merged into the base matrices by
+        compact once it grows. Only the rows the rating touches are
+        recomputed: the user's neighbors and NMF factors, the target's item
+        neighbors, and the neighbor lists of users and targets that share a
+        rating with them.
+
         Args:
             user_id: User who gave the rating
             target_id: Target user being rated
@@ -269,33 +330,265 @@ class CollaborativeFiltering:
         """
         if not self.is_fitted:
             return
-        
-        # Add to interaction matrix if users exist
-        if user_id in self.user_item_matrix.index and target_id in self.user_item_matrix.columns:
-            self.user_item_matrix.loc[user_id, target_id] = rating
-            
-            # Recalculate user similarity for the updated user
-            user_idx = self.user_index_map[user_id]
-            user_similarities = cosine_similarity(
-                self.user_item_matrix.iloc[[user_idx]].values,
-                self.user_item_matrix.values
-            )[0]
-            self.user_similarity_matrix[user_idx] = user_similarities
-            self.user_similarity_matrix[:, user_idx] = user_similarities
-    
+
+        self.interaction_log.append((user_id, target_id, rating))
+
+        user_idx = self.user_index_map.get(user_id)
+        if user_idx is None:
+            user_idx = self._add_user(user_id)
+
+        target_idx = self.target_index_map.get(target_id)
+        if target_idx is None:
+            target_idx = self._add_target(target_id)
+
+        row = self.pending_rows.setdefault(user_idx, {})
+        if target_idx not in row:
+            self.pending_ratings += 1
+        row[target_idx] = rating
+        self.pending_columns.setdefault(target_idx, {})[user_idx] = rating
+
+        self._refresh_user(user_idx)
+        self._refresh_item(target_idx)
+
+        if self.pending_ratings > COMPACT_FRACTION * max(self.user_item_matrix.nnz, 1):
+            self.compact()
+
+    def _add_user(self, user_id: str) -> int:
+        """Add a user first seen after fitting; their ratings live in the buffer until compaction."""
+        user_idx = len(self.index_user_map)
+        self.user_index_map[user_id] = user_idx
+        self.index_user_map[user_idx] = user_id
+
+        self.user_norms = _grow(self.user_norms, user_idx + 1)
+        self.user_neighbors.add_rows(user_idx + 1)
+        self.user_factors = _grow(self.user_factors, user_idx + 1)
+        return user_idx
+
+    def _add_target(self, target_id: str) -> int:
+        """Add a target first seen after fitting; it has no latent factors until the next refit."""
+        target_idx = len(self.index_target_map)
+        self.target_index_map[target_id] = target_idx
+        self.index_target_map[target_idx] = target_id
+
+        self.item_norms = _grow(self.item_norms, target_idx + 1)
+        self.item_neighbors.add_rows(target_idx + 1)
+        return target_idx
+
+    def _merge(self, indices: np.ndarray, data: np.ndarray, pending: Optional[Dict[int, float]]) -> Tuple[np.ndarray, np.ndarray]:
+        """Overlay buffered ratings on one base row or column, keeping indices sorted."""
+        if not pending:
+            return indices, data
+        pending_indices = np.fromiter(pending.keys(), dtype=np.int32, count=len(pending))
+        pending_data = np.fromiter(pending.values(), dtype=np.float32, count=len(pending))
+        keep = ~np.isin(indices, pending_indices)
+        indices = np.concatenate([indices[keep], pending_indices])
+        data = np.concatenate([data[keep], pending_data])
+        order = np.argsort(indices, kind='stable')
+        return indices[order], data[order]
+
+    def _line(self, matrix: sparse.spmatrix, line: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Indices and values of one row of a CSR matrix, or column of a CSC matrix."""
+        if line >= len(matrix.indptr) - 1:
+            return _EMPTY_INDICES, _EMPTY_DATA
+        start, end = matrix.indptr[line], matrix.indptr[line + 1]
+        return matrix.indices[start:end], matrix.data[start:end]
+
+    def _row(self, user_idx: int) -> Tuple[np.ndarray, np.ndarray]:
+        """A user's current ratings: (target indices, ratings)."""
+        return self._merge(*self._line(self.user_item_matrix, user_idx), self.pending_rows.get(user_idx))
+
+    def _column(self, target_idx: int) -> Tuple[np.ndarray, np.ndarray]:
+        """A target's current ratings: (user indices, ratings)."""
+        return self._merge(*self._line(self.target_user_matrix, target_idx), self.pending_columns.get(target_idx))
+
+    def _dots(
+        self,
+        lines_matrix: sparse.csr_matrix,
+        pending: Dict[int, Dict[int, float]],
+        lines: np.ndarray,
+        weights: np.ndarray,
+        length: int
+    ) -> np.ndarray:
+        """
+        Weighted sum of some lines of the current ratings.
+
+        The base part is one sparse product over the selected rows of
+        lines_matrix; buffered ratings on those lines are then applied as
+        corrections, so the cost follows the lines' nnz and the buffer, not
+        the whole matrix.
+        """
+        dots = np.zeros(length)
+        in_base = lines < lines_matrix.shape[0]
+        if in_base.any():
+            base = lines_matrix[lines[in_base]].T @ weights[in_base].astype(np.float64)
+            dots[:len(base)] = base
+
+        if pending:
+            weight_by_line = dict(zip(lines.tolist(), weights.tolist()))
+            for line in pending.keys() & weight_by_line.keys():
+                base_indices, base_data = self._line(lines_matrix, line)
+                for position, value in pending[line].items():
+                    found = np.searchsorted(base_indices, position)
+                    previous = base_data[found] if found < len(base_indices) and base_indices[found] == position else 0.0
+                    dots[position] += (value - previous) * weight_by_line[line]
+        return dots
+
+    def _user_similarities(self, user_idx: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Cosine similarity of a user to every user sharing a rated target: (similarities, user indices)."""
+        targets, ratings = self._row(user_idx)
+
+        # Only users who rated one of the same targets can have a non-zero similarity
+        dots = self._dots(self.target_user_matrix.T, self.pending_columns, targets, ratings, len(self.index_user_map))
+        candidates = np.flatnonzero(dots)
+        candidates = candidates[candidates != user_idx]
+        similarities = (dots[candidates] / (self.user_norms[candidates] * self.user_norms[user_idx])).astype(np.float32)
+        return similarities, candidates
+
+    def _item_similarities(self, target_idx: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Cosine similarity of a target to every target sharing a rater: (similarities, target indices)."""
+        raters, ratings = self._column(target_idx)
+
+        # Only targets rated by one of the same users can have a non-zero similarity
+        dots = self._dots(self.user_item_matrix, self.pending_rows, raters, ratings, len(self.index_target_map))
+        candidates = np.flatnonzero(dots)
+        candidates = candidates[candidates != target_idx]
+        similarities = (dots[candidates] / (self.item_norms[candidates] * self.item_norms[target_idx])).astype(np.float32)
+        return similarities, candidates
+
+    def _refresh_user(self, user_idx: int):
+        """Recompute a user's neighbors and factors after their row changed."""
+        targets, ratings = self._row(user_idx)
+        self.user_norms[user_idx] = np.linalg.norm(ratings)
+
+        similarities, candidates = self._user_similarities(user_idx)
+        self.user_neighbors.set_row(user_idx, similarities, candidates)
+        for other_idx, similarity in zip(candidates, similarities):
+            self.user_neighbors.update_pair(other_idx, user_idx, similarity, recompute=self._user_similarities)
+
+        # Fold the updated row into the factor model with the item factors fixed
+        n_factored = self.nmf_model.components_.shape[1]
+        factored = targets < n_factored
+        user_row = sparse.csr_matrix(
+            (ratings[factored], targets[factored], [0, int(factored.sum())]),
+            shape=(1, n_factored)
+        )
+        self.user_factors[user_idx] = self.nmf_model.transform(user_row)[0]
+
+    def _refresh_item(self, target_idx: int):
+        """Recompute a target's item neighbors after its column changed."""
+        self.item_norms[target_idx] = np.linalg.norm(self._column(target_idx)[1])
+
+        similarities, candidates = self._item_similarities(target_idx)
+        self.item_neighbors.set_row(target_idx, similarities, candidates)
+        for other_idx, similarity in zip(candidates, similarities):
+            self.item_neighbors.update_pair(other_idx, target_idx, similarity, recompute=self._item_similarities)
+
+    def compact(self):
+        """Merge buffered online updates into the base matrices."""
+        snapshot = self.interaction_snapshot()
+        rows, cols, data = self._merged_coo(snapshot)
+        shape = (len(self.index_user_map), len(self.index_target_map))
+
+        matrix = sparse.csr_matrix((data, (rows, cols)), shape=shape, dtype=np.float32)
+        matrix.sort_indices()
+        target_user_matrix = matrix.tocsc()
+        target_user_matrix.sort_indices()
+
+        self.user_item_matrix = matrix
+        self.target_user_matrix = target_user_matrix
+        self.pending_rows = {}
+        self.pending_columns = {}
+        self.pending_ratings = 0
+
+    @property
+    def drift(self) -> float:
+        """Interactions applied since the last fit, relative to the ratings it was fitted on."""
+        return len(self.interaction_log) / max(self.fitted_ratings, 1)
+
+    def interaction_snapshot(self) -> Dict[str, Any]:
+        """
+        The current ratings, for export_interactions to read from another thread.
+
+        The base matrix is never modified in place (compaction replaces it)
+        and the id maps only grow, so only the bounded update buffer is copied.
+        """
+        return {
+            "matrix": self.user_item_matrix,
+            "pending": [(u, t, r) for u, row in self.pending_rows.items() for t, r in row.items()],
+            "index_user_map": self.index_user_map,
+            "index_target_map": self.index_target_map
+        }
+
+    @staticmethod
+    def _merged_coo(snapshot: Dict[str, Any]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Base ratings with buffered updates applied, as (rows, cols, ratings) arrays."""
+        base = snapshot["matrix"].tocoo()
+        if not snapshot["pending"]:
+            return base.row, base.col, base.data
+
+        pending_rows, pending_cols, pending_data = (np.array(values) for values in zip(*snapshot["pending"]))
+        width = max(int(base.col.max(initial=0)), int(pending_cols.max())) + 1
+        overridden = np.isin(base.row.astype(np.int64) * width + base.col, pending_rows.astype(np.int64) * width + pending_cols)
+        return (
+            np.concatenate([base.row[~overridden], pending_rows]),
+            np.concatenate([base.col[~overridden], pending_cols]),
+            np.concatenate([base.data[~overridden], pending_data]).astype(np.float32)
+        )
+
+    def export_interactions(self, snapshot: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        Current ratings, including online updates, in the format accepted by fit.
+
+        Args:
+            snapshot: Result of interaction_snapshot; taken now if omitted
+        """
+        snapshot = snapshot or self.interaction_snapshot()
+        rows, cols, data = self._merged_coo(snapshot)
+        index_user_map, index_target_map = snapshot["index_user_map"], snapshot["index_target_map"]
+        return [
+            {"user_id": index_user_map[u], "target_id": index_target_map[t], "rating": float(r)}
+            for u, t, r in zip(rows.tolist(), cols.tolist(), data.tolist())
+            if r != 0
+        ]
+
+    def replace_with(self, model: "CollaborativeFiltering"):
+        """Take over the state of a model fitted elsewhere, e.g. by a background refit."""
+        self.__dict__.update(model.__dict__)
+
+    def _memory_usage(self) -> int:
+        """Bytes held by the interaction matrix, neighbor arrays and NMF factors."""
+        matrix = self.user_item_matrix
+        total = 0
+        for ratings in (matrix, self.target_user_matrix):
+            total += ratings.data.nbytes + ratings.indices.nbytes + ratings.indptr.nbytes
+        total += self.user_neighbors.nbytes + self.user_norms.nbytes
+        total += self.item_neighbors.nbytes + self.item_norms.nbytes
+        if self.nmf_model is not None:
+            total += self.nmf_model.components_.nbytes + self.user_factors.nbytes
+        return int(total)
+
     def get_model_stats(self) -> Dict[str, Any]:
         """Get statistics about the collaborative filtering model."""
         if not self.is_fitted:
             return {"status": "not_fitted"}
-        
+
+        n_users, n_items = len(self.index_user_map), len(self.index_target_map)
+        n_ratings = int((self._merged_coo(self.interaction_snapshot())[2] > 0).sum())
+
         return {
             "status": "fitted",
-            "n_users": len(self.user_index_map),
-            "n_items": self.user_item_matrix.shape[1],
-            "sparsity": 1.0 - (self.user_item_matrix.values > 0).sum() / self.user_item_matrix.size,
-            "avg_ratings_per_user": (self.user_item_matrix.values > 0).sum(axis=1).mean(),
-            "nmf_components": self.nmf_model.n_components if self.nmf_model else 0
+            "n_users": n_users,
+            "n_items": n_items,
+            "sparsity": 1.0 - n_ratings / (n_users * n_items),
+            "avg_ratings_per_user": n_ratings / n_users,
+            "nmf_components": self.nmf_model.n_components if self.nmf_model else 0,
+            "n_neighbors": self.user_neighbors.n_neighbors,
+            "memory_bytes": self._memory_usage(),
+            "fit_time_seconds": self.fit_time,
+            "updates_since_fit": len(self.interaction_log),
+            "pending_updates": self.pending_ratings,
+            "drift": self.drift
         }
 
 # Global collaborative filtering instance
-collaborative_filter = CollaborativeFiltering() 
\ No newline at end of file
+collaborative_filter = CollaborativeFiltering()
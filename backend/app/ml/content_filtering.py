@@ -1,12 +1,19 @@
 import numpy as np
 import pandas as pd
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
 from sklearn.preprocessing import StandardScaler
 from typing import Dict, List, Tuple, Any, Optional
 import re
 from datetime import datetime
 
+from app.ml.feature_store import user_feature_store
+from app.ml.neighbors import NeighborIndex
+
+# Columns of FeatureEngineer.extract_user_features used for content similarity:
+# demographics, verification, completion, preferences, lifestyle cleanliness,
+# pet/smoking flags and work schedule
+USER_FEATURE_COLUMNS = [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 15, 16, 17, 18, 14]
+
 class ContentBasedFiltering:
     """Content-based filtering for user and listing recommendations."""
     
@@ -15,8 +22,12 @@ class ContentBasedFiltering:
         self.listing_profiles = {}
         self.user_feature_matrix = None
         self.listing_feature_matrix = None
-        self.user_similarity_matrix = None
-        self.listing_similarity_matrix = None
+        self.user_ids = []
+        self.listing_ids = []
+        self.user_index_map = {}
+        self.listing_index_map = {}
+        self.user_neighbors = None
+        self.listing_neighbors = None
         self.tfidf_vectorizer = TfidfVectorizer(
             max_features=100,
             stop_words='english',
@@ -36,22 +47,14 @@ class ContentBasedFiltering:
             return
         
         self.user_profiles = {user['id']: user for user in users}
+        self.user_ids = list(self.user_profiles)
+        self.user_index_map = {user_id: idx for idx, user_id in enumerate(self.user_ids)}
         
-        # Extract features for each user
-        user_features = []
-        user_text_features = []
+        # Numerical features come from the shared per-user feature store
+        numerical_matrix = user_feature_store.get_matrix(users)[:, USER_FEATURE_COLUMNS].astype(np.float64)
         
-        for user in users:
-            # Numerical features
-            features = self._extract_user_numerical_features(user)
-            user_features.append(features)
-            
-            # Text features
-            text_content = self._extract_user_text_content(user)
-            user_text_features.append(text_content)
-        
-        # Convert to matrices
-        numerical_matrix = np.array(user_features)
+        # Text features
+        user_text_features = [self._extract_user_text_content(user) for user in users]
         
         # Scale numerical features
         if len(numerical_matrix) > 0:
@@ -68,9 +71,9 @@ class ContentBasedFiltering:
         else:
             self.user_feature_matrix = numerical_matrix
         
-        # Calculate similarity matrix
+        # Index the top-k most similar users per user
         if self.user_feature_matrix.size > 0:
-            self.user_similarity_matrix = cosine_similarity(self.user_feature_matrix)
+            self.user_neighbors = NeighborIndex().build(self.user_feature_matrix)
         
         self.is_fitted = True
     
@@ -85,6 +88,8 @@ class ContentBasedFiltering:
             return
         
         self.listing_profiles = {listing['id']: listing for listing in listings}
+        self.listing_ids = list(self.listing_profiles)
+        self.listing_index_map = {listing_id: idx for idx, listing_id in enumerate(self.listing_ids)}
         
         # Extract features for each listing
         listing_features = []
@@ -122,52 +127,9 @@ class ContentBasedFiltering:
         else:
             self.listing_feature_matrix = numerical_matrix
         
-        # Calculate similarity matrix
+        # Index the top-k most similar listings per listing
         if self.listing_feature_matrix.size > 0:
-            self.listing_similarity_matrix = cosine_similarity(self.listing_feature_matrix)
-    
-    def _extract_user_numerical_features(self, user: Dict[str, Any]) -> List[float]:
-        """Extract numerical features from user profile."""
-        features = []
-        
-        # Age
-        age = self._calculate_age(user.get('date_of_birth'))
-        features.append(age if age else 25)
-        
-        # User type encoding
-        user_type_mapping = {'seeker': 0, 'provider': 1, 'agent': 2}
-        features.append(user_type_mapping.get(user.get('user_type', 'seeker'), 0))
-        
-        # Verification features
-        features.append(float(user.get('is_verified_email', False)))
-        features.append(float(user.get('is_verified_phone', False)))
-        features.append(float(user.get('is_verified_identity', False)))
-        features.append(float(user.get('is_background_checked', False)))
-        
-        # Profile completion
-        features.append(user.get('profile_completion_score', 0) / 100.0)
-        
-        # Preferences
-        preferences = user.get('preferences', {})
-        features.append(preferences.get('budget', 1000) / 3000.0)  # Normalized budget
-        features.append(preferences.get('location_importance', 0.5))
-        features.append(preferences.get('cleanliness_importance', 3) / 5.0)
-        features.append(preferences.get('social_level', 3) / 5.0)
-        
-        # Lifestyle
-        lifestyle = user.get('lifestyle_data', {})
-        features.append(lifestyle.get('cleanliness', 3) / 5.0)
-        features.append(float(lifestyle.get('has_pets', False)))
-        features.append(float(lifestyle.get('allows_pets', True)))
-        features.append(float(lifestyle.get('is_smoker', False)))
-        features.append(float(lifestyle.get('allows_smoking', False)))
-        
-        # Work schedule encoding
-        work_schedule = lifestyle.get('work_schedule', 'flexible')
-        schedule_mapping = {'9-to-5': 0, 'remote': 1, 'flexible': 2, 'night': 3}
-        features.append(schedule_mapping.get(work_schedule, 2) / 3.0)
-        
-        return features
+            self.listing_neighbors = NeighborIndex().build(self.listing_feature_matrix)
     
     def _extract_user_text_content(self, user: Dict[str, Any]) -> str:
         """Extract text content from user profile for TF-IDF analysis."""
@@ -298,26 +260,12 @@ class ContentBasedFiltering:
         Returns:
             List of (user_id, similarity_score) tuples
         """
-        if not self.is_fitted or user_id not in self.user_profiles:
-            return []
-        
-        user_indices = list(self.user_profiles.keys())
-        if user_id not in user_indices:
+        if not self.is_fitted or user_id not in self.user_index_map or self.user_neighbors is None:
             return []
         
-        user_idx = user_indices.index(user_id)
-        user_similarities = self.user_similarity_matrix[user_idx]
-        
-        # Get similar users
-        similar_users = []
-        for idx, similarity in enumerate(user_similarities):
-            if idx != user_idx and similarity >= min_similarity:
-                similar_user_id = user_indices[idx]
-                similar_users.append((similar_user_id, similarity))
-        
-        # Sort by similarity and return top N
-        similar_users.sort(key=lambda x: x[1], reverse=True)
-        return similar_users[:n_recommendations]
+        return self.user_neighbors.similar(
+            self.user_index_map[user_id], self.user_ids, n_recommendations, min_similarity
+        )
     
     def get_similar_listings(
         self, 
@@ -336,23 +284,12 @@ class ContentBasedFiltering:
         Returns:
             List of (listing_id, similarity_score) tuples
         """
-        if listing_id not in self.listing_profiles or self.listing_similarity_matrix is None:
+        if listing_id not in self.listing_index_map or self.listing_neighbors is None:
             return []
         
-        listing_indices = list(self.listing_profiles.keys())
-        listing_idx = listing_indices.index(listing_id)
-        listing_similarities = self.listing_similarity_matrix[listing_idx]
-        
-        # Get similar listings
-        similar_listings = []
-        for idx, similarity in enumerate(listing_similarities):
-            if idx != listing_idx and similarity >= min_similarity:
-                similar_listing_id = listing_indices[idx]
-                similar_listings.append((similar_listing_id, similarity))
-        
-        # Sort by similarity and return top N
-        similar_listings.sort(key=lambda x: x[1], reverse=True)
-        return similar_listings[:n_recommendations]
+        return self.listing_neighbors.similar(
+            self.listing_index_map[listing_id], self.listing_ids, n_recommendations, min_similarity
+        )
     
     def recommend_users_for_user(
         self, 
@@ -434,6 +371,10 @@ class ContentBasedFiltering:
         
         return ", ".join(reasons) if reasons else "compatible lifestyle"
     
+    def replace_with(self, model: "ContentBasedFiltering"):
+        """Take over the state of a model fitted elsewhere, e.g. by the training executor."""
+        self.__dict__.update(model.__dict__)
+    
     def get_content_stats(self) -> Dict[str, Any]:
         """Get statistics about the content-based filtering model."""
         return {
@@ -74,10 +74,16 @@ class FeatureEngineer:
         return np.array(features, dtype=np.float32)
     
     def _calculate_age(self, date_of_birth: Optional[datetime]) -> Optional[int]:
-        """Calculate age from date of birth."""
+        """Calculate age from date of birth (datetime or ISO string)."""
         if not date_of_birth:
             return None
         
+        if isinstance(date_of_birth, str):
+            try:
+                date_of_birth = datetime.fromisoformat(date_of_birth.replace('Z', '+00:00'))
+            except ValueError:
+                return None
+        
         today = datetime.now()
         return today.year - date_of_birth.year - ((today.month, today.day) < (date_of_birth.month, date_of_birth.day))
     
@@ -0,0 +1,150 @@
+import numpy as np
+import hashlib
+import json
+import threading
+from datetime import date
+from typing import Dict, List, Any, Optional, Tuple
+
+from app.ml.feature_engineering import feature_engineer
+
+# Bump when FeatureEngineer.extract_user_features changes so cached vectors are rebuilt
+FEATURE_VERSION = 1
+
+# User fields that extract_user_features reads
+SOURCE_FIELDS = (
+    'date_of_birth', 'user_type', 'is_verified_email', 'is_verified_phone',
+    'is_verified_identity', 'is_background_checked', 'profile_completion_score',
+    'preferences', 'lifestyle_data'
+)
+
+class UserFeatureStore:
+    """
+    Cache of per-user feature vectors.
+
+    Vectors are float32 rows of one contiguous matrix with a user id -> row
+    index. Each row is tagged with a version token so a stale or colliding
+    entry is recomputed instead of served: the user's ``updated_at`` when the
+    caller provides it (cheap, and bumped on every profile write), otherwise
+    a hash of the source fields like UserEmbedding.source_data_hash. Tokens
+    also carry the current date, since age is derived from date_of_birth.
+    """
+
+    def __init__(self, initial_capacity: int = 1024):
+        self.n_features = len(feature_engineer.extract_user_features({}))
+        self._vectors = np.zeros((initial_capacity, self.n_features), dtype=np.float32)
+        self._row_index: Dict[str, int] = {}
+        self._row_tokens: List[Optional[Tuple]] = [None] * initial_capacity
+        self._free_rows: List[int] = []
+        self._next_row = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def source_hash(self, user_data: Dict[str, Any]) -> str:
+        """Hash of the fields a user's feature vector is derived from."""
+        source = {field: user_data.get(field) for field in SOURCE_FIELDS}
+        source['_version'] = FEATURE_VERSION
+        payload = json.dumps(source, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _version_token(self, user_data: Dict[str, Any], today: date) -> Tuple[Any, date]:
+        """Token identifying the source data a cached vector was built from."""
+        if 'updated_at' in user_data:
+            return (FEATURE_VERSION, user_data['updated_at']), today
+        return self.source_hash(user_data), today
+
+    def get_vector(self, user_data: Dict[str, Any]) -> np.ndarray:
+        """Feature vector for a single user."""
+        return self.get_matrix([user_data])[0]
+
+    def get_matrix(self, users: List[Dict[str, Any]]) -> np.ndarray:
+        """
+        Feature matrix for many users, computing only missing or stale rows.
+
+        Args:
+            users: User dictionaries (as passed to extract_user_features)
+
+        Returns:
+            float32 array of shape (len(users), n_features)
+        """
+        today = date.today()
+        rows = np.empty(len(users), dtype=np.intp)
+        uncached = []
+
+        with self._lock:
+            for i, user_data in enumerate(users):
+                user_id = user_data.get('id')
+                if user_id is None:
+                    # Nothing to key the vector on, e.g. ad-hoc prediction input
+                    uncached.append(i)
+                    rows[i] = 0
+                    continue
+
+                user_id = str(user_id)
+                token = self._version_token(user_data, today)
+                row = self._row_index.get(user_id)
+
+                if row is not None and self._row_tokens[row] == token:
+                    self.hits += 1
+                else:
+                    self.misses += 1
+                    if row is None:
+                        row = self._allocate_row()
+                        self._row_index[user_id] = row
+                    self._vectors[row] = feature_engineer.extract_user_features(user_data)
+                    self._row_tokens[row] = token
+
+                rows[i] = row
+
+            matrix = self._vectors[rows]
+
+        for i in uncached:
+            matrix[i] = feature_engineer.extract_user_features(users[i])
+
+        return matrix
+
+    def invalidate(self, user_id: str):
+        """Drop a user's cached vector, e.g. after a profile update."""
+        with self._lock:
+            row = self._row_index.pop(str(user_id), None)
+            if row is not None:
+                self._row_tokens[row] = None
+                self._free_rows.append(row)
+
+    def clear(self):
+        """Drop all cached vectors."""
+        with self._lock:
+            self._row_index.clear()
+            self._row_tokens = [None] * len(self._row_tokens)
+            self._free_rows.clear()
+            self._next_row = 0
+
+    def _allocate_row(self) -> int:
+        """Reuse a freed row or append one, doubling capacity when full."""
+        if self._free_rows:
+            return self._free_rows.pop()
+
+        if self._next_row == len(self._vectors):
+            capacity = len(self._vectors) * 2
+            vectors = np.zeros((capacity, self.n_features), dtype=np.float32)
+            vectors[:self._next_row] = self._vectors
+            self._vectors = vectors
+            self._row_tokens.extend([None] * (capacity - len(self._row_tokens)))
+
+        row = self._next_row
+        self._next_row += 1
+        return row
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics."""
+        return {
+            "feature_version": FEATURE_VERSION,
+            "cached_users": len(self._row_index),
+            "capacity": len(self._vectors),
+            "memory_bytes": self._vectors.nbytes,
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+# Global feature store instance
+user_feature_store = UserFeatureStore()
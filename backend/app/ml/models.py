@@ -10,6 +10,9 @@ import os
 from datetime import datetime
 
 from app.ml.feature_engineering import feature_engineer
+from app.ml.feature_store import user_feature_store
+from app.ml.registry import ModelRegistry, model_registry
+from app.core.config import settings
 
 class CompatibilityModel:
     """Machine learning model for predicting user compatibility."""
@@ -20,6 +23,8 @@ class CompatibilityModel:
         self.scaler = StandardScaler()
         self.is_trained = False
         self.feature_names = feature_engineer.get_feature_names()
+        self.trained_at = None
+        self.version = None
         
         # Initialize model based on type
         if model_type == "random_forest":
@@ -49,23 +54,30 @@ class CompatibilityModel:
             X: Feature matrix
             y: Target compatibility scores
         """
-        X = []
-        y = []
+        features1 = user_feature_store.get_matrix([u1 for u1, _, _ in user_pairs])
+        features2 = user_feature_store.get_matrix([u2 for _, u2, _ in user_pairs])
         
-        for user1_data, user2_data, score in user_pairs:
-            # Extract features for both users
-            features1 = feature_engineer.extract_user_features(user1_data)
-            features2 = feature_engineer.extract_user_features(user2_data)
-            
-            # Combine features (difference, absolute difference, and concatenation)
-            feature_diff = features1 - features2
-            feature_abs_diff = np.abs(features1 - features2)
-            combined_features = np.concatenate([features1, features2, feature_diff, feature_abs_diff])
-            
-            X.append(combined_features)
-            y.append(score)
+        X = self.build_pair_features(features1, features2)
+        y = np.array([score for _, _, score in user_pairs])
         
-        return np.array(X), np.array(y)
+        return X, y
+    
+    def build_pair_features(self, features1: np.ndarray, features2: np.ndarray) -> np.ndarray:
+        """
+        Combine per-user feature rows into pair features.
+        
+        Args:
+            features1: First users' features, shape (n_features,) or (n_pairs, n_features)
+            features2: Second users' features, shape (n_pairs, n_features)
+        
+        Returns:
+            Matrix of [features1, features2, difference, absolute difference] rows
+        """
+        features2 = np.atleast_2d(features2)
+        features1 = np.broadcast_to(features1, features2.shape)
+        
+        feature_diff = features1 - features2
+        return np.hstack([features1, features2, feature_diff, np.abs(feature_diff)])
     
     def train(self, user_pairs: List[Tuple[Dict, Dict, float]], validation_split: float = 0.2) -> Dict[str, float]:
         """
@@ -79,7 +91,20 @@ class CompatibilityModel:
             Training metrics
         """
         X, y = self.prepare_training_data(user_pairs)
+        return self.train_on_features(X, y, validation_split)
+    
+    def train_on_features(self, X: np.ndarray, y: np.ndarray, validation_split: float = 0.2) -> Dict[str, float]:
+        """
+        Train the compatibility model on prepared pair features.
+        
+        Args:
+            X: Feature matrix from prepare_training_data
+            y: Target compatibility scores
+            validation_split: Fraction of data to use for validation
         
+        Returns:
+            Training metrics
+        """
         # Split data
         X_train, X_val, y_train, y_val = train_test_split(
             X, y, test_size=validation_split, random_state=42
@@ -92,6 +117,7 @@ class CompatibilityModel:
         # Train model
         self.model.fit(X_train_scaled, y_train)
         self.is_trained = True
+        self.trained_at = datetime.now()
         
         # Evaluate
         train_pred = self.model.predict(X_train_scaled)
@@ -122,22 +148,42 @@ class CompatibilityModel:
         if not self.is_trained:
             raise ValueError("Model must be trained before making predictions")
         
-        # Extract and combine features
-        features1 = feature_engineer.extract_user_features(user1_data)
-        features2 = feature_engineer.extract_user_features(user2_data)
+        return float(self.predict_compatibility_batch(user1_data, [user2_data])[0])
+    
+    def predict_compatibility_batch(
+        self, 
+        user_data: Dict[str, Any], 
+        candidates_data: List[Dict[str, Any]]
+    ) -> np.ndarray:
+        """
+        Predict compatibility between one user and many candidates.
         
-        feature_diff = features1 - features2
-        feature_abs_diff = np.abs(features1 - features2)
-        combined_features = np.concatenate([features1, features2, feature_diff, feature_abs_diff])
+        Builds the full pair feature matrix and runs a single scaler/predict
+        call instead of one per pair.
         
-        # Scale and predict
-        X = combined_features.reshape(1, -1)
+        Args:
+            user_data: Requesting user's data
+            candidates_data: Candidate users' data
+        
+        Returns:
+            Array of compatibility scores (0-1), one per candidate
+        """
+        if not self.is_trained:
+            raise ValueError("Model must be trained before making predictions")
+        
+        if not candidates_data:
+            return np.empty(0)
+        
+        user_features = user_feature_store.get_vector(user_data)
+        candidate_features = user_feature_store.get_matrix(candidates_data)
+        
+        X = self.build_pair_features(user_features, candidate_features)
         X_scaled = self.scaler.transform(X)
         
-        prediction = self.model.predict(X_scaled)[0]
+        predictions = self.model.predict(X_scaled)
         
-        # Ensure prediction is in valid range
-        return max(0.0, min(1.0, prediction))
+        # Ensure predictions are in valid range
+        return np.clip(predictions, 0.0, 1.0)
     
     def get_feature_importance(self) -> Dict[str, float]:
         """Get feature importance scores."""
@@ -163,35 +209,52 @@ class CompatibilityModel:
         if not self.is_trained:
             raise ValueError("Cannot save untrained model")
         
-        model_data = {
-            "model": self.model,
-            "scaler": self.scaler,
-            "model_type": self.model_type,
-            "feature_names": self.feature_names,
-            "trained_at": datetime.now()
-        }
-        
-        joblib.dump(model_data, filepath)
+        joblib.dump(self.to_artifact(), filepath)
     
-    def load_model(self, filepath: str):
+    def load_model(self, filepath: str, mmap_mode: Optional[str] = None):
         """Load a trained model from disk."""
         if not os.path.exists(filepath):
             raise FileNotFoundError(f"Model file not found: {filepath}")
         
-        model_data = joblib.load(filepath)
+        self._load_artifact(joblib.load(filepath, mmap_mode=mmap_mode))
+    
+    def to_artifact(self) -> Dict[str, Any]:
+        """Everything needed to restore the trained model, for joblib.dump."""
+        if not self.is_trained:
+            raise ValueError("Cannot save untrained model")
         
+        return {
+            "model": self.model,
+            "scaler": self.scaler,
+            "model_type": self.model_type,
+            "feature_names": self.feature_names,
+            "trained_at": self.trained_at or datetime.now()
+        }
+    
+    @classmethod
+    def from_artifact(cls, model_data: Dict[str, Any]) -> "CompatibilityModel":
+        """Restore a model from the output of to_artifact."""
+        model = cls(model_data["model_type"])
+        model._load_artifact(model_data)
+        return model
+    
+    def _load_artifact(self, model_data: Dict[str, Any]):
         self.model = model_data["model"]
         self.scaler = model_data["scaler"]
         self.model_type = model_data["model_type"]
         self.feature_names = model_data["feature_names"]
+        self.trained_at = model_data.get("trained_at")
         self.is_trained = True
 
 class ModelManager:
     """Manager for multiple ML models."""
     
-    def __init__(self):
+    def __init__(self, registry: ModelRegistry = model_registry):
         self.models = {}
         self.active_model = None
+        self.active_model_name = None
+        self.registry = registry
+        self._manifest_stamp = None  # (inode, mtime) of the manifest the active model was read from
     
     def create_model(self, name: str, model_type: str = "random_forest") -> CompatibilityModel:
         """Create a new model."""
@@ -204,19 +267,112 @@ class ModelManager:
         if name not in self.models:
             raise ValueError(f"Model '{name}' not found")
         self.active_model = self.models[name]
+        self.active_model_name = name
+    
+    def save_model(self, name: str, metrics: Dict[str, Any]) -> str:
+        """Register a trained model as a new version in the on-disk registry."""
+        model = self.models[name]
+        model.version = self.registry.register(name, model.to_artifact(), metrics)
+        return model.version
+    
+    def load_model(self, name: str, version: Optional[str] = None) -> CompatibilityModel:
+        """Load a model version from the registry into the manager."""
+        artifact, version = self.registry.load(name, version, mmap=settings.ml_mmap_models)
+        model = CompatibilityModel.from_artifact(artifact)
+        model.version = version
+        self.models[name] = model
+        return model
+    
+    def activate_model(self, name: str, version: Optional[str] = None):
+        """
+        Make a model version active and record it in the registry.
+        
+        The version is fully loaded before the active model reference is
+        swapped, so concurrent predictions use either the old or the new model.
+        """
+        model = self.models.get(name)
+        if model is None or (version is not None and model.version != version):
+            model = self.load_model(name, version)
+        
+        if model.version is not None:
+            self.registry.activate(name, model.version)
+            self._manifest_stamp = self.registry.manifest_stamp()
+        self.active_model = model
+        self.active_model_name = name
+    
+    def deactivate_model(self):
+        """Clear the active model here and in the registry, which all workers follow."""
+        self.registry.deactivate()
+        self._manifest_stamp = self.registry.manifest_stamp()
+        self.active_model = None
+        self.active_model_name = None
+    
+    def load_active_model(self) -> bool:
+        """Load the registry's active model, e.g. at startup. Returns whether one was loaded."""
+        # Stamp before reading, so an activation in between is picked up by the next refresh
+        self._manifest_stamp = self.registry.manifest_stamp()
+        active = self.registry.active_model()
+        if active is None:
+            # Deactivated by another worker
+            self.active_model = None
+            self.active_model_name = None
+            return False
+        name, version = active
+        if not (
+            self.active_model is not None
+            and self.active_model_name == name
+            and self.active_model.version == version
+        ):
+            self.active_model = self.load_model(name, version)
+            self.active_model_name = name
+        return True
+    
+    def refresh_active_model(self) -> bool:
+        """
+        Switch to the registry's active model if another worker activated one.
+        
+        Costs one stat of the manifest when nothing changed; a new active
+        version is loaded through the same (memory-mapped) path as at
+        startup and swapped in whole. Called before predictions, so every
+        worker follows an activation or deactivation without a restart.
+        
+        Returns:
+            Whether a model is active, i.e. whether ML matching is on
+        """
+        if self.registry.manifest_stamp() != self._manifest_stamp:
+            try:
+                self.load_active_model()
+            except Exception as e:
+                print(f"Failed to load newly activated model, keeping the current one: {e}")
+        return self.active_model is not None
     
     def predict_compatibility(self, user1_data: Dict[str, Any], user2_data: Dict[str, Any]) -> float:
         """Predict compatibility using the active model."""
-        if not self.active_model:
+        if not self.refresh_active_model():
             raise ValueError("No active model set")
         return self.active_model.predict_compatibility(user1_data, user2_data)
     
+    def predict_compatibility_batch(
+        self, 
+        user_data: Dict[str, Any], 
+        candidates_data: List[Dict[str, Any]]
+    ) -> np.ndarray:
+        """Predict compatibility for many candidates using the active model."""
+        if not self.refresh_active_model():
+            raise ValueError("No active model set")
+        return self.active_model.predict_compatibility_batch(user_data, candidates_data)
+    
     def get_model_info(self) -> Dict[str, Any]:
         """Get information about available models."""
+        self.refresh_active_model()
         return {
             "available_models": list(self.models.keys()),
             "active_model": type(self.active_model).__name__ if self.active_model else None,
-            "model_types": {name: model.model_type for name, model in self.models.items()}
+            "active_model_name": self.active_model_name,
+            "active_version": self.active_model.version if self.active_model else None,
+            "model_types": {name: model.model_type for name, model in self.models.items()},
+            "registry": self.registry.read_manifest(),
+            "feature_store": user_feature_store.get_stats()
         }
 
 # Global model manager instance
@@ -0,0 +1,180 @@
+import numpy as np
+from scipy import sparse
+from sklearn.preprocessing import normalize
+from typing import Callable, List, Optional, Tuple, Union
+
+class NeighborIndex:
+    """
+    Top-k nearest neighbors per row by cosine similarity.
+
+    Replaces a full N x N similarity matrix: only the k best neighbors of
+    each row are kept, as an int32 index array (-1 padded) and a float32
+    score array sorted by descending similarity. Similarities are computed
+    in blocks of rows, so peak memory is block_size x N rather than N x N.
+    """
+
+    def __init__(self, n_neighbors: int = 50, block_size: int = 512):
+        self.n_neighbors = n_neighbors
+        self.block_size = block_size
+        self.indices = np.empty((0, n_neighbors), dtype=np.int32)
+        self.scores = np.empty((0, n_neighbors), dtype=np.float32)
+
+    def build(self, features: Union[np.ndarray, sparse.spmatrix]) -> "NeighborIndex":
+        """
+        Build the index from a feature matrix.
+
+        Args:
+            features: Dense array or sparse matrix with one row per item
+
+        Returns:
+            The index itself
+        """
+        normalized = normalize(features)
+        normalized_t = normalized.T.tocsr() if sparse.issparse(normalized) else normalized.T
+        n_rows = normalized.shape[0]
+
+        self.indices = np.full((n_rows, self.n_neighbors), -1, dtype=np.int32)
+        self.scores = np.zeros((n_rows, self.n_neighbors), dtype=np.float32)
+
+        for start in range(0, n_rows, self.block_size):
+            end = min(start + self.block_size, n_rows)
+            block = normalized[start:end] @ normalized_t
+            if sparse.issparse(block):
+                block = block.toarray()
+            self._store_block(start, np.asarray(block, dtype=np.float64))
+
+        return self
+
+    def set_row(self, row: int, similarities: np.ndarray, candidates: Optional[np.ndarray] = None):
+        """
+        Replace one row's neighbors.
+
+        Args:
+            row: Row index
+            similarities: Similarity to every row, or to each of candidates
+            candidates: Row indices the similarities refer to; rows not listed
+                are treated as dissimilar
+        """
+        if candidates is None:
+            self._store_block(row, similarities[np.newaxis, :].astype(np.float64))
+            return
+
+        keep = candidates != row
+        candidates, similarities = candidates[keep], similarities[keep]
+
+        k = self.n_neighbors
+        if len(similarities) > k:
+            top = np.argpartition(-similarities, k - 1)[:k]
+            candidates, similarities = candidates[top], similarities[top]
+        order = np.lexsort((candidates, -similarities))
+
+        self.indices[row] = -1
+        self.scores[row] = 0
+        self.indices[row, :len(order)] = candidates[order]
+        self.scores[row, :len(order)] = similarities[order]
+
+    def update_pair(
+        self,
+        row: int,
+        other: int,
+        similarity: float,
+        recompute: Optional[Callable[[int], Tuple[np.ndarray, np.ndarray]]] = None
+    ) -> bool:
+        """
+        Record a changed similarity between row and other in row's neighbor list.
+
+        other replaces the weakest neighbor if it now ranks in the top k. If
+        a listed neighbor's similarity drops below the weakest score of a
+        full list, a row outside the list may now outrank it, so the row is
+        rebuilt from recompute(row), which returns (similarities, candidates)
+        as taken by set_row. Without recompute the neighbor keeps its slot
+        with the lower score until the next build.
+
+        Returns:
+            Whether row's neighbor list changed
+        """
+        indices = self.indices[row]
+        scores = self.scores[row]
+        position = np.flatnonzero(indices == other)
+
+        if position.size:
+            # Rows outside a full list score at most its weakest neighbor
+            if similarity < scores[-1] and indices[-1] >= 0 and recompute is not None:
+                similarities, candidates = recompute(row)
+                self.set_row(row, similarities, candidates)
+                return True
+            scores[position[0]] = similarity
+        elif indices[-1] < 0 or similarity > scores[-1]:
+            indices[-1] = other
+            scores[-1] = similarity
+        else:
+            return False
+
+        valid = indices >= 0
+        order = np.lexsort((np.where(valid, indices, np.iinfo(np.int32).max), -np.where(valid, scores, -np.inf)))
+        indices[:] = indices[order]
+        scores[:] = scores[order]
+        return True
+
+    def add_rows(self, n_rows: int):
+        """
+        Make room for rows up to n_rows, with no neighbors yet.
+
+        Capacity grows geometrically, so adding rows one at a time copies
+        the arrays O(log n) times rather than once per row.
+        """
+        capacity = self.indices.shape[0]
+        if n_rows <= capacity:
+            return
+        capacity = max(n_rows, 2 * capacity)
+        indices = np.full((capacity, self.n_neighbors), -1, dtype=np.int32)
+        scores = np.zeros((capacity, self.n_neighbors), dtype=np.float32)
+        indices[:len(self.indices)] = self.indices
+        scores[:len(self.scores)] = self.scores
+        self.indices, self.scores = indices, scores
+
+    def _store_block(self, start: int, block: np.ndarray):
+        """Select and store the top-k columns of each row of a similarity block."""
+        n_block, n_rows = block.shape
+        rows = np.arange(n_block)
+        block[rows, start + rows] = -np.inf  # never a neighbor of itself
+
+        k = min(self.n_neighbors, n_rows - 1)
+        if k <= 0:
+            return
+
+        top = np.argpartition(-block, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(block, top, axis=1)
+
+        # Descending score, ties broken by row index
+        order = np.lexsort((top, -top_scores))
+        self.indices[start:start + n_block, :k] = np.take_along_axis(top, order, axis=1)
+        self.scores[start:start + n_block, :k] = np.take_along_axis(top_scores, order, axis=1)
+
+    def neighbors(self, row: int, min_similarity: float = None, inclusive: bool = True) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Neighbors of a row in descending similarity order.
+
+        Args:
+            row: Row index
+            min_similarity: Drop neighbors below this similarity
+            inclusive: Keep neighbors exactly at min_similarity
+
+        Returns:
+            Tuple of (row indices, float32 similarities)
+        """
+        indices = self.indices[row]
+        scores = self.scores[row]
+        keep = indices >= 0
+        if min_similarity is not None:
+            keep &= (scores >= min_similarity) if inclusive else (scores > min_similarity)
+        return indices[keep], scores[keep]
+
+    def similar(self, row: int, ids: List[str], n: int, min_similarity: float) -> List[Tuple[str, float]]:
+        """Top n (id, similarity) pairs for a row, ids given in row order."""
+        indices, scores = self.neighbors(row, min_similarity)
+        return [(ids[idx], float(score)) for idx, score in zip(indices[:n], scores[:n])]
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.indices.nbytes + self.scores.nbytes)
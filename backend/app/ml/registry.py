@@ -0,0 +1,215 @@
+import fcntl
+import json
+import os
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+
+import joblib
+import numpy as np
+
+from app.core.config import settings
+
+MANIFEST_FILENAME = "manifest.json"
+MANIFEST_LOCK_FILENAME = "manifest.lock"
+
+class ModelRegistry:
+    """
+    Versioned on-disk store of trained model artifacts.
+
+    Layout::
+
+        <root>/manifest.json
+        <root>/<name>/<version>.joblib
+
+    The manifest records every version's metrics, feature names and
+    training timestamp, plus the active model and version. Artifacts are
+    written uncompressed so they can be loaded with ``mmap_mode='r'`` and
+    their arrays shared between worker processes through the page cache.
+    Both artifacts and manifest are written to a temporary file first and
+    moved into place with os.replace, so readers never see a partial file.
+    Manifest updates come from the training pool as well as the API
+    workers, so each read-modify-write holds an flock on
+    ``<root>/manifest.lock``; otherwise concurrent updates could be lost.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self.root, MANIFEST_FILENAME)
+
+    def read_manifest(self) -> Dict[str, Any]:
+        """Current manifest, or an empty one if nothing was registered yet."""
+        try:
+            with open(self.manifest_path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"active_model": None, "models": {}}
+
+    def manifest_stamp(self) -> Optional[Tuple[int, int]]:
+        """
+        (inode, mtime) of the manifest, or None if there is none yet.
+
+        Every manifest write replaces the file, so the stamp changes with
+        each registration or activation; workers compare it to notice them.
+        """
+        try:
+            stat = os.stat(self.manifest_path)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns
+
+    @contextmanager
+    def _manifest_lock(self):
+        """Exclusive lock for a manifest update, across processes and threads."""
+        os.makedirs(self.root, exist_ok=True)
+        # Each call opens its own file description, so threads exclude each other too
+        with open(os.path.join(self.root, MANIFEST_LOCK_FILENAME), "a") as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _write_manifest(self, manifest: Dict[str, Any]):
+        self._atomic_write(self.manifest_path, lambda f: f.write(json.dumps(manifest, indent=2).encode()))
+
+    def _atomic_write(self, path: str, write):
+        """Write a file via a temporary sibling and os.replace."""
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                write(f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def register(self, name: str, artifact: Dict[str, Any], metrics: Dict[str, Any]) -> str:
+        """
+        Store a trained model artifact as a new version.
+
+        Args:
+            name: Model name
+            artifact: Output of CompatibilityModel.to_artifact
+            metrics: Training metrics to record in the manifest
+
+        Returns:
+            The new version id
+        """
+        version = datetime.utcnow().strftime("%Y%m%dT%H%M%S%f")
+        relative_path = os.path.join(name, f"{version}.joblib")
+        self._atomic_write(
+            os.path.join(self.root, relative_path),
+            lambda f: joblib.dump(artifact, f)
+        )
+
+        with self._manifest_lock():
+            manifest = self.read_manifest()
+            entry = manifest["models"].setdefault(name, {"active_version": None, "versions": {}})
+            entry["versions"][version] = {
+                "path": relative_path,
+                "model_type": artifact["model_type"],
+                "feature_names": list(artifact["feature_names"]),
+                "metrics": {key: _json_number(value) for key, value in metrics.items()},
+                "trained_at": artifact["trained_at"].isoformat()
+            }
+            self._write_manifest(manifest)
+
+        return version
+
+    def activate(self, name: str, version: Optional[str] = None) -> str:
+        """
+        Mark a version (default: the current active or latest one) as the active model.
+
+        Returns:
+            The activated version id
+        """
+        with self._manifest_lock():
+            manifest = self.read_manifest()
+            version = self._resolve_version(manifest, name, version)
+            manifest["models"][name]["active_version"] = version
+            manifest["active_model"] = name
+            self._write_manifest(manifest)
+        return version
+
+    def deactivate(self):
+        """Clear the active model, so every worker falls back to rule-based matching."""
+        with self._manifest_lock():
+            manifest = self.read_manifest()
+            manifest["active_model"] = None
+            self._write_manifest(manifest)
+
+    def delete(self, name: str, version: str):
+        """
+        Remove a version that is not active, e.g. one registered by a cancelled training job.
+
+        Raises:
+            ValueError: If the version is unknown or active
+        """
+        with self._manifest_lock():
+            manifest = self.read_manifest()
+            version = self._resolve_version(manifest, name, version)
+            entry = manifest["models"][name]
+            if entry["active_version"] == version:
+                raise ValueError(f"Version '{version}' of model '{name}' is active")
+            path = os.path.join(self.root, entry["versions"].pop(version)["path"])
+            self._write_manifest(manifest)
+
+        if os.path.exists(path):
+            os.unlink(path)
+
+    def load(self, name: str, version: Optional[str] = None, mmap: bool = True) -> Tuple[Dict[str, Any], str]:
+        """
+        Load a registered artifact (default: the model's active or latest version).
+
+        Args:
+            name: Model name
+            version: Version id
+            mmap: Memory-map the artifact's arrays read-only
+
+        Returns:
+            Tuple of (artifact, version id)
+        """
+        manifest = self.read_manifest()
+        version = self._resolve_version(manifest, name, version)
+        path = os.path.join(self.root, manifest["models"][name]["versions"][version]["path"])
+
+        return joblib.load(path, mmap_mode="r" if mmap else None), version
+
+    def active_model(self) -> Optional[Tuple[str, str]]:
+        """(name, version) of the active model recorded in the manifest, if any."""
+        manifest = self.read_manifest()
+        name = manifest.get("active_model")
+        if not name:
+            return None
+        return name, manifest["models"][name]["active_version"]
+
+    def list_versions(self, name: str) -> List[str]:
+        """Version ids of a model, oldest first."""
+        return sorted(self.read_manifest()["models"].get(name, {}).get("versions", {}))
+
+    def _resolve_version(self, manifest: Dict[str, Any], name: str, version: Optional[str]) -> str:
+        entry = manifest["models"].get(name)
+        if not entry or not entry["versions"]:
+            raise ValueError(f"Model '{name}' not found in registry")
+        if version is None:
+            return entry["active_version"] or max(entry["versions"])
+        if version not in entry["versions"]:
+            raise ValueError(f"Version '{version}' of model '{name}' not found in registry")
+        return version
+
+def _json_number(value: Any) -> Any:
+    """Convert NumPy scalars in metrics to plain Python numbers."""
+    return value.item() if isinstance(value, np.generic) else value
+
+# Global model registry instance
+model_registry = ModelRegistry(settings.ml_model_dir)
@@ -0,0 +1,380 @@
+import asyncio
+import json
+import multiprocessing
+import os
+import pickle
+import tempfile
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+from fastapi.encoders import jsonable_encoder
+
+from app.core.config import settings
+
+# Finished jobs kept for status polling
+MAX_FINISHED_JOBS = 100
+
+
+class TrainingCancelled(Exception):
+    """Raised in a pool worker that saw its job's cancel marker."""
+
+
+@dataclass
+class TrainingJob:
+    """State of one background training job."""
+    id: str
+    kind: str
+    status: str = "pending"  # pending, preparing, running, succeeded, failed, cancelled
+    created_at: datetime = field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    cancel_requested: bool = False
+    task: Optional[asyncio.Task] = field(default=None, repr=False)
+    future: Optional[asyncio.Future] = field(default=None, repr=False)
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in FINISHED_STATUSES
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "result": self.result,
+            "error": self.error
+        }
+
+
+FINISHED_STATUSES = ("succeeded", "failed", "cancelled")
+
+
+class TrainingJobStore:
+    """
+    Job records as JSON files under ``<root>/jobs``, shared by all API workers.
+
+    Only the worker that runs a job writes its record; any worker can read
+    it. Cancellation is a separate ``<job_id>.cancel`` marker file, so a
+    cancel from another worker never races with the owner's record writes,
+    and the pool process can check it too.
+    """
+
+    def __init__(self, root: str):
+        self.root = os.path.join(root, "jobs")
+
+    def _record_path(self, job_id: str) -> str:
+        return os.path.join(self.root, f"{job_id}.json")
+
+    def cancel_path(self, job_id: str) -> str:
+        return os.path.join(self.root, f"{job_id}.cancel")
+
+    def save(self, job: TrainingJob):
+        """Write a job's record atomically."""
+        os.makedirs(self.root, exist_ok=True)
+        payload = json.dumps(jsonable_encoder(job.to_dict())).encode()
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(payload)
+            os.replace(tmp_path, self._record_path(job.id))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def load(self, job_id: str) -> Optional[Dict[str, Any]]:
+        if not job_id.isalnum():
+            return None
+        try:
+            with open(self._record_path(job_id)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def list(self) -> List[Dict[str, Any]]:
+        """All job records, newest first."""
+        try:
+            names = os.listdir(self.root)
+        except FileNotFoundError:
+            return []
+        records = [self.load(name[:-len(".json")]) for name in names if name.endswith(".json")]
+        return sorted((r for r in records if r), key=lambda r: r["created_at"], reverse=True)
+
+    def request_cancel(self, job_id: str):
+        os.makedirs(self.root, exist_ok=True)
+        open(self.cancel_path(job_id), "a").close()
+
+    def is_cancel_requested(self, job_id: str) -> bool:
+        return os.path.exists(self.cancel_path(job_id))
+
+    def prune(self, keep: int = MAX_FINISHED_JOBS):
+        """Delete the oldest finished job records beyond keep."""
+        finished = [r for r in self.list() if r["status"] in FINISHED_STATUSES]
+        for record in finished[keep:]:
+            for path in (self._record_path(record["job_id"]), self.cancel_path(record["job_id"])):
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+
+
+class ChunkSpool:
+    """
+    Training chunks spilled to a temp file as they are streamed.
+
+    Chunks are appended one pickle at a time, so the API process holds a
+    single chunk at once and only the file path is sent to the pool, which
+    reads the chunks back one by one. The file is written and read by this
+    service only.
+    """
+
+    def __init__(self):
+        self.path: Optional[str] = None
+        self.rows = 0
+        self._file = None
+
+    def write(self, chunk: List[Any]):
+        if self._file is None:
+            fd, self.path = tempfile.mkstemp(suffix=".chunks")
+            self._file = os.fdopen(fd, "wb")
+        pickle.dump(chunk, self._file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.rows += len(chunk)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def discard(self):
+        """Close and delete the file."""
+        self.close()
+        if self.path is not None:
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
+
+    @staticmethod
+    def read(path: str) -> Iterator[List[Any]]:
+        """Chunks from a spool file, in write order."""
+        with open(path, "rb") as f:
+            while True:
+                try:
+                    yield pickle.load(f)
+                except EOFError:
+                    return
+
+
+def _run_in_pool(fn: Callable, args: tuple, cancel_path: str):
+    """Pool entry point: skip cancelled jobs and let fn check for cancellation itself."""
+    def is_cancelled() -> bool:
+        return os.path.exists(cancel_path)
+
+    if is_cancelled():
+        raise TrainingCancelled()
+    return fn(*args, is_cancelled=is_cancelled)
+
+
+class TrainingExecutor:
+    """
+    Runs CPU-bound training in a separate process pool.
+
+    A job first awaits its ``prepare`` coroutine on the event loop, which
+    only reads raw rows from the database and returns the function and
+    arguments to run in the pool; feature building and fitting happen
+    there. When the pool returns, ``on_success`` runs back in the API
+    process to swap the finished artifacts in.
+
+    Job records live in a TrainingJobStore, so any API worker can report
+    or cancel a job. A cancelled job is stopped before it reaches the
+    pool, skipped by the pool, or, if the pool function already finished,
+    has its result passed to ``on_discard`` instead of ``on_success``.
+    Pool functions take an ``is_cancelled`` callable to check before
+    producing side effects such as registering a model version.
+    """
+
+    def __init__(self, max_workers: int, store: TrainingJobStore):
+        self.max_workers = max_workers
+        self.store = store
+        self.jobs: Dict[str, TrainingJob] = {}  # jobs running in this worker
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: forking a process with a running event loop and threads is unsafe
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._pool
+
+    def submit(
+        self,
+        kind: str,
+        prepare: Callable[[], Awaitable[Tuple[Callable, tuple]]],
+        on_success: Callable[[Any], Dict[str, Any]],
+        on_discard: Optional[Callable[[Any], None]] = None,
+        cleanup: Optional[Callable[[], None]] = None
+    ) -> TrainingJob:
+        """
+        Start a training job.
+
+        Args:
+            kind: Job type, e.g. "compatibility_model"
+            prepare: Coroutine function returning (function, args) to run in the pool
+            on_success: Called in the API process with the pool's return value;
+                returns the job's result summary
+            on_discard: Called with the pool's return value if the job was
+                cancelled after the pool function finished, to undo its side effects
+            cleanup: Called once the job ended, however it ended, e.g. to
+                delete a ChunkSpool handed to the pool
+
+        Returns:
+            The new job
+        """
+        job = TrainingJob(id=uuid.uuid4().hex, kind=kind)
+        self.jobs[job.id] = job
+        self.store.save(job)
+        self._prune()
+        job.task = asyncio.create_task(self._run(job, prepare, on_success, on_discard, cleanup))
+        return job
+
+    def _cancelled(self, job: TrainingJob) -> bool:
+        return job.cancel_requested or self.store.is_cancel_requested(job.id)
+
+    def _set_status(self, job: TrainingJob, status: str):
+        job.status = status
+        self.store.save(job)
+
+    async def _run(self, job: TrainingJob, prepare, on_success, on_discard, cleanup):
+        try:
+            self._set_status(job, "preparing")
+            fn, args = await prepare()
+            if self._cancelled(job):
+                raise asyncio.CancelledError()
+
+            job.started_at = datetime.utcnow()
+            self._set_status(job, "running")
+            job.future = asyncio.get_running_loop().run_in_executor(
+                self._get_pool(), _run_in_pool, fn, args, self.store.cancel_path(job.id)
+            )
+            result = await job.future
+
+            if self._cancelled(job):
+                if on_discard is not None:
+                    on_discard(result)
+                raise asyncio.CancelledError()
+
+            job.result = on_success(result)
+            job.status = "succeeded"
+
+        except (asyncio.CancelledError, TrainingCancelled):
+            job.status = "cancelled"
+        except Exception as e:
+            print(f"Training job {job.id} ({job.kind}) failed: {e}")
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            if cleanup is not None:
+                cleanup()
+            job.finished_at = datetime.utcnow()
+            self.store.save(job)
+            self.jobs.pop(job.id, None)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """A job's record, from whichever worker runs it."""
+        job = self.jobs.get(job_id)
+        if job is not None:
+            return jsonable_encoder(job.to_dict())
+        return self.store.load(job_id)
+
+    def list_jobs(self) -> List[Dict[str, Any]]:
+        return self.store.list()
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a job. Returns False if it does not exist or already finished."""
+        record = self.get(job_id)
+        if record is None or record["status"] in FINISHED_STATUSES:
+            return False
+
+        self.store.request_cancel(job_id)
+        job = self.jobs.get(job_id)
+        if job is not None:
+            job.cancel_requested = True
+            if job.future is not None:
+                # Drops the job if it has not started in the pool yet
+                job.future.cancel()
+            elif job.task is not None:
+                job.task.cancel()
+        return True
+
+    def _prune(self):
+        try:
+            self.store.prune()
+        except OSError as e:
+            print(f"Failed to prune training job records: {e}")
+
+    def shutdown(self):
+        """Stop the pool without waiting for running jobs."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+def train_compatibility_model(
+    name: str,
+    model_type: str,
+    spool_path: str,
+    registry_root: str,
+    is_cancelled: Callable[[], bool] = lambda: False
+) -> Dict[str, Any]:
+    """
+    Pool worker: build pair features, train a compatibility model and register it as a new version.
+
+    Training tuples are read from a ChunkSpool one chunk at a time, so only
+    the feature matrix, not the raw user dicts, is held in full.
+    """
+    from app.ml.models import CompatibilityModel
+    from app.ml.registry import ModelRegistry
+
+    model = CompatibilityModel(model_type)
+    prepared = [model.prepare_training_data(chunk) for chunk in ChunkSpool.read(spool_path) if chunk]
+    X = np.vstack([X_chunk for X_chunk, _ in prepared])
+    y = np.concatenate([y_chunk for _, y_chunk in prepared])
+    metrics = model.train_on_features(X, y)
+
+    if is_cancelled():
+        raise TrainingCancelled()
+    version = ModelRegistry(registry_root).register(name, model.to_artifact(), metrics)
+    return {"version": version, "metrics": metrics}
+
+
+def fit_content_profiles(
+    users: List[Dict[str, Any]],
+    listings: List[Dict[str, Any]],
+    is_cancelled: Callable[[], bool] = lambda: False
+):
+    """Pool worker: fit a content-based filter on user and listing profiles."""
+    from app.ml.content_filtering import ContentBasedFiltering
+
+    content_model = ContentBasedFiltering()
+    if users:
+        content_model.fit_user_profiles(users)
+    if is_cancelled():
+        raise TrainingCancelled()
+    if listings:
+        content_model.fit_listing_profiles(listings)
+    return content_model
+
+
+# Global training executor instance
+training_executor = TrainingExecutor(settings.ml_training_workers, TrainingJobStore(settings.ml_model_dir))
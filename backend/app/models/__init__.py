@@ -2,7 +2,7 @@ from .database import Base, get_db_session, init_db
 from .user import User, UserType, VerificationStatus
 from .listing import Listing, ListingType, ListingStatus
 from .match import Match, MatchStatus
-from .conversation import Conversation, Message
+from .conversation import Conversation, Message, ConversationInbox
 from .embedding import UserEmbedding, ListingEmbedding, EmbeddingType
 from .notification import Notification, NotificationType
 
@@ -20,6 +20,7 @@ __all__ = [
     "MatchStatus",
     "Conversation",
     "Message",
+    "ConversationInbox",
     "UserEmbedding",
     "ListingEmbedding",
     "EmbeddingType",
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, DateTime, JSON, Boolean, ForeignKey, Text, ARRAY
+from sqlalchemy import Column, String, Integer, DateTime, JSON, Boolean, ForeignKey, Text, ARRAY, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
@@ -7,6 +7,10 @@ import uuid
 
 class Conversation(Base):
     __tablename__ = "conversations"
+    __table_args__ = (
+        # participants @> ARRAY[...] lookups
+        Index("ix_conversations_participants", "participants", postgresql_using="gin"),
+    )
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     thread_id = Column(String(255), unique=True, nullable=False, index=True)
@@ -42,6 +46,10 @@ class Conversation(Base):
 
 class Message(Base):
     __tablename__ = "messages"
+    __table_args__ = (
+        # Paging through a conversation's history by (created_at, id)
+        Index("ix_messages_conversation_created_at", "conversation_id", "created_at", "id"),
+    )
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     conversation_id = Column(UUID(as_uuid=True), ForeignKey("conversations.id"), nullable=False)
@@ -64,4 +72,34 @@ class Message(Base):
     sender = relationship("User")
     
     def __repr__(self):
-        return f"<Message(id={self.id}, sender_id={self.sender_id})>" 
\ No newline at end of file
+        return f"<Message(id={self.id}, sender_id={self.sender_id})>" 
+
+# Per-participant read model of a conversation, maintained by InboxService so a
+# user's inbox with previews and unread counts is a single index range scan
+class ConversationInbox(Base):
+    __tablename__ = "conversation_inbox"
+    __table_args__ = (
+        Index("ix_conversation_inbox_user_last_message", "user_id", "last_message_at"),
+    )
+    
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), primary_key=True)
+    conversation_id = Column(UUID(as_uuid=True), ForeignKey("conversations.id"), primary_key=True)
+    
+    # Latest message; last_message_at starts at the conversation's creation time
+    last_message_id = Column(UUID(as_uuid=True), nullable=True)
+    last_message_preview = Column(String(200), nullable=True)
+    last_message_sender_id = Column(UUID(as_uuid=True), nullable=True)
+    last_message_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    
+    # Read cursor: the newest message this user has read
+    last_read_message_id = Column(UUID(as_uuid=True), nullable=True)
+    last_read_at = Column(DateTime(timezone=True), nullable=True)  # created_at of that message
+    
+    # Messages from others after the read cursor
+    unread_count = Column(Integer, nullable=False, default=0, server_default="0")
+    
+    # Relationships
+    conversation = relationship("Conversation")
+    
+    def __repr__(self):
+        return f"<ConversationInbox(user_id={self.user_id}, conversation_id={self.conversation_id})>"
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, DateTime, Enum, JSON, Boolean, Text, ForeignKey, DECIMAL
+from sqlalchemy import Column, String, Integer, DateTime, Enum, JSON, Boolean, Text, ForeignKey, DECIMAL, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
@@ -19,6 +19,14 @@ class ListingStatus(str, enum.Enum):
 
 class Listing(Base):
     __tablename__ = "listings"
+    __table_args__ = (
+        # Keyset pagination of /listings/search, with and without a type filter;
+        # the GiST index on location is created by geoalchemy2 (idx_listings_location)
+        Index("ix_listings_status_created_at", "status", "created_at", "id"),
+        Index("ix_listings_status_type_created_at", "status", "listing_type", "created_at", "id"),
+        Index("ix_listings_status_price_min", "status", "price_min", "id"),
+        Index("ix_listings_status_type_price_min", "status", "listing_type", "price_min", "id"),
+    )
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
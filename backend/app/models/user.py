@@ -1,7 +1,7 @@
 from sqlalchemy import Column, String, Integer, DateTime, Enum, JSON, Boolean, Text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.sql import func
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import deferred, relationship
 from .database import Base
 import uuid
 import enum
@@ -24,7 +24,8 @@ class User(Base):
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     email = Column(String(255), unique=True, nullable=False, index=True)
     phone = Column(String(20), unique=True, nullable=True)
-    password_hash = Column(String(255), nullable=False)
+    # Deferred: only login reads it, so it never reaches caches or responses
+    password_hash = deferred(Column(String(255), nullable=False))
     
     # User classification
     user_type = Column(Enum(UserType), nullable=False, default=UserType.SEEKER)
@@ -7,6 +7,9 @@ class MessageCreate(BaseModel):
     content: str = Field(..., max_length=5000)
     message_type: str = Field(default="text")
 
+class MessageBatchCreate(BaseModel):
+    messages: List[MessageCreate] = Field(..., min_length=1, max_length=100)  # in send order
+
 class Message(BaseModel):
     id: UUID
     conversation_id: UUID
@@ -36,5 +39,30 @@ class Conversation(BaseModel):
     class Config:
         from_attributes = True
 
+class ConversationInboxEntry(Conversation):
+    last_message_id: Optional[UUID] = None
+    last_message_preview: Optional[str] = None
+    last_message_sender_id: Optional[UUID] = None
+    last_read_message_id: Optional[UUID] = None
+    last_read_at: Optional[datetime] = None
+    unread_count: int = 0
+
+class ReadReceiptCreate(BaseModel):
+    message_id: Optional[UUID] = None  # newest message read; defaults to the latest in the conversation
+
+class ReadCursor(BaseModel):
+    conversation_id: UUID
+    last_read_message_id: Optional[UUID] = None
+    last_read_at: Optional[datetime] = None
+    unread_count: int = 0
+
+class MessagePage(BaseModel):
+    messages: List[Message] = []  # oldest first
+    before_cursor: Optional[str] = None  # pass as `before` for older messages; None at the start of the thread
+    after_cursor: Optional[str] = None  # pass as `after` for newer messages
+    has_more: bool = False  # more messages in the requested direction
+
 class ConversationWithMessages(Conversation):
-    messages: List[Message] = [] 
\ No newline at end of file
+    messages: List[Message] = []  # latest page, oldest first
+    before_cursor: Optional[str] = None
+    after_cursor: Optional[str] = None 
\ No newline at end of file
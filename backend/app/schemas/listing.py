@@ -2,6 +2,7 @@ from pydantic import BaseModel, Field
 from typing import Optional, List, Dict, TYPE_CHECKING
 from uuid import UUID
 from datetime import datetime
+from enum import Enum
 from app.models.listing import ListingType, ListingStatus
 
 if TYPE_CHECKING:
@@ -45,4 +46,10 @@ class Listing(ListingBase):
         from_attributes = True
 
 class ListingWithUser(Listing):
-    user: "UserPublicProfile"
\ No newline at end of file
+    user: "UserPublicProfile"
+
+
+class ListingSort(str, Enum):
+    RECENCY = "recency"    # newest first
+    PRICE = "price"        # lowest price_min first, unpriced listings last
+    DISTANCE = "distance"  # nearest first; requires lat and lon
@@ -1,11 +1,17 @@
 from typing import List, Dict, Any, Optional
+import asyncio
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import select, func, cast, Integer
+from sqlalchemy.dialects.postgresql import array
 from datetime import datetime, timedelta
 from app.models.user import User
 from app.models.match import Match, MatchStatus
 from app.models.conversation import Conversation, Message
-from app.ml.collaborative_filtering import collaborative_filter
+from app.ml.collaborative_filtering import CollaborativeFiltering, collaborative_filter
+from app.core.config import settings
+
+# Rows fetched per round trip when streaming interaction aggregates
+INTERACTION_BATCH_SIZE = 5000
 
 class BehaviorTrackingService:
     """Service for tracking user behavior and generating implicit ratings."""
@@ -19,6 +25,7 @@ class BehaviorTrackingService:
             "conversation_length": 0.3,
             "response_speed": 0.2
         }
+        self._refit_task: Optional[asyncio.Task] = None
     
     async def collect_user_interactions(self, db: AsyncSession) -> List[Dict[str, Any]]:
         """
@@ -29,91 +36,141 @@ class BehaviorTrackingService:
         """
         interactions = []
         
-        # Get all matches and convert to ratings
-        match_result = await db.execute(select(Match))
-        matches = match_result.scalars().all()
-        
-        for match in matches:
-            rating = await self._calculate_match_rating(db, match)
-            if rating > 0:
-                interactions.append({
-                    "user_id": str(match.user_id),
-                    "target_id": str(match.target_id),
-                    "rating": rating,
-                    "interaction_type": "match",
-                    "timestamp": match.created_at
-                })
-        
-        # Get conversation-based interactions
-        conversation_result = await db.execute(select(Conversation))
-        conversations = conversation_result.scalars().all()
+        # Matches, each with the message count of the pair's conversation
+        match_stream = await db.stream(
+            self._match_interactions_query().execution_options(yield_per=INTERACTION_BATCH_SIZE)
+        )
+        async for rows in match_stream.partitions():
+            for row in rows:
+                rating = self._calculate_match_rating(row.status, row.user_action, row.message_count)
+                if rating > 0:
+                    interactions.append({
+                        "user_id": str(row.user_id),
+                        "target_id": str(row.target_id),
+                        "rating": rating,
+                        "interaction_type": "match",
+                        "timestamp": row.created_at
+                    })
         
-        for conversation in conversations:
-            if len(conversation.participants) == 2:
-                ratings = await self._calculate_conversation_ratings(db, conversation)
-                interactions.extend(ratings)
+        # Two-party conversations with per-participant message aggregates
+        conversation_stream = await db.stream(
+            self._conversation_interactions_query().execution_options(yield_per=INTERACTION_BATCH_SIZE)
+        )
+        async for rows in conversation_stream.partitions():
+            for row in rows:
+                interactions.extend(self._calculate_conversation_ratings(row))
         
         return interactions
     
-    async def _calculate_match_rating(self, db: AsyncSession, match: Match) -> float:
+    def _match_interactions_query(self):
+        """Matches joined to the largest message count of a conversation between the pair."""
+        return (
+            select(
+                Match.user_id,
+                Match.target_id,
+                Match.status,
+                Match.user_action,
+                Match.created_at,
+                func.max(Conversation.message_count).label("message_count")
+            )
+            .outerjoin(
+                Conversation,
+                # participants is the generic ARRAY type, so spell out PostgreSQL's @>
+                Conversation.participants.op("@>")(array([Match.user_id, Match.target_id]))
+            )
+            .group_by(Match.id)
+        )
+    
+    def _conversation_interactions_query(self):
+        """Per-conversation and per-participant message aggregates for two-party conversations."""
+        # One pass over messages; conversation totals are rolled up from the per-sender rows
+        sender_stats = (
+            select(
+                Message.conversation_id,
+                Message.sender_id,
+                func.count().label("sent"),
+                func.avg(func.char_length(Message.content)).label("avg_length"),
+                func.min(Message.created_at).label("first_message_at"),
+                func.max(Message.created_at).label("last_message_at")
+            )
+            .group_by(Message.conversation_id, Message.sender_id)
+            .cte("sender_stats")
+        )
+        conversation_stats = (
+            select(
+                sender_stats.c.conversation_id,
+                cast(func.sum(sender_stats.c.sent), Integer).label("total_messages"),
+                func.min(sender_stats.c.first_message_at).label("first_message_at"),
+                func.max(sender_stats.c.last_message_at).label("last_message_at")
+            )
+            .group_by(sender_stats.c.conversation_id)
+            .subquery()
+        )
+        user1_stats = sender_stats.alias("user1_stats")
+        user2_stats = sender_stats.alias("user2_stats")
+        
+        return (
+            select(
+                Conversation.participants,
+                Conversation.created_at,
+                conversation_stats.c.total_messages,
+                conversation_stats.c.first_message_at,
+                conversation_stats.c.last_message_at,
+                user1_stats.c.sent.label("user1_sent"),
+                user1_stats.c.avg_length.label("user1_avg_length"),
+                user2_stats.c.sent.label("user2_sent"),
+                user2_stats.c.avg_length.label("user2_avg_length")
+            )
+            .join(conversation_stats, conversation_stats.c.conversation_id == Conversation.id)
+            .outerjoin(
+                user1_stats,
+                (user1_stats.c.conversation_id == Conversation.id) &
+                (user1_stats.c.sender_id == Conversation.participants[1])
+            )
+            .outerjoin(
+                user2_stats,
+                (user2_stats.c.conversation_id == Conversation.id) &
+                (user2_stats.c.sender_id == Conversation.participants[2])
+            )
+            .where(func.cardinality(Conversation.participants) == 2)
+        )
+    
+    def _calculate_match_rating(
+        self, 
+        status: MatchStatus, 
+        user_action: Optional[str], 
+        message_count: Optional[int]
+    ) -> float:
         """Calculate rating based on match status and outcome."""
         base_rating = 0.0
         
         # Base rating from match status
-        if match.status == MatchStatus.MUTUAL:
+        if status == MatchStatus.MUTUAL:
             base_rating = 1.0
-        elif match.status == MatchStatus.PENDING and match.user_action == "accepted":
+        elif status == MatchStatus.PENDING and user_action == "accepted":
             base_rating = 0.7
-        elif match.status == MatchStatus.DECLINED:
+        elif status == MatchStatus.DECLINED:
             base_rating = 0.1  # Small positive rating for seeing the profile
         else:
             base_rating = 0.3  # Default for other interactions
         
         # Boost rating if there's a conversation
-        conversation_result = await db.execute(
-            select(Conversation).where(
-                Conversation.participants.contains([match.user_id]) &
-                Conversation.participants.contains([match.target_id])
-            )
-        )
-        conversation = conversation_result.scalar_one_or_none()
-        
-        if conversation and conversation.message_count > 0:
-            conversation_boost = min(0.3, conversation.message_count * 0.05)
+        if message_count:
+            conversation_boost = min(0.3, message_count * 0.05)
             base_rating += conversation_boost
         
         return min(1.0, base_rating)
     
-    async def _calculate_conversation_ratings(
-        self, 
-        db: AsyncSession, 
-        conversation: Conversation
-    ) -> List[Dict[str, Any]]:
-        """Calculate mutual ratings based on conversation activity."""
-        if len(conversation.participants) != 2:
-            return []
-        
-        user1_id, user2_id = conversation.participants
-        
-        # Get conversation messages
-        message_result = await db.execute(
-            select(Message).where(Message.conversation_id == conversation.id)
-        )
-        messages = message_result.scalars().all()
-        
-        if not messages:
-            return []
-        
-        # Calculate engagement for each user
-        user1_messages = [m for m in messages if m.sender_id == user1_id]
-        user2_messages = [m for m in messages if m.sender_id == user2_id]
+    def _calculate_conversation_ratings(self, row) -> List[Dict[str, Any]]:
+        """Calculate mutual ratings from a row of _conversation_interactions_query."""
+        user1_id, user2_id = row.participants
         
         # Base rating from message participation
-        user1_rating = self._calculate_message_rating(user1_messages, len(messages))
-        user2_rating = self._calculate_message_rating(user2_messages, len(messages))
+        user1_rating = self._calculate_message_rating(row.user1_sent, row.user1_avg_length, row.total_messages)
+        user2_rating = self._calculate_message_rating(row.user2_sent, row.user2_avg_length, row.total_messages)
         
         # Boost for conversation length and duration
-        conversation_duration = self._calculate_conversation_duration(messages)
+        conversation_duration = row.last_message_at - row.first_message_at
         duration_boost = min(0.2, conversation_duration.days * 0.02)
         
         user1_rating += duration_boost
@@ -127,7 +184,7 @@ class BehaviorTrackingService:
                 "target_id": str(user2_id),
                 "rating": min(1.0, user1_rating),
                 "interaction_type": "conversation",
-                "timestamp": conversation.created_at
+                "timestamp": row.created_at
             })
         
         if user2_rating > 0:
@@ -136,34 +193,30 @@ class BehaviorTrackingService:
                 "target_id": str(user1_id),
                 "rating": min(1.0, user2_rating),
                 "interaction_type": "conversation",
-                "timestamp": conversation.created_at
+                "timestamp": row.created_at
             })
         
         return ratings
     
-    def _calculate_message_rating(self, user_messages: List[Message], total_messages: int) -> float:
+    def _calculate_message_rating(
+        self, 
+        sent: Optional[int], 
+        avg_message_length: Optional[float], 
+        total_messages: int
+    ) -> float:
         """Calculate rating based on user's message participation."""
-        if not user_messages or total_messages == 0:
+        if not sent or total_messages == 0:
             return 0.0
         
         # Base rating from participation ratio
-        participation_ratio = len(user_messages) / total_messages
+        participation_ratio = sent / total_messages
         base_rating = participation_ratio * 0.8
         
         # Bonus for message length and engagement
-        avg_message_length = sum(len(m.content) for m in user_messages) / len(user_messages)
-        length_bonus = min(0.2, avg_message_length / 500)  # Up to 0.2 for long messages
+        length_bonus = min(0.2, float(avg_message_length) / 500)  # Up to 0.2 for long messages
         
         return base_rating + length_bonus
     
-    def _calculate_conversation_duration(self, messages: List[Message]) -> timedelta:
-        """Calculate the duration of a conversation."""
-        if len(messages) < 2:
-            return timedelta(0)
-        
-        timestamps = [m.created_at for m in messages]
-        return max(timestamps) - min(timestamps)
-    
     async def update_collaborative_filter(self, db: AsyncSession):
         """Update the collaborative filtering model with latest user interactions."""
         try:
@@ -252,6 +305,39 @@ class BehaviorTrackingService:
         if rating > 0:
             # Update collaborative filter in real-time
             collaborative_filter.update_user_interaction(user_id, target_id, rating)
+            
+            # Refit in the background once online updates have drifted far enough
+            if collaborative_filter.drift >= settings.cf_refit_drift and (
+                self._refit_task is None or self._refit_task.done()
+            ):
+                self._refit_task = asyncio.create_task(self._refit_collaborative_filter())
+    
+    async def _refit_collaborative_filter(self):
+        """Refit the collaborative filter off the event loop, then swap it in."""
+        try:
+            # Export and fit both run in the executor; only the update buffer is copied here
+            snapshot = collaborative_filter.interaction_snapshot()
+            log_offset = len(collaborative_filter.interaction_log)
+            
+            model = CollaborativeFiltering(collaborative_filter.user_neighbors.n_neighbors)
+            
+            def refit() -> int:
+                interactions = collaborative_filter.export_interactions(snapshot)
+                model.fit(interactions)
+                return len(interactions)
+            
+            loop = asyncio.get_running_loop()
+            n_interactions = await loop.run_in_executor(None, refit)
+            
+            # Replay interactions recorded while the refit was running
+            for user_id, target_id, rating in collaborative_filter.interaction_log[log_offset:]:
+                model.update_user_interaction(user_id, target_id, rating)
+            
+            collaborative_filter.replace_with(model)
+            print(f"Collaborative filtering refitted with {n_interactions} interactions")
+            
+        except Exception as e:
+            print(f"Background collaborative filtering refit failed: {e}")
     
     def _action_to_rating(self, action: str) -> float:
         """Convert user action to implicit rating."""
@@ -11,18 +11,20 @@ class ContentRecommendationService:
     def __init__(self):
         self.last_update = None
     
+    async def collect_user_profiles(self, db: AsyncSession) -> List[Dict[str, Any]]:
+        """Profiles of all active users, as dicts for the content-based filter."""
+        result = await db.execute(select(User).where(User.is_active == True))
+        return [self._user_to_dict(user) for user in result.scalars().all()]
+    
+    async def collect_listing_profiles(self, db: AsyncSession) -> List[Dict[str, Any]]:
+        """Profiles of all available listings, as dicts for the content-based filter."""
+        result = await db.execute(select(Listing).where(Listing.is_available == True))
+        return [self._listing_to_dict(listing) for listing in result.scalars().all()]
+    
     async def update_user_profiles(self, db: AsyncSession):
         """Update user profiles in the content-based filtering system."""
         try:
-            # Get all active users
-            result = await db.execute(select(User).where(User.is_active == True))
-            users = result.scalars().all()
-            
-            # Convert to dict format
-            user_dicts = []
-            for user in users:
-                user_dict = self._user_to_dict(user)
-                user_dicts.append(user_dict)
+            user_dicts = await self.collect_user_profiles(db)
             
             # Fit content filter with user profiles
             if user_dicts:
@@ -39,15 +41,7 @@ class ContentRecommendationService:
     async def update_listing_profiles(self, db: AsyncSession):
         """Update listing profiles in the content-based filtering system."""
         try:
-            # Get all active listings
-            result = await db.execute(select(Listing).where(Listing.is_available == True))
-            listings = result.scalars().all()
-            
-            # Convert to dict format
-            listing_dicts = []
-            for listing in listings:
-                listing_dict = self._listing_to_dict(listing)
-                listing_dicts.append(listing_dict)
+            listing_dicts = await self.collect_listing_profiles(db)
             
             # Fit content filter with listing profiles
             if listing_dicts:
@@ -182,6 +176,7 @@ class ContentRecommendationService:
             "profile_completion_score": user.profile_completion_score,
             "preferences": user.preferences or {},
             "lifestyle_data": user.lifestyle_data or {},
+            "updated_at": user.updated_at,
             "bio": getattr(user, 'bio', ''),
             "interests": getattr(user, 'interests', [])
         }
@@ -0,0 +1,223 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from sqlalchemy import case, func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.pagination import keyset_after
+from app.models.conversation import Conversation, ConversationInbox, Message
+
+# Characters of the last message shown in the inbox
+PREVIEW_LENGTH = 140
+
+class InboxService:
+    """Maintains and reads the per-user ConversationInbox rows."""
+
+    def _preview(self, content: str) -> str:
+        return content if len(content) <= PREVIEW_LENGTH else content[:PREVIEW_LENGTH - 1] + "…"
+
+    async def add_conversation(self, db: AsyncSession, conversation: Conversation):
+        """Create an inbox row for each participant of a new conversation."""
+        await db.execute(
+            insert(ConversationInbox)
+            .values([
+                {"user_id": participant_id, "conversation_id": conversation.id}
+                for participant_id in conversation.participants
+            ])
+            .on_conflict_do_nothing()
+        )
+
+    async def record_messages(
+        self,
+        db: AsyncSession,
+        conversation: Conversation,
+        sender_id: UUID,
+        last_message_id: UUID,
+        last_content: str,
+        count: int = 1,
+        last_message_at: Optional[datetime] = None
+    ):
+        """
+        Update every participant's inbox row for messages just sent.
+
+        One upsert covers all participants: it sets the last message, which
+        is timestamped with the transaction time like the messages
+        themselves unless ``last_message_at`` is given, and adds ``count``
+        to the unread counter of everyone but the sender. Missing rows are
+        created. Sends can commit in a different order than their
+        timestamps, so the last message is only replaced by a message that
+        is not older; the unread increment always applies.
+
+        Args:
+            db: Session of the transaction inserting the messages
+            conversation: Conversation the messages belong to
+            sender_id: Sender of the messages
+            last_message_id: Id of the newest message
+            last_content: Content of the newest message
+            count: Number of messages sent
+            last_message_at: created_at of the newest message, if already known
+        """
+        preview = self._preview(last_content)
+        statement = insert(ConversationInbox).values([
+            {
+                "user_id": participant_id,
+                "conversation_id": conversation.id,
+                "last_message_id": last_message_id,
+                "last_message_preview": preview,
+                "last_message_sender_id": sender_id,
+                "last_message_at": last_message_at if last_message_at is not None else func.now(),
+                "unread_count": 0 if participant_id == sender_id else count
+            }
+            for participant_id in conversation.participants
+        ])
+        excluded = statement.excluded
+        is_newer = excluded.last_message_at >= ConversationInbox.last_message_at
+        last_message = {
+            key: case((is_newer, excluded[key]), else_=getattr(ConversationInbox, key))
+            for key in ("last_message_id", "last_message_preview", "last_message_sender_id", "last_message_at")
+        }
+        await db.execute(
+            statement.on_conflict_do_update(
+                index_elements=[ConversationInbox.user_id, ConversationInbox.conversation_id],
+                set_={
+                    **last_message,
+                    "unread_count": ConversationInbox.unread_count + excluded.unread_count
+                }
+            )
+        )
+
+    def unread_count_query(self, conversation_id: UUID, user_id: UUID, read_at: datetime, read_message_id: UUID):
+        """Messages from others after a read cursor, counted on the (conversation_id, created_at, id) index."""
+        return (
+            select(func.count())
+            .select_from(Message)
+            .where(
+                Message.conversation_id == conversation_id,
+                Message.sender_id != user_id,
+                keyset_after([Message.created_at, Message.id], [read_at, read_message_id])
+            )
+            .scalar_subquery()
+        )
+
+    async def advance_read_cursor(
+        self,
+        db: AsyncSession,
+        conversation_id: UUID,
+        user_id: UUID,
+        message_id: UUID,
+        message_created_at: datetime
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Move a user's read cursor forward to a message.
+
+        One UPDATE sets the cursor and recounts unread messages from it,
+        however many messages it covers. The inbox row is locked first:
+        a concurrent send increments unread_count on that row, and an UPDATE
+        that waited on it would still recount from its older snapshot,
+        missing the new message and overwriting the increment. Once the lock
+        is held, the UPDATE's snapshot includes every committed send. A
+        cursor is never moved backwards, so receipts arriving out of order
+        are harmless.
+
+        Args:
+            db: Database session
+            conversation_id: Conversation being read
+            user_id: Reader
+            message_id: Newest message read
+            message_created_at: created_at of that message
+
+        Returns:
+            The new cursor and unread count, or None if the cursor was
+            already at or past the message
+        """
+        locked = await db.execute(
+            select(ConversationInbox.user_id)
+            .where(ConversationInbox.user_id == user_id, ConversationInbox.conversation_id == conversation_id)
+            .with_for_update()
+        )
+        if locked.first() is None:
+            return None
+
+        result = await db.execute(
+            update(ConversationInbox)
+            .where(
+                ConversationInbox.user_id == user_id,
+                ConversationInbox.conversation_id == conversation_id,
+                (ConversationInbox.last_read_at.is_(None))
+                | keyset_after(
+                    [ConversationInbox.last_read_at, ConversationInbox.last_read_message_id],
+                    [message_created_at, message_id],
+                    descending=True
+                )
+            )
+            .values(
+                last_read_message_id=message_id,
+                last_read_at=message_created_at,
+                unread_count=self.unread_count_query(conversation_id, user_id, message_created_at, message_id)
+            )
+            .returning(
+                ConversationInbox.last_read_message_id,
+                ConversationInbox.last_read_at,
+                ConversationInbox.unread_count
+            )
+        )
+        row = result.first()
+        if row is None:
+            return None
+        return {"last_read_message_id": row[0], "last_read_at": row[1], "unread_count": row[2]}
+
+    async def get_read_cursor(self, db: AsyncSession, conversation_id: UUID, user_id: UUID) -> Dict[str, Any]:
+        """A user's current read cursor and unread count for a conversation."""
+        result = await db.execute(
+            select(
+                ConversationInbox.last_read_message_id,
+                ConversationInbox.last_read_at,
+                ConversationInbox.unread_count
+            ).where(ConversationInbox.user_id == user_id, ConversationInbox.conversation_id == conversation_id)
+        )
+        row = result.first()
+        if row is None:
+            return {"last_read_message_id": None, "last_read_at": None, "unread_count": 0}
+        return {"last_read_message_id": row[0], "last_read_at": row[1], "unread_count": row[2]}
+
+    def inbox_query(self, user_id: UUID):
+        """A user's active conversations with inbox fields, most recent first."""
+        return (
+            select(Conversation, ConversationInbox)
+            .join(Conversation, Conversation.id == ConversationInbox.conversation_id)
+            .where(ConversationInbox.user_id == user_id, Conversation.is_active == True)
+            .order_by(ConversationInbox.last_message_at.desc())
+        )
+
+    async def get_inbox(self, db: AsyncSession, user_id: UUID) -> List[Dict[str, Any]]:
+        """
+        A user's inbox in one query.
+
+        Returns:
+            Conversation fields plus last_message_*, last_read_* and unread_count, per conversation
+        """
+        result = await db.execute(self.inbox_query(user_id))
+        return [
+            {
+                "id": conversation.id,
+                "thread_id": conversation.thread_id,
+                "participants": conversation.participants,
+                "listing_id": conversation.listing_id,
+                "is_active": conversation.is_active,
+                "message_count": conversation.message_count or 0,
+                "created_at": conversation.created_at,
+                "last_message_at": inbox.last_message_at,
+                "last_message_id": inbox.last_message_id,
+                "last_message_preview": inbox.last_message_preview,
+                "last_message_sender_id": inbox.last_message_sender_id,
+                "last_read_message_id": inbox.last_read_message_id,
+                "last_read_at": inbox.last_read_at,
+                "unread_count": inbox.unread_count
+            }
+            for conversation, inbox in result.all()
+        ]
+
+# Global inbox service instance
+inbox_service = InboxService()
@@ -0,0 +1,105 @@
+import asyncio
+import random
+import time
+from typing import List, Optional
+from uuid import UUID
+
+from sqlalchemy import func, select, tablesample, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.listing import Listing, ListingStatus
+
+class ListingSampler:
+    """
+    Random active listings without ORDER BY random().
+
+    Keeps a shuffled pool of active listing ids, refreshed every
+    ``refresh_interval`` seconds from a TABLESAMPLE SYSTEM scan sized from
+    the planner's row estimate, so the refresh reads a roughly constant
+    number of pages whatever the table size. Requests draw ids from the
+    pool and load them by primary key; the status is checked again there,
+    since a listing may have been paused or filled since the refresh.
+    """
+
+    def __init__(self, pool_size: int, refresh_interval: int):
+        self.pool_size = pool_size
+        self.refresh_interval = refresh_interval
+        self._pool: List[UUID] = []
+        self._refreshed_at: Optional[float] = None
+        self._refresh_lock = asyncio.Lock()
+
+    def _is_stale(self) -> bool:
+        return (
+            not self._pool
+            or self._refreshed_at is None
+            or time.monotonic() - self._refreshed_at > self.refresh_interval
+        )
+
+    async def sample(self, db: AsyncSession, limit: int) -> List[Listing]:
+        """
+        Up to ``limit`` random active listings.
+
+        Args:
+            db: Database session
+            limit: Number of listings
+
+        Returns:
+            Listings in random order
+        """
+        if self._is_stale():
+            async with self._refresh_lock:
+                if self._is_stale():
+                    await self.refresh(db)
+
+        # Draw extra ids to make up for listings deactivated since the refresh
+        ids = random.sample(self._pool, min(len(self._pool), limit * 2))
+        if not ids:
+            return []
+
+        result = await db.execute(
+            select(Listing).where(Listing.id.in_(ids), Listing.status == ListingStatus.ACTIVE)
+        )
+        listings = {listing.id: listing for listing in result.scalars().all()}
+
+        inactive = set(ids) - listings.keys()
+        if inactive:
+            self._pool = [listing_id for listing_id in self._pool if listing_id not in inactive]
+
+        return [listings[listing_id] for listing_id in ids if listing_id in listings][:limit]
+
+    async def refresh(self, db: AsyncSession):
+        """Rebuild the id pool from a sample of the listings table."""
+        estimated_rows = (await db.execute(
+            text("SELECT reltuples FROM pg_class WHERE oid = 'listings'::regclass")
+        )).scalar()
+
+        percent = sample_percent(estimated_rows, self.pool_size * 2)
+        if percent is None:
+            # Small or never-analyzed table: reading it whole is as cheap as sampling
+            query = select(Listing.id).where(Listing.status == ListingStatus.ACTIVE).limit(self.pool_size * 10)
+        else:
+            sampled = tablesample(Listing.__table__, func.system(percent))
+            query = select(sampled.c.id).where(sampled.c.status == ListingStatus.ACTIVE)
+
+        pool = list((await db.execute(query)).scalars().all())
+        random.shuffle(pool)
+        self._pool = pool[:self.pool_size]
+        self._refreshed_at = time.monotonic()
+
+def sample_percent(estimated_rows: Optional[float], target_rows: int) -> Optional[float]:
+    """
+    TABLESAMPLE percentage expected to return about target_rows rows.
+
+    Returns None when the table is too small for sampling to pay off, or
+    has no estimate yet (reltuples is -1 before the first ANALYZE).
+    """
+    if estimated_rows is None or estimated_rows < target_rows * 10:
+        return None
+    return 100.0 * target_rows / estimated_rows
+
+# Global listing sampler instance
+listing_sampler = ListingSampler(
+    pool_size=settings.listing_sample_pool_size,
+    refresh_interval=settings.listing_sample_refresh_seconds
+)
@@ -0,0 +1,69 @@
+import hashlib
+import json
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.listing import Listing, ListingStatus
+
+class LocationCache:
+    """
+    Cities with active listings and their listing counts.
+
+    The list is computed with one GROUP BY and reused until a listing is
+    created, updated or expired through this worker, or until ``ttl``
+    seconds pass, which bounds staleness from writes handled by other
+    workers. Each version of the list has an ETag so clients can revalidate
+    it cheaply.
+    """
+
+    def __init__(self, ttl: int):
+        self.ttl = ttl
+        self._locations: Optional[List[Dict[str, Any]]] = None
+        self._etag: Optional[str] = None
+        self._loaded_at: Optional[float] = None
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, db: AsyncSession) -> Tuple[List[Dict[str, Any]], str]:
+        """
+        City counts, loading them if the cache is empty or expired.
+
+        Returns:
+            Tuple of ([{"city", "count"}, ...] sorted by city, ETag)
+        """
+        if self._locations is not None and time.monotonic() - self._loaded_at < self.ttl:
+            self.hits += 1
+            return self._locations, self._etag
+
+        self.misses += 1
+        generation = self._generation
+        result = await db.execute(
+            select(Listing.city, func.count().label("count"))
+            .where(Listing.city.isnot(None), Listing.status == ListingStatus.ACTIVE)
+            .group_by(Listing.city)
+            .order_by(Listing.city)
+        )
+        locations = [{"city": city, "count": count} for city, count in result.all()]
+
+        payload = json.dumps(locations, separators=(",", ":")).encode()
+        etag = f'"{hashlib.sha1(payload).hexdigest()}"'
+
+        # Don't cache a result that a concurrent invalidation already made stale
+        if generation == self._generation:
+            self._locations, self._etag, self._loaded_at = locations, etag, time.monotonic()
+        return locations, etag
+
+    def invalidate(self):
+        """Drop the cached list after a listing changed."""
+        self._generation += 1
+        self._locations = None
+        self._etag = None
+        self._loaded_at = None
+
+# Global location cache instance
+location_cache = LocationCache(ttl=settings.listing_locations_ttl)
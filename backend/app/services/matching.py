@@ -1,26 +1,25 @@
+import numpy as np
 from typing import List, Dict, Any
 from app.models.user import User
 from app.models.listing import Listing
 from app.ml.models import model_manager
+from app.ml.batch_scoring import UserBatch, batch_scorer
 
 class MatchingService:
-    def __init__(self):
-        self.use_ml = False  # Flag to enable/disable ML
-        
-    def enable_ml_matching(self):
-        """Enable ML-based matching."""
-        self.use_ml = True
-        
-    def disable_ml_matching(self):
-        """Disable ML-based matching (fallback to rule-based)."""
-        self.use_ml = False
+    """
+    Compatibility scoring and match ranking.
+    
+    ML scoring is used whenever the registry has an active model, as seen by
+    ModelManager.refresh_active_model, so activating or disabling a model in
+    one worker switches every worker.
+    """
     
     def calculate_compatibility(self, user1: User, user2: User) -> float:
         """
         Calculate compatibility score between two users.
         Uses ML model if available, otherwise falls back to rule-based approach.
         """
-        if self.use_ml and model_manager.active_model:
+        if model_manager.refresh_active_model():
             return self._ml_compatibility(user1, user2)
         else:
             return self._rule_based_compatibility(user1, user2)
@@ -47,6 +46,31 @@ class MatchingService:
             print(f"ML prediction failed, falling back to rules: {e}")
             return self._rule_based_compatibility(user1, user2)
     
+    def _ml_compatibility_batch(
+        self,
+        user: User,
+        candidates: List[User],
+        rule_scores: np.ndarray,
+        eligible: np.ndarray
+    ) -> np.ndarray:
+        """Blend a single batched ML prediction with precomputed rule-based scores."""
+        indices = np.flatnonzero(eligible)
+        if len(indices) == 0:
+            return rule_scores
+        
+        try:
+            user_data = self._user_to_feature_dict(user)
+            candidates_data = [self._user_to_feature_dict(candidates[i]) for i in indices]
+            ml_scores = model_manager.predict_compatibility_batch(user_data, candidates_data)
+        except Exception as e:
+            print(f"ML prediction failed, falling back to rules: {e}")
+            return rule_scores
+        
+        # Weighted combination (70% ML, 30% rules)
+        scores = rule_scores.copy()
+        scores[indices] = np.clip(0.7 * ml_scores + 0.3 * rule_scores[indices], 0.0, 1.0)
+        return scores
+    
     def _rule_based_compatibility(self, user1: User, user2: User) -> float:
         """Original rule-based compatibility calculation."""
         score = 0.0
@@ -105,36 +129,49 @@ class MatchingService:
         potential_matches: List[User],
         use_advanced_filtering: bool = True
     ) -> List[Dict[str, Any]]:
-        """Find and score matches for a given user with enhanced filtering."""
-        matches = []
+        """
+        Find and score matches for a given user with enhanced filtering.
+
+        Filters, rule-based scores and dynamic thresholds are computed for all
+        candidates in one vectorized pass (see app.ml.batch_scoring); match
+        reasons are only generated for the matches that are returned.
+        """
+        candidates = [c for c in potential_matches if c.id != user.id]
+        if not candidates:
+            return []
         
-        for potential_match in potential_matches:
-            if user.id == potential_match.id:
-                continue
-            
-            # Advanced pre-filtering
-            if use_advanced_filtering and not self._passes_advanced_filters(user, potential_match):
-                continue
-            
-            score = self.calculate_compatibility(user, potential_match)
-            
-            # Dynamic threshold based on user verification and profile completion
-            threshold = self._calculate_dynamic_threshold(user, potential_match)
-            
-            if score > threshold:
-                matches.append({
-                    "user": potential_match,
-                    "compatibility_score": score,
-                    "match_reasons": self._generate_match_reasons(user, potential_match, score)
-                })
+        user_batch = UserBatch.from_users([user])
+        candidate_batch = UserBatch.from_users(candidates)
         
-        # Sort matches by score and apply diversity filtering
-        matches.sort(key=lambda x: x["compatibility_score"], reverse=True)
+        # Advanced pre-filtering
+        if use_advanced_filtering:
+            eligible = batch_scorer.passes_advanced_filters(user_batch, candidate_batch)
+        else:
+            eligible = np.ones(len(candidates), dtype=bool)
+        
+        scores = batch_scorer.rule_based_scores(user_batch, candidate_batch)
+        if model_manager.refresh_active_model():
+            scores = self._ml_compatibility_batch(user, candidates, scores, eligible)
+        
+        # Dynamic threshold based on user verification and profile completion
+        thresholds = batch_scorer.dynamic_thresholds(user_batch, candidate_batch)
+        
+        # Sort matches by score
+        ranked = batch_scorer.rank(scores, eligible & (scores > thresholds))
+        matches = [
+            {"user": candidates[i], "compatibility_score": float(scores[i])}
+            for i in ranked
+        ]
         
         # Apply diversity filtering to avoid too similar matches
         if len(matches) > 10:
             matches = self._apply_diversity_filtering(matches)
         
+        for match in matches:
+            match["match_reasons"] = self._generate_match_reasons(
+                user, match["user"], match["compatibility_score"]
+            )
+        
         return matches
     
     def _passes_advanced_filters(self, user1: User, user2: User) -> bool:
@@ -296,6 +333,7 @@ class MatchingService:
             "profile_completion_score": user.profile_completion_score,
             "preferences": user.preferences or {},
             "lifestyle_data": user.lifestyle_data or {},
+            "updated_at": user.updated_at,
             "created_at": user.created_at
         }
 
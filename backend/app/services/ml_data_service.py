@@ -1,11 +1,24 @@
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Tuple, Optional, AsyncIterator
+from datetime import datetime
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, func, distinct, cast, Float, true
+from sqlalchemy.dialects.postgresql import array
+from sqlalchemy.orm import aliased
 from app.models.user import User
 from app.models.match import Match, MatchStatus
 from app.models.conversation import Conversation, Message
 import asyncio
 
+# Matches streamed per round trip (and training tuples per chunk) during extraction
+TRAINING_CHUNK_SIZE = 1000
+
+# User columns needed for feature extraction
+USER_FIELDS = (
+    "id", "user_type", "date_of_birth", "is_verified_email", "is_verified_phone",
+    "is_verified_identity", "is_background_checked", "profile_completion_score",
+    "preferences", "lifestyle_data", "updated_at", "created_at"
+)
+
 class MLDataService:
     """Service for collecting and preparing ML training data."""
     
@@ -17,79 +30,103 @@ class MLDataService:
             List of (user1_data, user2_data, compatibility_score) tuples
         """
         training_pairs = []
-        
-        # Get all matches with outcomes
-        result = await db.execute(
-            select(Match)
-            .where(Match.status.in_([MatchStatus.MUTUAL, MatchStatus.DECLINED]))
-        )
-        matches = result.scalars().all()
-        
-        for match in matches:
-            # Get user data
-            user1_result = await db.execute(select(User).where(User.id == match.user_id))
-            user2_result = await db.execute(select(User).where(User.id == match.target_id))
-            
-            user1 = user1_result.scalar_one_or_none()
-            user2 = user2_result.scalar_one_or_none()
-            
-            if not user1 or not user2:
-                continue
-            
-            # Convert to dict format
-            user1_data = self._user_to_dict(user1)
-            user2_data = self._user_to_dict(user2)
-            
-            # Calculate compatibility score based on match outcome
-            if match.status == MatchStatus.MUTUAL:
-                # Get conversation data to refine score
-                conversation_score = await self._calculate_conversation_score(
-                    db, match.user_id, match.target_id
-                )
-                base_score = 0.8  # Base score for mutual match
-                compatibility_score = min(1.0, base_score + conversation_score)
-            else:
-                # Declined matches
-                compatibility_score = max(0.0, match.compatibility_score - 0.3)
-            
-            training_pairs.append((user1_data, user2_data, compatibility_score))
-        
+        async for chunk in self.iter_training_data(db):
+            training_pairs.extend(chunk)
         return training_pairs
     
-    async def _calculate_conversation_score(
+    async def iter_training_data(
         self, 
         db: AsyncSession, 
-        user1_id: str, 
-        user2_id: str
-    ) -> float:
-        """Calculate compatibility score based on conversation activity."""
-        # Find conversation between users
-        result = await db.execute(
-            select(Conversation)
-            .where(
-                Conversation.participants.contains([user1_id]) &
-                Conversation.participants.contains([user2_id])
-            )
-        )
-        conversation = result.scalar_one_or_none()
+        chunk_size: int = TRAINING_CHUNK_SIZE
+    ) -> AsyncIterator[List[Tuple[Dict, Dict, float]]]:
+        """
+        Stream training data in chunks from a single query over matches.
         
-        if not conversation:
-            return 0.0
+        Args:
+            db: Database session
+            chunk_size: Number of training tuples per chunk
+        
+        Yields:
+            Lists of (user1_data, user2_data, compatibility_score) tuples
+        """
+        result = await db.stream(self._training_data_query().execution_options(yield_per=chunk_size))
         
-        # Get messages in conversation
-        message_result = await db.execute(
-            select(Message)
-            .where(Message.conversation_id == conversation.id)
+        async for rows in result.partitions():
+            chunk = []
+            for row in rows:
+                user1_data = self._row_to_user_dict(row, "user1_")
+                user2_data = self._row_to_user_dict(row, "user2_")
+                
+                # Calculate compatibility score based on match outcome
+                if row.status == MatchStatus.MUTUAL:
+                    # Use conversation data to refine score
+                    conversation_score = self._calculate_conversation_score(
+                        row.message_count, row.unique_senders, row.first_message_at, row.last_message_at
+                    )
+                    base_score = 0.8  # Base score for mutual match
+                    compatibility_score = min(1.0, base_score + conversation_score)
+                else:
+                    # Declined matches
+                    compatibility_score = max(0.0, row.compatibility_score - 0.3)
+                
+                chunk.append((user1_data, user2_data, compatibility_score))
+            
+            yield chunk
+    
+    def _training_data_query(self):
+        """Matches with outcomes joined to both users and their conversation's message aggregates."""
+        user1 = aliased(User)
+        user2 = aliased(User)
+        
+        # Busiest conversation between the pair, only needed for mutual matches
+        conversation_id = (
+            select(Conversation.id)
+            .where(Conversation.participants.op("@>")(array([Match.user_id, Match.target_id])))
+            .order_by(Conversation.message_count.desc())
+            .limit(1)
+            .correlate(Match)
+            .scalar_subquery()
+        )
+        conversation_stats = (
+            select(
+                func.count(Message.id).label("message_count"),
+                func.count(distinct(Message.sender_id)).label("unique_senders"),
+                func.min(Message.created_at).label("first_message_at"),
+                func.max(Message.created_at).label("last_message_at")
+            )
+            .where(Match.status == MatchStatus.MUTUAL)
+            .where(Message.conversation_id == conversation_id)
+            .lateral("conversation_stats")
         )
-        messages = message_result.scalars().all()
         
-        if not messages:
+        return (
+            select(
+                Match.status,
+                cast(Match.compatibility_score, Float).label("compatibility_score"),
+                *[getattr(user1, field).label(f"user1_{field}") for field in USER_FIELDS],
+                *[getattr(user2, field).label(f"user2_{field}") for field in USER_FIELDS],
+                conversation_stats.c.message_count,
+                conversation_stats.c.unique_senders,
+                conversation_stats.c.first_message_at,
+                conversation_stats.c.last_message_at
+            )
+            .join(user1, user1.id == Match.user_id)
+            .join(user2, user2.id == Match.target_id)
+            .outerjoin(conversation_stats, true())
+            .where(Match.status.in_([MatchStatus.MUTUAL, MatchStatus.DECLINED]))
+        )
+    
+    def _calculate_conversation_score(
+        self, 
+        message_count: Optional[int], 
+        unique_senders: Optional[int], 
+        first_message_at: Optional[datetime], 
+        last_message_at: Optional[datetime]
+    ) -> float:
+        """Calculate compatibility score based on conversation activity."""
+        if not message_count:
             return 0.0
         
-        # Calculate engagement score
-        message_count = len(messages)
-        unique_senders = len(set(msg.sender_id for msg in messages))
-        
         # Base score from message activity
         activity_score = min(0.2, message_count * 0.02)  # Up to 0.2 for 10+ messages
         
@@ -98,9 +135,7 @@ class MLDataService:
         
         # Bonus for sustained conversation (multiple days)
         if message_count > 5:
-            first_message = min(msg.created_at for msg in messages)
-            last_message = max(msg.created_at for msg in messages)
-            conversation_days = (last_message - first_message).days
+            conversation_days = (last_message_at - first_message_at).days
             
             if conversation_days > 1:
                 sustained_bonus = min(0.1, conversation_days * 0.02)
@@ -111,21 +146,13 @@ class MLDataService:
         
         return activity_score + participation_bonus + sustained_bonus
     
-    def _user_to_dict(self, user: User) -> Dict[str, Any]:
-        """Convert User model to dictionary for feature extraction."""
-        return {
-            "id": str(user.id),
-            "user_type": user.user_type,
-            "date_of_birth": user.date_of_birth,
-            "is_verified_email": user.is_verified_email,
-            "is_verified_phone": user.is_verified_phone,
-            "is_verified_identity": user.is_verified_identity,
-            "is_background_checked": user.is_background_checked,
-            "profile_completion_score": user.profile_completion_score,
-            "preferences": user.preferences or {},
-            "lifestyle_data": user.lifestyle_data or {},
-            "created_at": user.created_at
-        }
+    def _row_to_user_dict(self, row, prefix: str) -> Dict[str, Any]:
+        """Convert the prefixed user columns of a result row to a dictionary for feature extraction."""
+        data = {field: getattr(row, prefix + field) for field in USER_FIELDS}
+        data["id"] = str(data["id"])
+        data["preferences"] = data["preferences"] or {}
+        data["lifestyle_data"] = data["lifestyle_data"] or {}
+        return data
     
     async def generate_synthetic_training_data(self, count: int = 1000) -> List[Tuple[Dict, Dict, float]]:
         """
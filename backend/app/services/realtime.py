@@ -0,0 +1,324 @@
+import asyncio
+import json
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set
+
+import numpy as np
+
+from fastapi import WebSocket
+
+from app.core.config import settings
+
+# Pub/sub channel shared by all workers
+REALTIME_CHANNEL = "paired:realtime"
+
+Handler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+# What to do when a connection's outbound queue is full
+OVERFLOW_POLICIES = ("close", "drop_oldest", "drop_new")
+
+# Delivery latencies kept for percentiles
+LATENCY_WINDOW = 1000
+
+# Seconds between Redis resubscription attempts
+RECONNECT_DELAY = 1
+
+class RealtimeMetrics:
+    """Counters and recent delivery latencies shared by a manager's connections."""
+
+    def __init__(self):
+        self.frames_enqueued = 0
+        self.frames_sent = 0
+        self.frames_dropped = 0
+        self.slow_clients_closed = 0
+        self.publish_failures = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)  # seconds from enqueue to send
+
+    def get_stats(self) -> Dict[str, Any]:
+        latencies_ms = np.array(self.latencies) * 1000
+        return {
+            "frames_enqueued": self.frames_enqueued,
+            "frames_sent": self.frames_sent,
+            "frames_dropped": self.frames_dropped,
+            "slow_clients_closed": self.slow_clients_closed,
+            "publish_failures": self.publish_failures,
+            "delivery_latency_p50_ms": float(np.percentile(latencies_ms, 50)) if len(latencies_ms) else None,
+            "delivery_latency_p99_ms": float(np.percentile(latencies_ms, 99)) if len(latencies_ms) else None
+        }
+
+class InMemoryBackplane:
+    """
+    Backplane for a single process, and a stand-in for Redis in tests.
+
+    Every subscribed handler receives every published envelope, so several
+    ConnectionManagers sharing one instance behave like separate workers
+    sharing a Redis channel.
+    """
+
+    def __init__(self):
+        self._handlers: List[Handler] = []
+
+    async def start(self, handler: Handler):
+        self._handlers.append(handler)
+
+    async def stop(self):
+        self._handlers.clear()
+
+    async def publish(self, envelope: Dict[str, Any]):
+        for handler in list(self._handlers):
+            await handler(envelope)
+
+class RedisBackplane:
+    """Backplane over a Redis pub/sub channel, fanning out to every worker."""
+
+    def __init__(self, redis_url: str, channel: str = REALTIME_CHANNEL):
+        self.redis_url = redis_url
+        self.channel = channel
+        self._redis = None
+        self._listener: Optional[asyncio.Task] = None
+
+    def _get_redis(self):
+        if self._redis is None:
+            import redis.asyncio as redis
+            self._redis = redis.from_url(self.redis_url)
+        return self._redis
+
+    async def start(self, handler: Handler):
+        self._listener = asyncio.create_task(self._listen(handler))
+
+    async def stop(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        if self._redis is not None:
+            await self._redis.close()
+            self._redis = None
+
+    async def publish(self, envelope: Dict[str, Any]):
+        await self._get_redis().publish(self.channel, json.dumps(envelope))
+
+    async def _listen(self, handler: Handler):
+        while True:
+            pubsub = self._get_redis().pubsub()
+            try:
+                await pubsub.subscribe(self.channel)
+                async for item in pubsub.listen():
+                    if item["type"] == "message":
+                        await self._handle(handler, item["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Realtime backplane connection lost, retrying: {e}")
+            finally:
+                # Release the subscription's connection before resubscribing
+                try:
+                    await pubsub.aclose()
+                except Exception as e:
+                    print(f"Failed to close realtime backplane subscription: {e}")
+            await asyncio.sleep(RECONNECT_DELAY)
+
+    async def _handle(self, handler: Handler, data: Any):
+        """Deliver one message; a bad one is logged without dropping the subscription."""
+        try:
+            await handler(json.loads(data))
+        except Exception as e:
+            print(f"Failed to deliver realtime message: {e}")
+
+class Connection:
+    """
+    One WebSocket with a bounded outbound queue drained by its own writer task.
+
+    Senders only enqueue, so a slow client delays nobody but itself. When
+    the queue is full the overflow policy applies: "close" disconnects the
+    client (it can reconnect and page in what it missed from the message
+    history), "drop_oldest" discards the oldest queued frame and
+    "drop_new" the incoming one.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        user_id: str,
+        queue_size: int,
+        overflow_policy: str = "close",
+        metrics: Optional[RealtimeMetrics] = None
+    ):
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy '{overflow_policy}'")
+        self.websocket = websocket
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.overflow_policy = overflow_policy
+        self.metrics = metrics or RealtimeMetrics()
+        self.closed = False
+        self._writer: Optional[asyncio.Task] = None
+        self._close_task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._writer = asyncio.create_task(self._write())
+
+    def enqueue(self, text: str) -> bool:
+        """Queue a frame for the client. Returns False if it was dropped or the connection closed."""
+        if self.closed:
+            return False
+
+        if self.queue.full():
+            if self.overflow_policy == "close":
+                self.metrics.slow_clients_closed += 1
+                self.metrics.frames_dropped += self.queue.qsize() + 1
+                # Closed from here on, so further frames in this tick neither
+                # count again nor schedule another close; the task is kept so
+                # it is not garbage collected before it runs
+                self.cancel()
+                self._close_task = asyncio.create_task(self._close_socket(code=1013))  # try again later
+                return False
+            if self.overflow_policy == "drop_new":
+                self.metrics.frames_dropped += 1
+                return False
+            self.queue.get_nowait()
+            self.metrics.frames_dropped += 1
+
+        self.queue.put_nowait((time.monotonic(), text))
+        self.metrics.frames_enqueued += 1
+        return True
+
+    async def _write(self):
+        try:
+            while True:
+                enqueued_at, text = await self.queue.get()
+                await self.websocket.send_text(text)
+                self.metrics.frames_sent += 1
+                self.metrics.latencies.append(time.monotonic() - enqueued_at)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # Client went away; the receive loop will notice and disconnect
+            self.closed = True
+
+    def cancel(self):
+        """Stop writing to a socket that is already gone."""
+        self.closed = True
+        if self._writer is not None:
+            self._writer.cancel()
+
+    async def close(self, code: int = 1000):
+        if self.closed:
+            return
+        self.cancel()
+        await self._close_socket(code)
+
+    async def _close_socket(self, code: int):
+        try:
+            await self.websocket.close(code=code)
+        except Exception:
+            pass
+
+class ConnectionManager:
+    """
+    WebSocket connections of this worker, fanned out through a backplane.
+
+    A user may hold several connections (tabs, devices). Messages are
+    published to the backplane addressed by user id; each worker delivers
+    them to the connections it holds for those users.
+    """
+
+    def __init__(self, backplane=None, queue_size: int = 100, overflow_policy: str = "close"):
+        self.backplane = backplane or InMemoryBackplane()
+        self.queue_size = queue_size
+        self.overflow_policy = overflow_policy
+        self.metrics = RealtimeMetrics()
+        self.active_connections: Dict[str, Set[Connection]] = {}
+        self._pending_publishes: Set[asyncio.Task] = set()
+
+    async def start(self):
+        """Subscribe this worker to the backplane."""
+        await self.backplane.start(self._deliver)
+
+    async def stop(self):
+        """Close local connections and leave the backplane."""
+        if self._pending_publishes:
+            await asyncio.wait(self._pending_publishes, timeout=5)
+        await self.backplane.stop()
+        for connections in list(self.active_connections.values()):
+            for connection in list(connections):
+                await connection.close(code=1001)  # going away
+        self.active_connections.clear()
+
+    async def connect(self, websocket: WebSocket, user_id: str) -> Connection:
+        await websocket.accept()
+        connection = Connection(websocket, user_id, self.queue_size, self.overflow_policy, self.metrics)
+        connection.start()
+        self.active_connections.setdefault(user_id, set()).add(connection)
+        return connection
+
+    def disconnect(self, connection: Connection):
+        connections = self.active_connections.get(connection.user_id)
+        if connections is not None:
+            connections.discard(connection)
+            if not connections:
+                del self.active_connections[connection.user_id]
+        connection.cancel()
+
+    async def send_to_users(self, message: str, user_ids: Iterable[Any]):
+        """Deliver a text frame to every connection of the given users, on any worker."""
+        await self.backplane.publish({"user_ids": [str(user_id) for user_id in user_ids], "message": message})
+
+    async def send_personal_message(self, message: str, user_id: Any):
+        await self.send_to_users(message, [user_id])
+
+    def publish_nowait(self, message: str, user_ids: Iterable[Any]):
+        """
+        Hand a message to the backplane without waiting for it.
+
+        For request handlers: the response does not wait on Redis or on
+        any recipient. Failures are logged and counted.
+        """
+        task = asyncio.create_task(self._publish(message, list(user_ids)))
+        self._pending_publishes.add(task)
+        task.add_done_callback(self._pending_publishes.discard)
+
+    async def _publish(self, message: str, user_ids: List[Any]):
+        try:
+            await self.send_to_users(message, user_ids)
+        except Exception as e:
+            self.metrics.publish_failures += 1
+            print(f"Failed to publish realtime message: {e}")
+
+    async def _deliver(self, envelope: Dict[str, Any]):
+        """Queue a published message on this worker's connections for its users."""
+        for user_id in envelope["user_ids"]:
+            for connection in list(self.active_connections.get(user_id, ())):
+                connection.enqueue(envelope["message"])
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Connection counts, queue depths and delivery metrics of this worker."""
+        connections = [connection for user_connections in self.active_connections.values() for connection in user_connections]
+        depths = [connection.queue.qsize() for connection in connections]
+        return {
+            "backplane": type(self.backplane).__name__,
+            "overflow_policy": self.overflow_policy,
+            "users": len(self.active_connections),
+            "connections": len(connections),
+            "queued_frames": sum(depths),
+            "max_queue_depth": max(depths, default=0),
+            "queue_size": self.queue_size,
+            "pending_publishes": len(self._pending_publishes),
+            **self.metrics.get_stats()
+        }
+
+def create_backplane():
+    if settings.realtime_backend == "redis":
+        return RedisBackplane(settings.redis_url)
+    return InMemoryBackplane()
+
+# Global connection manager instance
+manager = ConnectionManager(
+    create_backplane(),
+    queue_size=settings.realtime_send_queue_size,
+    overflow_policy=settings.realtime_overflow_policy
+)
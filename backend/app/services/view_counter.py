@@ -0,0 +1,108 @@
+import asyncio
+from collections import Counter
+from typing import Optional
+from uuid import UUID
+
+from sqlalchemy import Integer, column, func, update, values
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID
+
+from app.core.config import settings
+from app.models.database import async_session_maker
+from app.models.listing import Listing
+
+# Listings per UPDATE statement
+FLUSH_BATCH_SIZE = 1000
+
+class ViewCountBuffer:
+    """
+    In-memory accumulator of listing views, flushed to listings.view_count in batches.
+
+    get_listing only records the view here, so reading a listing no longer
+    takes a row lock. Every ``flush_interval`` seconds the pending counts are
+    added to the table with one UPDATE ... FROM (VALUES ...) per batch, in
+    id order so concurrent workers lock rows in the same order. Counts from
+    a failed flush are kept for the next one; views recorded since the last
+    flush are lost if the process dies.
+    """
+
+    def __init__(self, flush_interval: int):
+        self.flush_interval = flush_interval
+        self._pending: Counter = Counter()
+        self._task: Optional[asyncio.Task] = None
+        self.flushed_views = 0
+
+    def record(self, listing_id: UUID, views: int = 1):
+        """Count a view of a listing."""
+        self._pending[listing_id] += views
+
+    def pending(self, listing_id: UUID) -> int:
+        """Views of a listing not yet written to the database."""
+        return self._pending.get(listing_id, 0)
+
+    @staticmethod
+    def _update_statement(batch):
+        """UPDATE adding each (listing id, views) pair of the batch to view_count."""
+        views = values(
+            column("id", PG_UUID(as_uuid=True)),
+            column("views", Integer),
+            name="views"
+        ).data(batch)
+        return (
+            update(Listing)
+            .where(Listing.id == views.c.id)
+            .values(
+                view_count=func.coalesce(Listing.view_count, 0) + views.c.views,
+                # A view is not an edit; keep the onupdate default from bumping updated_at
+                updated_at=Listing.updated_at
+            )
+        )
+
+    async def flush(self) -> int:
+        """
+        Write pending view counts to the database.
+
+        Returns:
+            Number of listings updated
+        """
+        if not self._pending:
+            return 0
+
+        pending, self._pending = self._pending, Counter()
+        items = sorted(pending.items())
+
+        try:
+            async with async_session_maker() as db:
+                for start in range(0, len(items), FLUSH_BATCH_SIZE):
+                    await db.execute(self._update_statement(items[start:start + FLUSH_BATCH_SIZE]))
+                await db.commit()
+        except Exception as e:
+            print(f"Failed to flush listing view counts: {e}")
+            self._pending.update(pending)
+            return 0
+
+        self.flushed_views += sum(pending.values())
+        return len(items)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def start(self):
+        """Start periodic flushing on the running event loop."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop periodic flushing and write what is still pending."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+# Global view count buffer instance
+view_count_buffer = ViewCountBuffer(flush_interval=settings.listing_view_flush_seconds)
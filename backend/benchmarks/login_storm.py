@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Login storm benchmark for Paired Backend API.
+
+Fires a burst of bcrypt logins at a small in-process FastAPI app while a
+probe client keeps hitting an unrelated endpoint, and reports login
+throughput plus p50/p99 latency of the probe. Run once with hashing on the
+event loop (the old behaviour) and once with the off-loop async helpers:
+
+    python benchmarks/login_storm.py --logins 200 --concurrency 50
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import httpx
+import numpy as np
+from fastapi import FastAPI, HTTPException
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+
+from app.core.security import get_password_hash, verify_password, verify_password_async
+
+PASSWORD = "correct horse battery staple"
+PROBE_INTERVAL = 0.01  # seconds between probe requests
+
+
+def create_app(password_hash: str, off_loop: bool) -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/login")
+    async def login():
+        if off_loop:
+            valid = await verify_password_async(PASSWORD, password_hash)
+        else:
+            valid = verify_password(PASSWORD, password_hash)
+        if not valid:
+            raise HTTPException(status_code=401)
+        return {"ok": True}
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    return app
+
+
+async def run_storm(app: FastAPI, logins: int, concurrency: int):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        semaphore = asyncio.Semaphore(concurrency)
+        storm_done = asyncio.Event()
+        probe_latencies = []
+
+        async def login():
+            async with semaphore:
+                response = await client.post("/login")
+                response.raise_for_status()
+
+        async def probe():
+            # Latency is measured from when the probe was due, so time spent
+            # waiting for a blocked event loop counts against it
+            due = time.perf_counter()
+            while not storm_done.is_set():
+                await asyncio.sleep(max(0.0, due - time.perf_counter()))
+                await client.get("/ping")
+                probe_latencies.append(time.perf_counter() - due)
+                due = max(due + PROBE_INTERVAL, time.perf_counter())
+
+        probe_task = asyncio.create_task(probe())
+        started = time.perf_counter()
+        await asyncio.gather(*(login() for _ in range(logins)))
+        elapsed = time.perf_counter() - started
+        storm_done.set()
+        await probe_task
+
+    latencies_ms = np.array(probe_latencies) * 1000
+    return {
+        "logins_per_second": logins / elapsed,
+        "probe_requests": len(latencies_ms),
+        "probe_p50_ms": float(np.percentile(latencies_ms, 50)),
+        "probe_p99_ms": float(np.percentile(latencies_ms, 99)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--logins", type=int, default=200, help="Total login requests")
+    parser.add_argument("--concurrency", type=int, default=50, help="Concurrent login requests")
+    args = parser.parse_args()
+
+    password_hash = get_password_hash(PASSWORD)
+
+    print(f"{args.logins} logins, {args.concurrency} concurrent")
+    print(f"{'mode':<10} {'logins/s':>10} {'probes':>8} {'p50 ms':>10} {'p99 ms':>10}")
+    for mode, off_loop in (("on-loop", False), ("off-loop", True)):
+        stats = asyncio.run(run_storm(create_app(password_hash, off_loop), args.logins, args.concurrency))
+        print(
+            f"{mode:<10} {stats['logins_per_second']:>10.1f} {stats['probe_requests']:>8} "
+            f"{stats['probe_p50_ms']:>10.1f} {stats['probe_p99_ms']:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
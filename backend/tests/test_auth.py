@@ -51,4 +51,30 @@ async def test_login_invalid_credentials(client: AsyncClient):
     }
     response = await client.post("/api/v1/auth/login", json=login_data)
     assert response.status_code == 401
-    assert "Incorrect email or password" in response.json()["detail"] 
\ No newline at end of file
+    assert "Incorrect email or password" in response.json()["detail"] 
+
+@pytest.mark.asyncio
+async def test_password_hashing_runs_off_event_loop():
+    """Test async password helpers round-trip without blocking the loop."""
+    import asyncio
+    import time
+    from app.core.security import get_password_hash_async, verify_password_async
+    
+    ticks = 0
+    
+    async def ticker():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.001)
+            ticks += 1
+    
+    ticker_task = asyncio.create_task(ticker())
+    started = time.perf_counter()
+    hashed = await get_password_hash_async("s3cret-pass")
+    assert await verify_password_async("s3cret-pass", hashed)
+    assert not await verify_password_async("wrong-pass", hashed)
+    elapsed = time.perf_counter() - started
+    ticker_task.cancel()
+    
+    # The loop kept running while bcrypt worked in the thread pool
+    assert ticks > elapsed / 0.001 / 10
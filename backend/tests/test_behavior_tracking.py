@@ -0,0 +1,44 @@
+import uuid
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.models.match import MatchStatus
+from app.services.behavior_tracking import BehaviorTrackingService
+
+
+def test_conversation_ratings_from_aggregates():
+    service = BehaviorTrackingService()
+    user1, user2 = uuid.uuid4(), uuid.uuid4()
+    started = datetime(2024, 1, 1)
+    row = SimpleNamespace(
+        participants=[user1, user2],
+        created_at=started,
+        total_messages=4,
+        first_message_at=started,
+        last_message_at=started + timedelta(days=3, hours=5),
+        user1_sent=3,
+        user1_avg_length=50.0,
+        user2_sent=None,
+        user2_avg_length=None,
+    )
+
+    ratings = service._calculate_conversation_ratings(row)
+
+    # user1: 3/4 * 0.8 + 50/500 + 3 days * 0.02; user2 only gets the duration boost
+    assert [(r["user_id"], r["target_id"]) for r in ratings] == [(str(user1), str(user2)), (str(user2), str(user1))]
+    assert ratings[0]["rating"] == pytest.approx(0.6 + 0.1 + 0.06)
+    assert ratings[1]["rating"] == pytest.approx(0.06)
+
+
+def test_match_rating_and_query_shape():
+    service = BehaviorTrackingService()
+    assert service._calculate_match_rating(MatchStatus.MUTUAL, None, 10) == 1.0
+    assert service._calculate_match_rating(MatchStatus.PENDING, "accepted", 2) == pytest.approx(0.8)
+    assert service._calculate_match_rating(MatchStatus.DECLINED, None, None) == pytest.approx(0.1)
+
+    sql = str(service._match_interactions_query().compile(dialect=postgresql.dialect()))
+    assert "LEFT OUTER JOIN conversations" in sql
+    assert "@> ARRAY[matches.user_id, matches.target_id]" in sql
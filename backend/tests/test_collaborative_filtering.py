@@ -0,0 +1,170 @@
+import random
+
+import numpy as np
+import pytest
+
+from app.ml.collaborative_filtering import CollaborativeFiltering
+
+
+def _random_interactions(seed: int, n_users: int = 80, n_interactions: int = 900):
+    rng = random.Random(seed)
+    users = [f"user-{i}" for i in range(n_users)]
+    return [
+        {
+            "user_id": rng.choice(users),
+            "target_id": rng.choice(users),
+            "rating": rng.choice([0.1, 0.7, 0.8, 1.0]),
+        }
+        for _ in range(n_interactions)
+    ]
+
+
+def _dense_user_based(model: CollaborativeFiltering, user_id: str, min_similarity: float = 0.1):
+    """Reference user-based scores from a dense matrix and full similarity row."""
+    dense = model.user_item_matrix.toarray().astype(np.float64)
+    norms = np.linalg.norm(dense, axis=1)
+    user_idx = model.user_index_map[user_id]
+    similarities = dense @ dense[user_idx] / (norms * norms[user_idx])
+
+    similar = [(idx, sim) for idx, sim in enumerate(similarities) if idx != user_idx and sim > min_similarity]
+    similar.sort(key=lambda x: x[1], reverse=True)
+
+    weighted, totals = {}, {}
+    for idx, sim in similar[:20]:
+        for target_idx in np.flatnonzero((dense[idx] > 0) & (dense[user_idx] == 0)):
+            weighted[target_idx] = weighted.get(target_idx, 0.0) + sim * dense[idx, target_idx]
+            totals[target_idx] = totals.get(target_idx, 0.0) + sim
+    return {model.index_target_map[t]: weighted[t] / totals[t] for t in weighted}
+
+
+def test_interaction_matrix_is_sparse_and_averages_duplicates():
+    model = CollaborativeFiltering()
+    matrix, user_ids, target_ids = model.prepare_interaction_matrix([
+        {"user_id": "a", "target_id": "b", "rating": 0.2},
+        {"user_id": "a", "target_id": "b", "rating": 0.6},
+        {"user_id": "b", "target_id": "c", "rating": 1.0},
+    ])
+
+    assert matrix.format == "csr"
+    assert matrix.nnz == 2
+    assert matrix[user_ids.index("a"), target_ids.index("b")] == pytest.approx(0.4)
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_user_based_recommendations_match_dense_reference(seed):
+    model = CollaborativeFiltering()
+    model.fit(_random_interactions(seed))
+
+    for user_id in list(model.user_index_map)[:20]:
+        expected = _dense_user_based(model, user_id)
+        actual = dict(model.get_user_based_recommendations(user_id, n_recommendations=len(expected)))
+        assert actual.keys() == expected.keys()
+        for target_id, score in expected.items():
+            assert actual[target_id] == pytest.approx(score, rel=1e-5)
+
+
+def test_model_stats_report_memory_and_fit_time():
+    model = CollaborativeFiltering()
+    model.fit(_random_interactions(0))
+    stats = model.get_model_stats()
+
+    assert stats["status"] == "fitted"
+    assert stats["memory_bytes"] > 0
+    assert stats["fit_time_seconds"] >= 0
+    assert 0 <= stats["sparsity"] < 1
+
+
+def test_matrix_factorization_uses_cached_factors_and_folds_in_updates():
+    model = CollaborativeFiltering()
+    model.fit(_random_interactions(1))
+    user_id = next(iter(model.user_index_map))
+    user_idx = model.user_index_map[user_id]
+
+    recommendations = model.get_matrix_factorization_recommendations(user_id, n_recommendations=5)
+    rated = {model.index_target_map[t] for t in model.user_item_matrix[user_idx].indices}
+    predicted = model.user_factors[user_idx] @ model.nmf_model.components_
+    expected = sorted(
+        ((model.index_target_map[t], predicted[t]) for t in range(len(predicted)) if model.index_target_map[t] not in rated),
+        key=lambda x: x[1],
+        reverse=True,
+    )[:5]
+    assert [target for target, _ in recommendations] == [target for target, _ in expected]
+
+    target_id = expected[0][0]
+    before = model.user_factors[user_idx].copy()
+    model.update_user_interaction(user_id, target_id, 1.0)
+    assert not np.allclose(before, model.user_factors[user_idx])
+    assert target_id not in dict(model.get_matrix_factorization_recommendations(user_id, n_recommendations=50))
+
+
+def test_item_based_recommendations_match_dense_reference():
+    model = CollaborativeFiltering(n_neighbors=100)
+    model.fit(_random_interactions(2))
+    dense = model.user_item_matrix.toarray().astype(np.float64)
+    norms = np.linalg.norm(dense, axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        item_similarity = np.nan_to_num(dense.T @ dense / np.outer(norms, norms))
+    np.fill_diagonal(item_similarity, 0)
+
+    for user_id in list(model.user_index_map)[:20]:
+        ratings = dense[model.user_index_map[user_id]]
+        scores = ratings @ item_similarity
+        expected = sorted(scores[ratings == 0], reverse=True)[:10]
+        actual = [score for _, score in model.get_item_based_recommendations(user_id, n_recommendations=10)]
+        assert actual == pytest.approx(expected, rel=1e-4, abs=1e-6)
+
+
+def test_online_updates_grow_model_and_track_full_recompute():
+    model = CollaborativeFiltering(n_neighbors=200)
+    model.fit(_random_interactions(3))
+    fitted_ratings = model.fitted_ratings
+
+    rng = random.Random(3)
+    known = list(model.user_index_map)
+    updates = [(rng.choice(known), rng.choice(known), rng.choice([0.7, 1.0])) for _ in range(20)]
+    updates += [("new-user", known[0], 1.0), (known[1], "new-target", 0.8), ("new-user", "new-target", 0.7)]
+    for user_id, target_id, rating in updates:
+        model.update_user_interaction(user_id, target_id, rating)
+
+    # Updates are buffered next to the base matrices, which keep their fitted structure
+    assert model.pending_ratings > 0
+    assert model.user_item_matrix.nnz == fitted_ratings
+    assert model.drift == pytest.approx(len(updates) / fitted_ratings)
+
+    # Incremental neighbor lists for touched rows match a fresh fit on the same ratings
+    refit = CollaborativeFiltering(n_neighbors=200)
+    refit.fit(model.export_interactions())
+    for user_id in {u for u, _, _ in updates}:
+        expected = dict(refit.get_user_based_recommendations(user_id, n_recommendations=500))
+        actual = dict(model.get_user_based_recommendations(user_id, n_recommendations=500))
+        assert actual.keys() == expected.keys()
+        for target_id, score in expected.items():
+            assert actual[target_id] == pytest.approx(score, rel=1e-4)
+
+    assert model.get_matrix_factorization_recommendations("new-user", n_recommendations=5)
+    assert model.get_item_based_recommendations("new-user", n_recommendations=5)
+
+    model.compact()
+    assert model.pending_ratings == 0
+    assert model.user_item_matrix.shape == (len(model.user_index_map), len(model.target_index_map))
+    assert model.user_item_matrix[model.user_index_map["new-user"], model.target_index_map["new-target"]] == pytest.approx(0.7)
+    assert (model.user_item_matrix != model.target_user_matrix.tocsr()).nnz == 0
+    assert len(model.export_interactions()) == model.user_item_matrix.nnz
+
+
+def test_online_updates_evict_neighbors_whose_similarity_fell():
+    # Few neighbors per row, so lists are full and a lowered score can fall out of the top k
+    model = CollaborativeFiltering(n_neighbors=5)
+    model.fit(_random_interactions(4, n_users=40, n_interactions=400))
+
+    rng = random.Random(4)
+    known = list(model.user_index_map)
+    for _ in range(30):
+        model.update_user_interaction(rng.choice(known), rng.choice(known), rng.choice([0.1, 1.0]))
+
+    refit = CollaborativeFiltering(n_neighbors=5)
+    refit.fit(model.export_interactions())
+    for user_id, user_idx in model.user_index_map.items():
+        _, actual = model.user_neighbors.neighbors(user_idx, min_similarity=0, inclusive=False)
+        _, expected = refit.user_neighbors.neighbors(refit.user_index_map[user_id], min_similarity=0, inclusive=False)
+        assert actual == pytest.approx(expected, rel=1e-4)
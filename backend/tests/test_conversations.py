@@ -0,0 +1,198 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from sqlalchemy.dialects import postgresql
+
+from app.api.v1.conversations import load_message_page, message_page_query
+from app.core.pagination import decode_cursor, encode_cursor
+
+
+def _compile(query) -> str:
+    return str(query.compile(dialect=postgresql.dialect()))
+
+
+def _messages(n):
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    return [SimpleNamespace(id=uuid.uuid4(), created_at=start + timedelta(minutes=i)) for i in range(n)]
+
+
+class FakeSession:
+    """Serves pages from an in-memory thread the way the page query would."""
+
+    def __init__(self, messages):
+        self.messages = messages
+
+    async def execute(self, query):
+        sql = _compile(query)
+        params = query.compile(dialect=postgresql.dialect()).params
+        rows = sorted(self.messages, key=lambda m: (m.created_at, m.id))
+        values = [v for k, v in params.items() if k.startswith("param_")]
+        cursor, limit = values[:-1], values[-1]
+        if "DESC" in sql:
+            rows.reverse()
+            if cursor:
+                rows = [m for m in rows if (m.created_at, m.id) < tuple(cursor)]
+        elif cursor:
+            rows = [m for m in rows if (m.created_at, m.id) > tuple(cursor)]
+        return SimpleNamespace(scalars=lambda: SimpleNamespace(all=lambda: rows[:limit]))
+
+
+def test_message_page_query_is_keyset_on_history_index():
+    conversation_id = uuid.uuid4()
+    before = encode_cursor([datetime(2024, 1, 1, tzinfo=timezone.utc), uuid.uuid4()])
+    sql = _compile(message_page_query(conversation_id, before=before, limit=20))
+    assert "(messages.created_at, messages.id) < (" in sql
+    assert "ORDER BY messages.created_at DESC, messages.id DESC" in sql
+    assert "OFFSET" not in sql
+
+    sql = _compile(message_page_query(conversation_id, after=before, limit=20))
+    assert "(messages.created_at, messages.id) > (" in sql
+    assert "ORDER BY messages.created_at, messages.id" in sql
+
+
+def test_message_pages_walk_history_both_ways():
+    thread = _messages(25)
+    db = FakeSession(thread)
+    conversation_id = uuid.uuid4()
+
+    async def walk():
+        latest = await load_message_page(db, conversation_id, limit=10)
+        older = await load_message_page(db, conversation_id, before=latest["before_cursor"], limit=10)
+        oldest = await load_message_page(db, conversation_id, before=older["before_cursor"], limit=10)
+        newer = await load_message_page(db, conversation_id, after=oldest["after_cursor"], limit=10)
+        caught_up = await load_message_page(db, conversation_id, after=latest["after_cursor"], limit=10)
+        return latest, older, oldest, newer, caught_up
+
+    latest, older, oldest, newer, caught_up = asyncio.run(walk())
+
+    assert latest["messages"] == thread[15:] and latest["has_more"]
+    assert older["messages"] == thread[5:15]
+    assert oldest["messages"] == thread[:5] and oldest["before_cursor"] is None and not oldest["has_more"]
+    assert newer["messages"] == thread[5:15] and newer["has_more"]
+    assert caught_up["messages"] == [] and caught_up["after_cursor"] == latest["after_cursor"]
+    assert decode_cursor(latest["after_cursor"], 2) == [thread[-1].created_at, thread[-1].id]
+
+
+def test_inbox_upsert_counts_unread_for_recipients_only():
+    from app.services.inbox import inbox_service
+
+    sender, recipient = uuid.uuid4(), uuid.uuid4()
+    conversation = SimpleNamespace(id=uuid.uuid4(), participants=[sender, recipient])
+    statements = []
+
+    class RecordingSession:
+        async def execute(self, statement):
+            statements.append(statement)
+
+    asyncio.run(inbox_service.record_messages(RecordingSession(), conversation, sender, uuid.uuid4(), "x" * 500, count=3))
+
+    compiled = statements[0].compile(dialect=postgresql.dialect())
+    sql = str(compiled)
+    assert "ON CONFLICT (user_id, conversation_id) DO UPDATE" in sql
+    assert "unread_count = (conversation_inbox.unread_count + excluded.unread_count)" in sql
+    unread = {v for k, v in compiled.params.items() if k.startswith("unread_count")}
+    assert unread == {0, 3}
+    previews = {v for k, v in compiled.params.items() if k.startswith("last_message_preview")}
+    assert all(len(preview) == 140 for preview in previews)
+
+
+def test_inbox_upsert_keeps_newest_message_when_sends_commit_out_of_order():
+    from sqlalchemy import select, text
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+    from app.models.conversation import ConversationInbox
+    from app.services.inbox import inbox_service
+
+    alice, bob = uuid.uuid4(), uuid.uuid4()
+    conversation = SimpleNamespace(id=uuid.uuid4(), participants=[alice, bob])
+    sent_at = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+    async def run():
+        # SQLite runs the same ON CONFLICT ... DO UPDATE upsert
+        engine = create_async_engine("sqlite+aiosqlite://")
+        try:
+            async with AsyncSession(engine) as db:
+                await db.execute(text(
+                    "CREATE TABLE conversation_inbox ("
+                    "user_id CHAR(32), conversation_id CHAR(32), last_message_id CHAR(32), "
+                    "last_message_preview TEXT, last_message_sender_id CHAR(32), last_message_at DATETIME, "
+                    "unread_count INTEGER, last_read_message_id CHAR(32), last_read_at DATETIME, "
+                    "PRIMARY KEY (user_id, conversation_id))"
+                ))
+                # Bob's later send commits before Alice's earlier one
+                newer_id = uuid.uuid4()
+                await inbox_service.record_messages(
+                    db, conversation, bob, newer_id, "newer", last_message_at=sent_at + timedelta(seconds=1)
+                )
+                await inbox_service.record_messages(db, conversation, alice, uuid.uuid4(), "older", last_message_at=sent_at)
+                result = await db.execute(select(ConversationInbox).order_by(ConversationInbox.unread_count))
+                return newer_id, result.scalars().all()
+        finally:
+            await engine.dispose()
+
+    newer_id, rows = asyncio.run(run())
+    assert len(rows) == 2
+    for row in rows:
+        assert row.last_message_id == newer_id
+        assert row.last_message_preview == "newer"
+        assert row.last_message_sender_id == bob
+        assert row.last_message_at == sent_at.replace(tzinfo=None) + timedelta(seconds=1)
+    # Both sends still count as unread for their recipient
+    assert [row.unread_count for row in rows] == [1, 1]
+
+
+def test_inbox_query_is_one_indexed_join():
+    from app.services.inbox import inbox_service
+
+    sql = _compile(inbox_service.inbox_query(uuid.uuid4()))
+    assert "FROM conversation_inbox JOIN conversations" in sql
+    assert "conversation_inbox.user_id = " in sql
+    assert "ORDER BY conversation_inbox.last_message_at DESC" in sql
+    assert "participants" not in sql.split("WHERE")[1]
+
+
+def test_read_cursor_locks_row_then_advances_in_one_update_and_recounts_unread():
+    from app.services.inbox import inbox_service
+
+    conversation_id, user_id, message_id = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+    read_at = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    statements = []
+
+    class RecordingSession:
+        async def execute(self, statement):
+            statements.append(statement)
+            # The inbox row exists, but the cursor is already at or past the message
+            row = (user_id,) if len(statements) == 1 else None
+            return SimpleNamespace(first=lambda: row)
+
+    cursor = asyncio.run(inbox_service.advance_read_cursor(RecordingSession(), conversation_id, user_id, message_id, read_at))
+
+    assert cursor is None
+    assert len(statements) == 2
+    lock = _compile(statements[0])
+    assert lock.startswith("SELECT conversation_inbox.user_id")
+    assert lock.endswith("FOR UPDATE")
+    sql = _compile(statements[1])
+    assert sql.startswith("UPDATE conversation_inbox SET")
+    assert "(conversation_inbox.last_read_at, conversation_inbox.last_read_message_id) < (" in sql
+    assert "SELECT count(*) AS count_1 \nFROM messages" in sql
+    assert "messages.sender_id != " in sql
+    assert "(messages.created_at, messages.id) > (" in sql
+    assert "is_read" not in sql
+
+
+def test_message_batch_is_one_insert_in_send_order():
+    from app.api.v1.conversations import message_batch_insert
+    from app.schemas.conversation import MessageCreate
+
+    batch = [MessageCreate(content=f"queued {i}") for i in range(3)]
+    ids = [uuid.uuid4() for _ in batch]
+    compiled = message_batch_insert(uuid.uuid4(), uuid.uuid4(), batch, ids).compile(dialect=postgresql.dialect())
+    sql = str(compiled)
+
+    assert sql.count("INSERT INTO messages") == 1
+    assert sql.count("now() +") == 3
+    assert "RETURNING messages.id, messages.created_at" in sql
+    offsets = [v for k, v in compiled.params.items() if k.startswith("now_")]
+    assert offsets == [timedelta(microseconds=i) for i in range(3)]
@@ -0,0 +1,206 @@
+import asyncio
+import os
+import uuid
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+
+from app.api.v1.listings import search_listings_query
+from app.core.pagination import decode_cursor, encode_cursor
+from app.models.listing import ListingType
+from app.schemas.listing import ListingSort
+
+# EXPLAIN checks need a PostGIS/pgvector database, e.g. postgresql+asyncpg://.../paired_test
+POSTGRES_URL = os.getenv("TEST_POSTGRES_URL")
+
+
+def _compile(query) -> str:
+    return str(query.compile(dialect=postgresql.dialect()))
+
+
+def test_cursor_round_trip_and_rejects_garbage():
+    values = [datetime(2024, 5, 1, 12, 30, tzinfo=timezone.utc), Decimal("950.00"), uuid.uuid4(), None, 1.5]
+    assert decode_cursor(encode_cursor(values), len(values)) == values
+
+    for cursor in ("not-a-cursor", encode_cursor([1])):
+        with pytest.raises(HTTPException) as exc:
+            decode_cursor(cursor, 2)
+        assert exc.value.status_code == 400
+
+
+def test_search_query_uses_keyset_instead_of_offset():
+    cursor = encode_cursor([datetime(2024, 5, 1, tzinfo=timezone.utc), uuid.uuid4()])
+    sql = _compile(search_listings_query(None, None, None, ListingType.ROOM, None, None, ListingSort.RECENCY, cursor, 21))
+    assert "OFFSET" not in sql
+    assert "(listings.created_at, listings.id) < (" in sql
+    assert "ORDER BY listings.created_at DESC, listings.id DESC" in sql
+
+    cursor = encode_cursor([None, uuid.uuid4()])
+    sql = _compile(search_listings_query(None, None, None, None, None, None, ListingSort.PRICE, cursor, 21))
+    assert "listings.price_min IS NULL AND listings.id >" in sql
+
+    sql = _compile(search_listings_query(51.5, -0.1, 5000, None, None, None, ListingSort.DISTANCE, None, 21))
+    assert "ST_DWithin(listings.location" in sql
+    assert "ORDER BY listings.location <-> ST_GeogFromText" in sql
+
+
+@pytest.mark.skipif(not POSTGRES_URL, reason="TEST_POSTGRES_URL not set")
+def test_deep_search_pages_use_indexes():
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from app.models.database import Base
+
+    async def explain(sort, cursor_values):
+        engine = create_async_engine(POSTGRES_URL)
+        async with engine.begin() as conn:
+            await conn.execute(text("CREATE EXTENSION IF NOT EXISTS postgis"))
+            await conn.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.execute(text(
+                "INSERT INTO users (id, email, password_hash, user_type) "
+                "VALUES ('00000000-0000-0000-0000-000000000001', 'explain@example.com', 'x', 'SEEKER') "
+                "ON CONFLICT DO NOTHING"
+            ))
+            await conn.execute(text(
+                "INSERT INTO listings (id, user_id, listing_type, status, title, price_min, location, created_at) "
+                "SELECT gen_random_uuid(), '00000000-0000-0000-0000-000000000001', "
+                "CASE WHEN i % 2 = 0 THEN 'ROOM'::listingtype ELSE 'ROOMMATE_WANTED'::listingtype END, "
+                "CASE WHEN i % 10 = 0 THEN 'EXPIRED'::listingstatus ELSE 'ACTIVE'::listingstatus END, "
+                "'listing ' || i, 500 + i % 1000, "
+                "ST_GeogFromText('SRID=4326;POINT(' || (-0.5 + (i % 1000) / 1000.0) || ' ' || (51 + (i / 1000) / 100.0) || ')'), "
+                "now() - i * interval '1 minute' "
+                "FROM generate_series(1, 20000) AS i"
+            ))
+            await conn.execute(text("ANALYZE listings"))
+
+            query = search_listings_query(
+                51.1, -0.1, 5000, ListingType.ROOM, None, None, sort, encode_cursor(cursor_values), 21
+            ) if sort == ListingSort.DISTANCE else search_listings_query(
+                None, None, None, ListingType.ROOM, None, None, sort, encode_cursor(cursor_values), 21
+            )
+            compiled = query.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True})
+            plan = (await conn.execute(text(f"EXPLAIN {compiled}"))).scalars().all()
+            await conn.rollback()
+        await engine.dispose()
+        return "\n".join(plan)
+
+    recency_plan = asyncio.run(explain(ListingSort.RECENCY, [datetime(2020, 1, 1, tzinfo=timezone.utc), uuid.uuid4()]))
+    assert "ix_listings_status_type_created_at" in recency_plan
+    assert "Sort" not in recency_plan
+
+    price_plan = asyncio.run(explain(ListingSort.PRICE, [Decimal("900"), uuid.uuid4()]))
+    assert "ix_listings_status_type_price_min" in price_plan
+    assert "Seq Scan on listings" not in price_plan
+
+    distance_plan = asyncio.run(explain(ListingSort.DISTANCE, [100.0, uuid.uuid4()]))
+    assert "idx_listings_location" in distance_plan
+
+
+def test_listing_sampler_sizes_sample_and_drops_inactive_ids():
+    from types import SimpleNamespace
+    from app.services.listing_sampler import ListingSampler, sample_percent
+
+    assert sample_percent(-1, 2000) is None
+    assert sample_percent(5000, 2000) is None
+    assert sample_percent(1_000_000, 2000) == pytest.approx(0.2)
+
+    active = [uuid.uuid4() for _ in range(30)]
+    paused = set(active[:10])
+
+    class FakeResult:
+        def __init__(self, values):
+            self.values = values
+
+        def scalar(self):
+            return self.values
+
+        def scalars(self):
+            return SimpleNamespace(all=lambda: self.values)
+
+    class FakeSession:
+        def __init__(self):
+            self.statements = []
+
+        async def execute(self, statement):
+            self.statements.append(_compile(statement))
+            if len(self.statements) == 1:
+                return FakeResult(-1)
+            if len(self.statements) == 2:
+                return FakeResult(list(active))
+            requested = statement.whereclause.clauses[0].right.value
+            return FakeResult([SimpleNamespace(id=i) for i in requested if i not in paused])
+
+    db = FakeSession()
+    sampler = ListingSampler(pool_size=100, refresh_interval=300)
+    listings = asyncio.run(sampler.sample(db, 20))
+
+    assert "ORDER BY" not in db.statements[-1]
+    assert "listings.status = " in db.statements[-1]
+    assert len(listings) == 20
+    assert not paused & {listing.id for listing in listings}
+    assert len(sampler._pool) == 20
+
+
+def test_view_count_buffer_batches_updates():
+    from app.services.view_counter import ViewCountBuffer
+
+    buffer = ViewCountBuffer(flush_interval=10)
+    listing_ids = [uuid.uuid4() for _ in range(3)]
+    for listing_id in listing_ids + listing_ids[:1]:
+        buffer.record(listing_id)
+    assert buffer.pending(listing_ids[0]) == 2
+
+    statement = ViewCountBuffer._update_statement(sorted(buffer._pending.items()))
+    sql = _compile(statement)
+    assert "FROM (VALUES (" in sql and "AS views (id, views)" in sql
+    assert "view_count=(coalesce(listings.view_count" in sql
+    assert "updated_at=listings.updated_at" in sql
+
+
+def test_locations_are_cached_and_revalidated_with_etag():
+    import httpx
+    from app.main import app
+    from app.models.database import get_db_session
+    from app.services.location_cache import location_cache
+
+    queries = []
+
+    class FakeSession:
+        async def execute(self, statement):
+            queries.append(statement)
+            rows = [("Austin", 2), ("Boston", 1)]
+            return type("Result", (), {"all": lambda self: rows})()
+
+    async def fake_db_session():
+        yield FakeSession()
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://localhost") as client:
+            counts = await client.get("/api/v1/listings/locations/counts")
+            assert counts.json() == [{"city": "Austin", "count": 2}, {"city": "Boston", "count": 1}]
+            etag = counts.headers["etag"]
+            assert "max-age" in counts.headers["cache-control"]
+
+            cities = await client.get("/api/v1/listings/locations")
+            assert cities.json() == ["Austin", "Boston"]
+            assert len(queries) == 1
+
+            revalidated = await client.get("/api/v1/listings/locations", headers={"If-None-Match": etag})
+            assert revalidated.status_code == 304
+            assert revalidated.headers["etag"] == etag
+
+            location_cache.invalidate()
+            await client.get("/api/v1/listings/locations")
+            assert len(queries) == 2
+
+    location_cache.invalidate()
+    app.dependency_overrides[get_db_session] = fake_db_session
+    try:
+        asyncio.run(run())
+    finally:
+        app.dependency_overrides.pop(get_db_session, None)
+        location_cache.invalidate()
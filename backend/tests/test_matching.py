@@ -0,0 +1,100 @@
+import random
+import uuid
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from app.ml.models import model_manager
+from app.services.matching import MatchingService
+
+
+def _random_user(rng: random.Random):
+    preferences = {}
+    if rng.random() < 0.8:
+        preferences["budget"] = rng.choice([0, rng.randint(400, 3000)])
+    if rng.random() < 0.6:
+        preferences["social_level"] = rng.randint(1, 5)
+
+    lifestyle = {}
+    if rng.random() < 0.8:
+        lifestyle["cleanliness"] = rng.randint(0, 5)
+    for key in ("is_smoker", "allows_smoking", "has_pets", "allows_pets"):
+        if rng.random() < 0.5:
+            lifestyle[key] = rng.random() < 0.5
+    lifestyle["work_schedule"] = rng.choice(["9-to-5", "remote", "flexible", "night"])
+
+    return SimpleNamespace(
+        id=uuid.uuid4(),
+        user_type=rng.choice(["seeker", "provider"]),
+        date_of_birth=datetime(rng.randint(1975, 2004), rng.randint(1, 12), 1),
+        created_at=datetime(2024, 1, 1),
+        updated_at=None,
+        is_verified_email=rng.random() < 0.5,
+        is_verified_phone=rng.random() < 0.5,
+        preferences=preferences or None,
+        lifestyle_data=lifestyle,
+        is_verified_identity=rng.random() < 0.5,
+        is_background_checked=rng.random() < 0.5,
+        profile_completion_score=rng.randint(0, 100),
+    )
+
+
+def _reference_matches(service: MatchingService, user, candidates):
+    """Per-pair implementation the batch engine must reproduce."""
+    matches = []
+    for candidate in candidates:
+        if candidate.id == user.id or not service._passes_advanced_filters(user, candidate):
+            continue
+        score = service.calculate_compatibility(user, candidate)
+        if score > service._calculate_dynamic_threshold(user, candidate):
+            matches.append({"user": candidate, "compatibility_score": score})
+    matches.sort(key=lambda x: x["compatibility_score"], reverse=True)
+    if len(matches) > 10:
+        matches = service._apply_diversity_filtering(matches)
+    return matches
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_batch_matching_matches_per_pair_rules(seed):
+    rng = random.Random(seed)
+    service = MatchingService()
+    user = _random_user(rng)
+    candidates = [_random_user(rng) for _ in range(300)] + [user]
+
+    expected = _reference_matches(service, user, candidates)
+    actual = service.find_matches_for_user(user, candidates)
+
+    assert [m["user"].id for m in actual] == [m["user"].id for m in expected]
+    assert [m["compatibility_score"] for m in actual] == [m["compatibility_score"] for m in expected]
+    assert all("match_reasons" in m for m in actual)
+
+
+def test_batch_matching_without_candidates():
+    service = MatchingService()
+    user = _random_user(random.Random(0))
+    assert service.find_matches_for_user(user, [user]) == []
+
+
+def test_batch_matching_with_ml_model():
+    rng = random.Random(42)
+    service = MatchingService()
+    users = [_random_user(rng) for _ in range(60)]
+    training_pairs = [
+        (service._user_to_feature_dict(a), service._user_to_feature_dict(b), rng.random())
+        for a, b in zip(users[::2], users[1::2])
+    ]
+    model_manager.create_model("test_batch_model").train(training_pairs)
+    model_manager.set_active_model("test_batch_model")
+    try:
+        user, candidates = users[0], users[1:]
+        expected = _reference_matches(service, user, candidates)
+        actual = service.find_matches_for_user(user, candidates)
+
+        assert [m["user"].id for m in actual] == [m["user"].id for m in expected]
+        assert [m["compatibility_score"] for m in actual] == pytest.approx(
+            [m["compatibility_score"] for m in expected]
+        )
+    finally:
+        model_manager.models.pop("test_batch_model", None)
+        model_manager.active_model = None
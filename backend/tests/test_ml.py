@@ -73,4 +73,157 @@ def test_model_prediction(sample_user_data):
     model.train(user_pairs)
 
     prediction = model.predict_compatibility(sample_user_data, sample_user_data)
-    assert 0 <= prediction <= 1 
\ No newline at end of file
+    assert 0 <= prediction <= 1 
+
+def test_batch_prediction_matches_single(sample_user_data):
+    model = CompatibilityModel()
+    candidates = [
+        {**sample_user_data, 'preferences': {'budget': budget}, 'profile_completion_score': score}
+        for budget, score in [(800, 40), (1300, 90), (2500, 60), (1200, 75), (3000, 10)]
+    ]
+    model.train([(sample_user_data, candidate, i / 5) for i, candidate in enumerate(candidates)])
+
+    batch = model.predict_compatibility_batch(sample_user_data, candidates)
+
+    # Reference: the per-pair features, scaling and prediction of the old scalar path
+    features1 = feature_engineer.extract_user_features(sample_user_data)
+    expected = []
+    for candidate in candidates:
+        features2 = feature_engineer.extract_user_features(candidate)
+        combined = np.concatenate([features1, features2, features1 - features2, np.abs(features1 - features2)])
+        prediction = model.model.predict(model.scaler.transform(combined.reshape(1, -1)))[0]
+        expected.append(max(0.0, min(1.0, prediction)))
+
+    assert batch.shape == (len(candidates),)
+    assert np.allclose(batch, expected)
+    assert model.predict_compatibility(sample_user_data, candidates[1]) == pytest.approx(expected[1])
+    assert model.predict_compatibility_batch(sample_user_data, []).shape == (0,)
+
+def test_feature_store_caches_and_invalidates(sample_user_data):
+    from app.ml.feature_store import UserFeatureStore
+
+    store = UserFeatureStore(initial_capacity=2)
+    users = [{**sample_user_data, 'id': f'user-{i}', 'profile_completion_score': 10 * i} for i in range(5)]
+
+    matrix = store.get_matrix(users)
+    expected = np.array([feature_engineer.extract_user_features(u) for u in users])
+    assert matrix.dtype == np.float32
+    assert np.array_equal(matrix, expected)
+    assert store.misses == 5
+
+    store.get_matrix(users)
+    assert store.hits == 5
+
+    # Changed source data is recomputed even without explicit invalidation
+    changed = {**users[0], 'preferences': {'budget': 2900}}
+    assert np.array_equal(store.get_vector(changed), feature_engineer.extract_user_features(changed))
+
+    store.invalidate('user-1')
+    assert store.get_stats()['cached_users'] == 4
+    assert np.array_equal(store.get_vector(users[1]), expected[1])
+
+def test_neighbor_index_matches_full_similarity():
+    from sklearn.metrics.pairwise import cosine_similarity
+    from app.ml.neighbors import NeighborIndex
+
+    rng = np.random.default_rng(0)
+    features = rng.normal(size=(200, 12))
+    index = NeighborIndex(n_neighbors=10, block_size=64).build(features)
+
+    full = cosine_similarity(features)
+    np.fill_diagonal(full, -np.inf)
+    for row in range(len(features)):
+        expected = np.argsort(-full[row], kind="stable")[:10]
+        indices, scores = index.neighbors(row)
+        assert list(indices) == list(expected)
+        np.testing.assert_allclose(scores, full[row, expected], rtol=1e-5)
+
+def test_training_rows_convert_to_training_tuples():
+    from types import SimpleNamespace
+    from sqlalchemy.dialects import postgresql
+    from app.services.ml_data_service import USER_FIELDS, ml_data_service
+
+    row = SimpleNamespace(**{f"user1_{field}": None for field in USER_FIELDS}, **{f"user2_{field}": None for field in USER_FIELDS})
+    row.user1_id = "a"
+    user_data = ml_data_service._row_to_user_dict(row, "user1_")
+    assert user_data["id"] == "a"
+    assert user_data["preferences"] == {} and user_data["lifestyle_data"] == {}
+
+    # 8 messages from both users over 3 days: 0.16 activity + 0.1 participation + 0.06 sustained
+    start = datetime(2024, 1, 1)
+    score = ml_data_service._calculate_conversation_score(8, 2, start, datetime(2024, 1, 4))
+    assert score == pytest.approx(0.32)
+    assert ml_data_service._calculate_conversation_score(0, 0, None, None) == 0.0
+
+    sql = str(ml_data_service._training_data_query().compile(dialect=postgresql.dialect()))
+    assert sql.count("JOIN users AS") == 2
+    assert "LEFT OUTER JOIN LATERAL" in sql
+
+def test_model_registry_versions_and_mmap_loading(tmp_path, sample_user_data):
+    import asyncio
+    import random
+    from app.ml.models import ModelManager
+    from app.ml.registry import ModelRegistry
+    from app.services.ml_data_service import ml_data_service
+
+    random.seed(0)
+    # A worker that started before any model existed
+    idle = ModelManager(ModelRegistry(str(tmp_path)))
+    assert not idle.load_active_model()
+    manager = ModelManager(ModelRegistry(str(tmp_path)))
+    model = manager.create_model("main_model")
+    metrics = model.train(asyncio.run(ml_data_service.generate_synthetic_training_data(60)))
+    first = manager.save_model("main_model", metrics)
+    second = manager.save_model("main_model", metrics)
+    manager.activate_model("main_model", first)
+
+    manifest = manager.registry.read_manifest()
+    assert manifest["active_model"] == "main_model"
+    assert manifest["models"]["main_model"]["active_version"] == first
+    assert set(manifest["models"]["main_model"]["versions"]) == {first, second}
+    assert manifest["models"]["main_model"]["versions"][first]["feature_names"] == model.feature_names
+
+    # A fresh manager (e.g. a restarted worker) warm-loads the active version memory-mapped
+    restarted = ModelManager(ModelRegistry(str(tmp_path)))
+    assert restarted.load_active_model()
+    assert restarted.active_model.version == first
+    assert isinstance(restarted.active_model.scaler.mean_, np.memmap)
+    candidates = [sample_user_data, {**sample_user_data, "id": "other"}]
+    np.testing.assert_allclose(
+        restarted.predict_compatibility_batch(sample_user_data, candidates),
+        model.predict_compatibility_batch(sample_user_data, candidates),
+    )
+
+    restarted.activate_model("main_model", second)
+    assert restarted.active_model.version == second
+    assert restarted.registry.read_manifest()["models"]["main_model"]["active_version"] == second
+
+    # The first worker follows the activation on its next prediction, without a restart
+    manager.predict_compatibility_batch(sample_user_data, candidates)
+    assert manager.active_model.version == second
+    assert isinstance(manager.active_model.scaler.mean_, np.memmap)
+    assert idle.refresh_active_model() and idle.active_model.version == second
+
+    # Disabling in one worker switches every worker to rule-based matching
+    restarted.deactivate_model()
+    assert not manager.refresh_active_model() and manager.active_model is None
+    assert not idle.refresh_active_model()
+
+def _register_versions(root, count):
+    from app.ml.registry import ModelRegistry
+
+    registry = ModelRegistry(root)
+    artifact = {"model_type": "random_forest", "feature_names": [], "trained_at": datetime.utcnow()}
+    return [registry.register("main_model", artifact, {}) for _ in range(count)]
+
+def test_registry_keeps_versions_registered_by_concurrent_processes(tmp_path):
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    from app.ml.registry import ModelRegistry
+
+    # Separate processes, like the training pool and API workers, updating one manifest
+    with ProcessPoolExecutor(max_workers=4, mp_context=multiprocessing.get_context("fork")) as pool:
+        batches = list(pool.map(_register_versions, [str(tmp_path)] * 4, [10] * 4))
+
+    registered = {version for batch in batches for version in batch}
+    assert set(ModelRegistry(str(tmp_path)).list_versions("main_model")) == registered
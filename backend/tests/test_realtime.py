@@ -0,0 +1,155 @@
+import asyncio
+from types import SimpleNamespace
+
+from app.services import realtime
+from app.services.realtime import Connection, ConnectionManager, InMemoryBackplane, RedisBackplane
+
+
+class FakeWebSocket:
+    def __init__(self, stall: bool = False):
+        self.sent = []
+        self.closed_with = None
+        self.close_calls = 0
+        self.stall = stall
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        if self.stall:
+            await asyncio.Event().wait()
+        self.sent.append(text)
+
+    async def close(self, code=1000):
+        self.closed_with = code
+        self.close_calls += 1
+
+
+def test_fan_out_reaches_every_socket_on_every_worker():
+    async def run():
+        backplane = InMemoryBackplane()
+        worker_a, worker_b = ConnectionManager(backplane), ConnectionManager(backplane)
+        await worker_a.start()
+        await worker_b.start()
+
+        tab_1, tab_2, phone, other = FakeWebSocket(), FakeWebSocket(), FakeWebSocket(), FakeWebSocket()
+        await worker_a.connect(tab_1, "alice")
+        await worker_a.connect(tab_2, "alice")
+        phone_connection = await worker_b.connect(phone, "alice")
+        await worker_b.connect(other, "bob")
+
+        await worker_a.send_to_users("hello", ["alice"])
+        await asyncio.sleep(0)
+
+        worker_b.disconnect(phone_connection)
+        await worker_b.send_personal_message("again", "alice")
+        await asyncio.sleep(0)
+        return tab_1, tab_2, phone, other, worker_b
+
+    tab_1, tab_2, phone, other, worker_b = asyncio.run(run())
+    assert tab_1.sent == tab_2.sent == ["hello", "again"]
+    assert phone.sent == ["hello"]
+    assert other.sent == []
+    assert "alice" not in worker_b.active_connections
+
+
+def test_stalled_client_is_dropped_without_blocking_sender():
+    async def run():
+        manager = ConnectionManager(InMemoryBackplane(), queue_size=3)
+        await manager.start()
+        stalled, healthy = FakeWebSocket(stall=True), FakeWebSocket()
+        await manager.connect(stalled, "carol")
+        await manager.connect(healthy, "carol")
+
+        for i in range(10):
+            await asyncio.wait_for(manager.send_to_users(f"m{i}", ["carol"]), timeout=0.1)
+            await asyncio.sleep(0)
+        await asyncio.sleep(0)
+
+        # A burst within one tick closes the overflowing client once
+        burst = FakeWebSocket(stall=True)
+        connection = Connection(burst, "erin", queue_size=1)
+        for i in range(5):
+            connection.enqueue(f"b{i}")
+        await asyncio.sleep(0)
+        return stalled, healthy, manager.metrics, burst, connection.metrics
+
+    stalled, healthy, metrics, burst, burst_metrics = asyncio.run(run())
+    assert stalled.closed_with == 1013
+    assert metrics.slow_clients_closed == 1
+    assert burst.closed_with == 1013 and burst.close_calls == 1
+    assert burst_metrics.slow_clients_closed == 1 and burst_metrics.frames_dropped == 2
+    assert healthy.sent == [f"m{i}" for i in range(10)]
+
+
+def test_overflow_policies_and_metrics():
+    async def run():
+        manager = ConnectionManager(InMemoryBackplane(), queue_size=2, overflow_policy="drop_oldest")
+        await manager.start()
+        websocket = FakeWebSocket(stall=True)
+        connection = await manager.connect(websocket, "dave")
+
+        for i in range(5):
+            manager.publish_nowait(f"m{i}", ["dave"])
+        await asyncio.sleep(0)
+        queued = [text for _, text in list(connection.queue._queue)]
+        stats = manager.get_stats()
+        await manager.stop()
+        return queued, stats, websocket
+
+    queued, stats, websocket = asyncio.run(run())
+    assert queued == ["m3", "m4"]
+    assert stats["frames_dropped"] == 3
+    assert stats["max_queue_depth"] == 2 and stats["connections"] == 1
+    assert stats["overflow_policy"] == "drop_oldest"
+    assert websocket.closed_with == 1001
+
+
+def test_redis_backplane_survives_bad_messages_and_closes_dropped_subscriptions(monkeypatch):
+    monkeypatch.setattr(realtime, "RECONNECT_DELAY", 0)
+
+    class FakePubSub:
+        def __init__(self, items):
+            self.items = items
+            self.closed = False
+
+        async def subscribe(self, channel):
+            pass
+
+        async def listen(self):
+            for item in self.items:
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+            await asyncio.Event().wait()
+
+        async def aclose(self):
+            self.closed = True
+
+    def message(data):
+        return {"type": "message", "data": data}
+
+    envelope = '{"user_ids": ["frank"], "message": "%s"}'
+    subscriptions = [
+        # Malformed messages are skipped, then the connection drops
+        FakePubSub([message("not json"), message('{"no": "user_ids"}'), message(envelope % "first"), ConnectionError("gone")]),
+        FakePubSub([message(envelope % "second")]),
+    ]
+
+    async def run():
+        backplane = RedisBackplane("redis://unused")
+        backplane._redis = SimpleNamespace(pubsub=lambda: subscriptions.pop(0) if subscriptions else FakePubSub([]))
+        first, second = subscriptions
+        manager = ConnectionManager(backplane)
+        await manager.start()
+        websocket = FakeWebSocket()
+        await manager.connect(websocket, "frank")
+        for _ in range(10):
+            await asyncio.sleep(0)
+        backplane._listener.cancel()
+        await asyncio.gather(backplane._listener, return_exceptions=True)
+        return websocket, first, second
+
+    websocket, first, second = asyncio.run(run())
+    assert websocket.sent == ["first", "second"]
+    assert first.closed and second.closed
@@ -0,0 +1,115 @@
+import asyncio
+import os
+
+import numpy as np
+import pytest
+
+from app.ml.registry import ModelRegistry
+from app.ml.training import ChunkSpool, TrainingCancelled, TrainingExecutor, TrainingJobStore, train_compatibility_model
+from app.services.ml_data_service import ml_data_service
+
+
+def _spool(*chunks):
+    spool = ChunkSpool()
+    for chunk in chunks:
+        spool.write(chunk)
+    spool.close()
+    return spool
+
+
+def test_training_job_runs_in_pool_and_registers_version(tmp_path):
+    async def run():
+        executor = TrainingExecutor(max_workers=1, store=TrainingJobStore(str(tmp_path)))
+        spool = ChunkSpool()
+
+        async def prepare():
+            # Raw rows only, spilled chunk by chunk; features are built in the pool
+            data = await ml_data_service.generate_synthetic_training_data(60)
+            spool.write(data[:30])
+            spool.write(data[30:])
+            spool.close()
+            assert spool.rows == 60
+            return train_compatibility_model, ("main_model", "random_forest", spool.path, str(tmp_path))
+
+        job = executor.submit("compatibility_model", prepare, lambda result: result, cleanup=spool.discard)
+        await job.task
+        assert not os.path.exists(spool.path)
+
+        pending = executor.submit("compatibility_model", asyncio.Event().wait, lambda result: result)
+        await asyncio.sleep(0)
+        assert executor.cancel(pending.id)
+        await asyncio.gather(pending.task, return_exceptions=True)
+
+        executor.shutdown()
+        return job, pending
+
+    job, pending = asyncio.run(run())
+
+    assert job.status == "succeeded", job.error
+    assert job.started_at <= job.finished_at
+    assert ModelRegistry(str(tmp_path)).list_versions("main_model") == [job.result["version"]]
+    assert np.isfinite(job.result["metrics"]["val_r2"])
+
+    assert pending.status == "cancelled"
+    assert pending.result is None
+
+    # Records are readable by any worker sharing the registry directory
+    other_worker = TrainingExecutor(max_workers=1, store=TrainingJobStore(str(tmp_path)))
+    assert other_worker.get(job.id)["status"] == "succeeded"
+    assert other_worker.get(pending.id)["status"] == "cancelled"
+    assert [record["job_id"] for record in other_worker.list_jobs()] == [pending.id, job.id]
+    assert not other_worker.cancel(job.id)
+    assert other_worker.get("missing") is None
+
+
+def test_job_cancelled_from_another_worker_does_not_register(tmp_path):
+    async def run():
+        store = TrainingJobStore(str(tmp_path))
+        executor = TrainingExecutor(max_workers=1, store=store)
+        other_worker = TrainingExecutor(max_workers=1, store=TrainingJobStore(str(tmp_path)))
+        release = asyncio.Event()
+        spools = []
+
+        async def prepare():
+            await release.wait()
+            data = await ml_data_service.generate_synthetic_training_data(40)
+            spool = _spool(data)
+            spools.append(spool)
+            return train_compatibility_model, ("main_model", "random_forest", spool.path, str(tmp_path))
+
+        discarded = []
+        job = executor.submit(
+            "compatibility_model", prepare, lambda result: result, discarded.append,
+            cleanup=lambda: spools[0].discard()
+        )
+        await asyncio.sleep(0)
+        assert other_worker.get(job.id)["status"] == "preparing"
+        assert other_worker.cancel(job.id)
+
+        release.set()
+        await job.task
+        executor.shutdown()
+        return job, discarded, spools[0]
+
+    job, discarded, spool = asyncio.run(run())
+
+    assert job.status == "cancelled"
+    assert discarded == []
+    assert not os.path.exists(spool.path)
+    assert ModelRegistry(str(tmp_path)).list_versions("main_model") == []
+
+
+def test_pool_function_checks_cancellation_before_registering(tmp_path):
+    data = asyncio.run(ml_data_service.generate_synthetic_training_data(40))
+    spool = _spool(data)
+    assert list(ChunkSpool.read(spool.path)) == [data]
+    with pytest.raises(TrainingCancelled):
+        train_compatibility_model("main_model", "random_forest", spool.path, str(tmp_path), is_cancelled=lambda: True)
+    registry = ModelRegistry(str(tmp_path))
+    assert registry.list_versions("main_model") == []
+
+    # A version registered just before the cancel landed is discarded with delete
+    result = train_compatibility_model("main_model", "random_forest", spool.path, str(tmp_path))
+    spool.discard()
+    registry.delete("main_model", result["version"])
+    assert registry.list_versions("main_model") == []
@@ -0,0 +1,114 @@
+import asyncio
+import json
+import uuid
+from datetime import datetime, timezone
+
+from sqlalchemy import inspect
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.core.user_cache import UserCache
+from app.models.user import User, UserType
+
+
+def _user():
+    user = User(
+        id=uuid.uuid4(),
+        email="cached@example.com",
+        password_hash="hash",
+        user_type=UserType.SEEKER,
+        preferences={"interests": ["music"]},
+        is_active=True,
+    )
+    for attr in inspect(User).column_attrs:
+        if attr.key not in user.__dict__:
+            setattr(user, attr.key, None)
+    return user
+
+
+def test_cached_user_is_merged_without_query_and_invalidated():
+    async def run():
+        cache = UserCache(ttl=60, max_size=10)
+        user = _user()
+        await cache.set(user)
+
+        # Never connects: a hit must be served without touching the database
+        engine = create_async_engine("sqlite+aiosqlite://")
+        async with AsyncSession(engine) as db:
+            cached = await cache.get(db, str(user.id))
+            state = inspect(cached)
+            assert state.persistent and not db.dirty
+            assert cached.email == user.email
+
+            # In-place edits of the request's copy do not leak into the cache
+            cached.preferences["interests"].append("art")
+            cached.first_name = "Changed"
+            assert cached in db.dirty
+
+        async with AsyncSession(engine) as db:
+            again = await cache.get(db, str(user.id))
+            assert again.preferences == {"interests": ["music"]}
+            assert again.first_name is None
+
+            await cache.invalidate(user.id)
+            assert await cache.get(db, str(user.id)) is None
+
+        return cache.get_stats()
+
+    stats = asyncio.run(run())
+    assert (stats["hits"], stats["misses"]) == (2, 1)
+
+
+def test_expired_and_evicted_entries_miss():
+    async def run():
+        cache = UserCache(ttl=60, max_size=2)
+        users = [_user() for _ in range(3)]
+        for user in users:
+            await cache.set(user)
+
+        expired = UserCache(ttl=1e-9, max_size=2)
+        await expired.set(users[0])
+
+        engine = create_async_engine("sqlite+aiosqlite://")
+        async with AsyncSession(engine) as db:
+            assert await cache.get(db, str(users[0].id)) is None
+            assert await cache.get(db, str(users[2].id)) is not None
+            assert await expired.get(db, str(users[0].id)) is None
+        return cache
+
+    cache = asyncio.run(run())
+    assert cache.evictions == 1
+
+
+def test_redis_entries_are_json_without_password_hash():
+    class FakeRedis:
+        def __init__(self):
+            self.data = {}
+
+        async def set(self, key, value, ex=None):
+            self.data[key] = value.encode()
+
+        async def get(self, key):
+            return self.data.get(key)
+
+    async def run():
+        cache = UserCache(ttl=60, max_size=10, backend="redis")
+        cache._redis = FakeRedis()
+        user = _user()
+        user.created_at = datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+        await cache.set(user)
+
+        payload = json.loads(cache._redis.data["paired:user:" + str(user.id)])
+        assert "password_hash" not in payload
+        assert payload["id"] == str(user.id)
+        assert payload["created_at"] == "2024-01-02T03:04:05+00:00"
+
+        engine = create_async_engine("sqlite+aiosqlite://")
+        async with AsyncSession(engine) as db:
+            cached = await cache.get(db, str(user.id))
+            assert cached.id == user.id
+            assert cached.user_type is UserType.SEEKER
+            assert cached.created_at == user.created_at
+            assert cached.preferences == {"interests": ["music"]}
+            assert "password_hash" in inspect(cached).unloaded
+
+    asyncio.run(run())